@@ -0,0 +1,8 @@
+"""
+Benchmarks for the app's hot paths. Each module runs on its own:
+
+    python benchmarks/<name>.py --help
+
+suite.py runs the main ones at 1k to 1M transactions per user on data from
+synthetic.py and compares the results with a stored baseline.
+"""
@@ -0,0 +1,74 @@
+"""
+Analytics page: separate analyses vs one shared bundle
+
+Times what /analytics used to do with --rows synthetic transactions (trends,
+anomalies and the forecast each working from the Transaction list on its own,
+plus the category totals the chart requests afterwards) against
+AnalyticsEngine.compute on one TransactionColumns, and against serving the
+chart's request from the cached bundle. No database is needed; the fetch
+itself is covered by benchmarks/columnar.py.
+
+    python benchmarks/analytics.py [--rows 20000]
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def timed(function, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def run(rows=20000):
+    from benchmarks.columnar import synthetic_rows
+    from models.transaction import Transaction
+    from models.transaction_columns import TransactionColumns
+    from ml_models.anomaly_detector import AnomalyDetector
+    from ml_models.spending_predictor import SpendingPredictor
+    from ml_models.analytics_engine import AnalyticsEngine, cached_bundle
+
+    raw = synthetic_rows(rows)
+    transactions = [Transaction(id=r[0], user_id=r[1], amount=float(r[2]), description=r[3], category=r[4],
+                                type=r[5], transaction_date=r[6]) for r in raw]
+    columns = TransactionColumns.from_rows((r[0], r[2] * 100, r[3], r[4], r[5], r[6]) for r in raw)
+    predictor = SpendingPredictor()
+
+    def separate():
+        predictor.analyze_spending_trends(transactions)
+        AnomalyDetector().detect_anomalies(transactions)
+        predictor.predict_future_spending(transactions)
+        totals = {}
+        for t in transactions:
+            if t.type == 'expense':
+                totals[t.category] = totals.get(t.category, 0) + t.amount
+
+    # A fresh detector each time, so its per-user model cache does not hide the fit
+    user_id = -1
+    engine = AnalyticsEngine(predictor, AnomalyDetector())
+    bundle = lambda: AnalyticsEngine(predictor, AnomalyDetector()).compute(user_id, columns)
+    try:
+        return {
+            'rows': rows,
+            'separate_seconds': timed(separate),
+            'bundle_seconds': timed(bundle),
+            'cached_categories_seconds': timed(lambda: cached_bundle(user_id)['category_totals'], repeat=100),
+        }
+    finally:
+        engine.invalidate(user_id)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Analytics page: separate analyses vs one shared bundle")
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    results = run(args.rows)
+    print(f"{results['rows']} transactions")
+    print(f"separate analyses: {results['separate_seconds']:.3f}s")
+    print(f"shared bundle:     {results['bundle_seconds']:.3f}s")
+    print(f"chart request from cached bundle: {results['cached_categories_seconds'] * 1e6:.0f} µs")
@@ -0,0 +1,111 @@
+"""
+Microbenchmark for ExpenseCategorizer.predict_category
+
+Compares per-call latency of the old inference path (one-row DataFrame and a
+refit of the vectorizer/scaler on every call) against the fitted sparse path,
+and reports accuracy of both on a held-out set. The old path refits the
+vectorizer to a one-word vocabulary, so model.predict rejects the features and
+it falls back to "Other".
+
+    python benchmarks/categorizer.py [--calls 2000]
+"""
+import argparse
+import copy
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from ml_models.ai_categorizer import ExpenseCategorizer
+
+# The demo user's transactions from database/schema.sql, never seen in training
+HELD_OUT = [
+    ("Monthly Salary", 1500.00, "income", "Income"),
+    ("Freelance Work", 300.00, "income", "Income"),
+    ("Bonus Payment", 200.00, "income", "Income"),
+    ("Grocery shopping at supermarket", 85.50, "expense", "Food"),
+    ("Dinner at restaurant", 45.00, "expense", "Food"),
+    ("Coffee at Starbucks", 5.75, "expense", "Food"),
+    ("Pizza delivery", 25.99, "expense", "Food"),
+    ("Gas station refill", 40.00, "expense", "Transportation"),
+    ("Uber ride to office", 15.50, "expense", "Transportation"),
+    ("Train ticket", 8.75, "expense", "Transportation"),
+    ("Electricity bill payment", 120.00, "expense", "Bills"),
+    ("Internet bill", 65.00, "expense", "Bills"),
+    ("Mobile phone bill", 45.50, "expense", "Bills"),
+    ("Movie tickets", 30.00, "expense", "Entertainment"),
+    ("Netflix subscription", 15.99, "expense", "Entertainment"),
+    ("Clothing store purchase", 75.00, "expense", "Shopping"),
+    ("Amazon online shopping", 45.80, "expense", "Shopping"),
+    ("Pharmacy medicines", 35.50, "expense", "Healthcare"),
+    ("Doctor consultation", 100.00, "expense", "Healthcare"),
+    ("Book store purchase", 45.00, "expense", "Education"),
+    ("Online course subscription", 89.99, "expense", "Education"),
+]
+
+def legacy_predict_category(categorizer, description, amount, transaction_type):
+    """predict_category as it was before the fitted inference path"""
+    try:
+        data = pd.DataFrame([{
+            'description': description.lower(),
+            'amount': amount,
+            'type': transaction_type
+        }])
+        text_features = categorizer.vectorizer.fit_transform(data['description'].fillna('')).toarray()
+        numerical_features = categorizer.scaler.fit_transform(data[['amount']].values)
+        type_features = pd.get_dummies(data['type']).values
+        X = np.hstack([text_features, numerical_features, type_features])
+        return categorizer.model.predict(X)[0]
+    except Exception:
+        return "Other" if transaction_type == "expense" else "Income"
+
+def measure(predict, calls):
+    timings = []
+    for i in range(calls):
+        description, amount, transaction_type, _ = HELD_OUT[i % len(HELD_OUT)]
+        started = time.perf_counter()
+        predict(description, amount, transaction_type)
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1e6
+    return {
+        'mean_us': float(timings.mean()),
+        'p50_us': float(np.percentile(timings, 50)),
+        'p99_us': float(np.percentile(timings, 99)),
+    }
+
+def accuracy(predict):
+    correct = sum(predict(d, a, t) == label for d, a, t, label in HELD_OUT)
+    return correct / len(HELD_OUT)
+
+def run(calls=2000):
+    categorizer = ExpenseCategorizer()
+    # The legacy path refits the shared vectorizer/scaler, so give it its own copy
+    legacy = copy.deepcopy(categorizer)
+
+    def legacy_predict(d, a, t):
+        return legacy_predict_category(legacy, d, a, t)
+
+    predictors = {
+        'legacy': legacy_predict,
+        'fitted': categorizer.predict_category,
+    }
+    results = {}
+    for path, predict in predictors.items():
+        results[path] = measure(predict, calls)
+        results[path]['accuracy'] = accuracy(predict)
+    results['speedup'] = results['legacy']['mean_us'] / results['fitted']['mean_us']
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="predict_category microbenchmark")
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    results = run(args.calls)
+    for path in ('legacy', 'fitted'):
+        r = results[path]
+        print(f"{path:>7}: mean {r['mean_us']:8.1f} us  p50 {r['p50_us']:8.1f} us  "
+              f"p99 {r['p99_us']:8.1f} us  held-out accuracy {r['accuracy']:.2f}")
+    print(f"speedup: {results['speedup']:.1f}x")
@@ -0,0 +1,128 @@
+"""
+add_transaction categorization with and without the category memo
+
+Replays synthetic per-user transaction streams: each user mostly repeats a
+few dozen favourite merchants (Zipf-distributed, with statement-style
+reference numbers and case changes) and now and then uses a new one. The
+first --history transactions of every user are their stored history; the
+rest are replayed in order the way add_transaction handles them, timing the
+categorization step with the model alone and with CategoryMemo in front of
+it (including learn() after each save). Saving to MySQL is not included.
+
+    python benchmarks/category_memo.py [--users 200] [--history 200] [--replay 50]
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from ml_models.ai_categorizer import ExpenseCategorizer
+from ml_models.category_memo import CategoryMemo
+
+MERCHANTS = [
+    ("Netflix subscription", 'Entertainment'), ("Spotify premium", 'Entertainment'), ("Cinema tickets", 'Entertainment'),
+    ("Uber ride", 'Transportation'), ("Shell gas station", 'Transportation'), ("Metro card top up", 'Transportation'),
+    ("Grocery store", 'Food'), ("Starbucks coffee", 'Food'), ("Pizza delivery", 'Food'), ("Whole foods market", 'Food'),
+    ("Electricity bill", 'Bills'), ("Internet bill", 'Bills'), ("Phone bill", 'Bills'), ("Water utility", 'Bills'),
+    ("Amazon online shopping", 'Shopping'), ("Clothing store", 'Shopping'), ("Ikea furniture", 'Shopping'),
+    ("Pharmacy medicines", 'Healthcare'), ("Dentist visit", 'Healthcare'), ("Book store", 'Education'),
+]
+
+LOCAL_KINDS = [("bakery", 'Food'), ("deli", 'Food'), ("garage", 'Transportation'), ("boutique", 'Shopping'),
+               ("hardware", 'Shopping'), ("clinic", 'Healthcare'), ("theatre", 'Entertainment')]
+
+def shop_name(rng):
+    return ''.join(rng.choice(list('bcdfgklmnprstvz')) + rng.choice(list('aeiou')) for _ in range(3)).capitalize()
+
+def user_stream(user_id, count, new_merchant_rate=0.05):
+    """(description, amount, type, category) rows for one user, oldest first."""
+    rng = np.random.default_rng(user_id)
+    # Each user has their own local shops on top of the shared chains
+    merchants = MERCHANTS + [(f"{shop_name(rng)} {kind}", category)
+                             for kind, category in (LOCAL_KINDS[i] for i in rng.integers(len(LOCAL_KINDS), size=30))]
+    favourites = rng.permutation(len(merchants))
+    weights = 1.0 / np.arange(1, len(merchants) + 1) ** 1.1
+    picks = favourites[rng.choice(len(merchants), size=count, p=weights / weights.sum())]
+    rows = []
+    for pick in picks:
+        description, category = merchants[pick]
+        if rng.random() < new_merchant_rate:
+            # Somewhere the user has never been
+            kind, category = LOCAL_KINDS[rng.integers(len(LOCAL_KINDS))]
+            description = f"{shop_name(rng)} {kind}"
+        style = rng.random()
+        if style < 0.2:
+            description = f"{description.upper()} {rng.integers(1000, 9999)}"
+        elif style < 0.3:
+            description = f"{description} #{rng.integers(10, 99)}"
+        rows.append((description, float(rng.uniform(5, 150)), 'expense', category))
+    return rows
+
+def percentile_ms(times, q):
+    return float(np.percentile(times, q)) * 1000
+
+def run(users=200, history=200, replay=50):
+    streams = {user_id: user_stream(user_id, history + replay) for user_id in range(1, users + 1)}
+    categorizer = ExpenseCategorizer()
+
+    def fetch_history(user_id, limit):
+        return [(d, t, c) for d, _, t, c in streams[user_id][:history][-limit:]]
+
+    def fetch_merchants(min_users, limit):
+        votes = {}
+        for rows in streams.values():
+            for d, _, t, c in set((d, 0, t, c) for d, _, t, c in rows[:history]):
+                votes[(d, t, c)] = votes.get((d, t, c), 0) + 1
+        return [key + (n,) for key, n in votes.items() if n >= min_users][:limit]
+
+    memo = CategoryMemo(categorizer=categorizer, fetch_history=fetch_history, fetch_merchants=fetch_merchants)
+    # Seed the global memo before timing; it is refreshed at most hourly
+    memo.refresh_merchants()
+
+    model_times, memo_times, seed_times = [], [], []
+    model_correct = memo_correct = 0
+    # Interleave users like concurrent traffic
+    for step in range(history, history + replay):
+        for user_id, rows in streams.items():
+            description, amount, transaction_type, category = rows[step]
+
+            started = time.perf_counter()
+            predicted = categorizer.predict_category(description, amount, transaction_type)
+            model_times.append(time.perf_counter() - started)
+            model_correct += predicted == category
+
+            started = time.perf_counter()
+            predicted = memo.predict_category(user_id, description, amount, transaction_type)
+            # The replayed user keeps the suggested category unless it was wrong, like a user would
+            memo.learn(user_id, description, transaction_type, category)
+            elapsed = time.perf_counter() - started
+            (seed_times if step == history else memo_times).append(elapsed)
+            memo_correct += predicted == category
+
+    total = users * replay
+    return {
+        'users': users, 'history': history, 'replay': replay,
+        'model_p50_ms': percentile_ms(model_times, 50), 'model_p95_ms': percentile_ms(model_times, 95),
+        'memo_p50_ms': percentile_ms(memo_times, 50), 'memo_p95_ms': percentile_ms(memo_times, 95),
+        'first_call_p50_ms': percentile_ms(seed_times, 50),
+        'model_accuracy': model_correct / total, 'memo_accuracy': memo_correct / total,
+        'stats': memo.stats(),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="add_transaction categorization with and without the memo")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--history', type=int, default=200)
+    parser.add_argument('--replay', type=int, default=50)
+    args = parser.parse_args()
+
+    r = run(args.users, args.history, args.replay)
+    print(f"{r['users']} users, {r['history']} stored + {r['replay']} replayed transactions each")
+    print(f"model only: p50 {r['model_p50_ms']:.3f} ms  p95 {r['model_p95_ms']:.3f} ms  accuracy {r['model_accuracy']:.3f}")
+    print(f"with memo:  p50 {r['memo_p50_ms']:.3f} ms  p95 {r['memo_p95_ms']:.3f} ms  accuracy {r['memo_accuracy']:.3f}"
+          f"  (first call per user, loading history: p50 {r['first_call_p50_ms']:.3f} ms)")
+    stats = r['stats']
+    print(f"hit rate {stats['hit_rate']:.3f}: " +
+          ", ".join(f"{source} {stats[source]}" for source in CategoryMemo.SOURCES))
@@ -0,0 +1,86 @@
+"""
+Columnar vs object transaction loading
+
+Builds --rows synthetic cursor rows shaped like MySQL returns them (Decimal
+amounts, date objects) and converts them the two ways the app can:
+one Transaction per row from dictionary rows (get_user_transactions), and
+TransactionColumns.from_rows from raw tuples. Reports conversion time and
+memory retained per 100k rows (tracemalloc), plus the time to turn each into
+the anomaly detector's feature matrix and the forecaster's daily totals.
+
+    python benchmarks/columnar.py [--rows 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+def synthetic_rows(rows, seed=42):
+    rng = random.Random(seed)
+    categories = ['Food', 'Transportation', 'Entertainment', 'Shopping', 'Bills', 'Healthcare', 'Other']
+    return [(i, 7, Decimal(f"{rng.uniform(1, 500):.2f}"), f"synthetic transaction {i % 997}",
+             rng.choice(categories), 'income' if rng.random() < 0.1 else 'expense',
+             date(2015, 1, 1) + timedelta(days=rng.randint(0, 3650))) for i in range(rows)]
+
+def measure(build):
+    started = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - started
+    del result
+    # Separate pass for memory, since tracing slows allocation-heavy code unevenly
+    tracemalloc.start()
+    result = build()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, seconds, retained
+
+def run(rows=100000):
+    from models.transaction import Transaction
+    from models.transaction_columns import TransactionColumns
+    from ml_models.anomaly_detector import AnomalyDetector
+    from ml_models.spending_predictor import SpendingPredictor
+
+    names = ['id', 'user_id', 'amount', 'description', 'category', 'type', 'transaction_date']
+    dict_rows = [dict(zip(names, row)) for row in synthetic_rows(rows)]
+    # The columnar query returns ROUND(amount * 100) instead of the user id
+    tuple_rows = [(r['id'], r['amount'] * 100, r['description'], r['category'], r['type'],
+                   r['transaction_date']) for r in dict_rows]
+
+    scale = 100000 / rows
+    results = {'rows': rows}
+    detector, predictor = AnomalyDetector(), SpendingPredictor()
+    for mode, build in (('objects', lambda: [Transaction.from_row(row) for row in dict_rows]),
+                        ('columns', lambda: TransactionColumns.from_rows(iter(tuple_rows)))):
+        loaded, seconds, retained = measure(build)
+        started = time.perf_counter()
+        detector.build_features(loaded)
+        features_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        predictor.daily_expense_totals(loaded)
+        daily_seconds = time.perf_counter() - started
+        results[mode] = {
+            'load_seconds': seconds,
+            'mb_per_100k': retained * scale / 2**20,
+            'features_seconds': features_seconds,
+            'daily_totals_seconds': daily_seconds,
+        }
+        del loaded
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Columnar vs object transaction loading")
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    results = run(args.rows)
+    print(f"{results['rows']} rows")
+    for mode in ('objects', 'columns'):
+        r = results[mode]
+        print(f"{mode:>7}: load {r['load_seconds']:.3f}s  {r['mb_per_100k']:.1f} MB per 100k rows  "
+              f"anomaly features {r['features_seconds']:.3f}s  daily totals {r['daily_totals_seconds']:.3f}s")
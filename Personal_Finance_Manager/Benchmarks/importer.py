@@ -0,0 +1,93 @@
+"""
+Statement import throughput
+
+Writes a synthetic CSV statement of --rows lines and imports it with
+StatementImporter. Without --database this is a dry run (parse + batch
+categorize only). With --database the rows are inserted for a throwaway user,
+and the old path (categorize one row, Transaction.save() per row) is timed on
+--per-row-sample rows and extrapolated for comparison. The user is deleted
+afterwards.
+
+    python benchmarks/importer.py [--rows 100000] [--chunk-size 5000] [--database]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date, timedelta
+
+MERCHANTS = ['Starbucks coffee', 'Uber ride', 'Netflix subscription', 'Grocery shopping', 'Electricity bill',
+             'Amazon purchase', 'Pharmacy', 'Restaurant dinner', 'Gas station', 'Salary payment']
+
+def write_statement(path, rows, seed=42):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as f:
+        f.write("Date,Description,Amount\n")
+        for i in range(rows):
+            merchant = rng.choice(MERCHANTS)
+            amount = rng.uniform(1000, 3000) if merchant == 'Salary payment' else -rng.uniform(2, 300)
+            day = date(2020, 1, 1) + timedelta(days=rng.randint(0, 1500))
+            f.write(f"{day.isoformat()},{merchant} {i % 97},{amount:.2f}\n")
+
+def per_row_seconds(user_id, path, sample):
+    """Seconds per row for the add_transaction path: one prediction and one save per row."""
+    from models.importer import parse_csv
+    from models.transaction import Transaction
+    from ml_models.model_registry import get_categorizer
+
+    categorizer = get_categorizer()
+    with open(path, newline='') as f:
+        rows = [row for _, row in parse_csv(f)][:sample]
+    started = time.perf_counter()
+    for row in rows:
+        row['category'] = categorizer.predict_category(row['description'], row['amount'], row['type'])
+        Transaction(user_id=user_id, **row).save()
+    return (time.perf_counter() - started) / len(rows)
+
+def run(rows=100000, chunk_size=5000, database=False, per_row_sample=200):
+    from models.importer import StatementImporter
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'statement.csv')
+    write_statement(path, rows)
+    results = {'rows': rows}
+    user = None
+    try:
+        if database:
+            from benchmarks.transactions_api import create_user_with_rows
+            user = create_user_with_rows(0)
+        report = StatementImporter(user.id if user else 0, chunk_size=chunk_size,
+                                   dry_run=not database).import_file(path)
+        results['import'] = {key: report[key] for key in ('rows_imported', 'rows_failed', 'seconds', 'rows_per_second')}
+        if database:
+            seconds = per_row_seconds(user.id, path, per_row_sample)
+            results['per_row'] = {'seconds_per_row': seconds, 'estimated_seconds': seconds * rows}
+        return results
+    finally:
+        if user:
+            from benchmarks.transactions_api import delete_user
+            delete_user(user)
+        os.remove(path)
+        os.rmdir(workdir)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Statement import throughput")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--database', action='store_true', help="Insert rows instead of a dry run")
+    parser.add_argument('--per-row-sample', type=int, default=200)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.chunk_size, args.database, args.per_row_sample)
+    r = results['import']
+    mode = "import" if args.database else "dry run"
+    print(f"{mode}: {r['rows_imported']} rows in {r['seconds']:.2f}s ({r['rows_per_second']:.0f} rows/sec), "
+          f"{r['rows_failed']} failed")
+    if 'per_row' in results:
+        p = results['per_row']
+        print(f"per-row save: {p['seconds_per_row'] * 1000:.1f} ms/row, "
+              f"~{p['estimated_seconds'] / 60:.1f} min for {results['rows']} rows")
@@ -0,0 +1,93 @@
+"""
+Request latency during a login storm
+
+Runs a stream of cheap "dashboard" requests (serializing a page of fake
+transactions, GIL-bound like template rendering) on the main thread while
+--logins threads verify passwords as fast as they can, the way concurrent
+POST /login requests would on a threaded worker. Compares p50/p99 of the
+dashboard requests with no storm, with hashing inline in the worker
+(PASSWORD_HASH_WORKERS=0, the old behaviour) and with the bounded hashing
+pool. Uses the configured PASSWORD_HASH_METHOD.
+
+    python benchmarks/login_storm.py [--logins 8] [--seconds 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def dashboard_request(rows):
+    return json.dumps([dict(row, balance=row['amount'] * 2) for row in rows])
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def storm(mode, logins, seconds):
+    from config import Config
+    from models import passwords
+    from models.user import User
+    from werkzeug.security import generate_password_hash
+
+    Config.PASSWORD_HASH_WORKERS = 0 if mode == 'inline' else Config.PASSWORD_HASH_WORKERS or 2
+    password_hash = generate_password_hash("password123", method=Config.PASSWORD_HASH_METHOD)
+    if mode == 'pool':
+        passwords.verify_password(password_hash, "warm up")
+
+    stop = threading.Event()
+    counts = {'logins': 0, 'busy': 0}
+    lock = threading.Lock()
+
+    def login_loop():
+        user = User(1, "storm", "storm@example.com", password_hash)
+        while not stop.is_set():
+            try:
+                user.check_password("password123")
+                key = 'logins'
+            except passwords.PasswordHasherBusy:
+                key = 'busy'
+                time.sleep(0.01)
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=login_loop) for _ in range(logins if mode != 'idle' else 0)]
+    for thread in threads:
+        thread.start()
+
+    rows = [{'id': i, 'amount': i * 1.5, 'description': f"transaction {i}", 'category': 'Food'} for i in range(300)]
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        dashboard_request(rows)
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.002)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    passwords.shutdown()
+    return {
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'requests': len(latencies),
+        'logins_per_second': counts['logins'] / seconds,
+        'rejected_busy': counts['busy'],
+    }
+
+def run(logins=8, seconds=5):
+    return {mode: storm(mode, logins, seconds) for mode in ('idle', 'inline', 'pool')}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dashboard latency during a login storm")
+    parser.add_argument('--logins', type=int, default=8, help="Concurrent login threads")
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    for mode, r in run(args.logins, args.seconds).items():
+        print(f"{mode:>6}: dashboard p50 {r['p50_ms']:.2f} ms  p99 {r['p99_ms']:.2f} ms  "
+              f"logins {r['logins_per_second']:.1f}/s  rejected {r['rejected_busy']}")
@@ -0,0 +1,109 @@
+"""
+Per-worker memory of the categorizer model artifacts
+
+Trains a categorizer on synthetic data large enough to give non-trivial trees,
+then starts N worker processes that each load it and make one prediction, with
+the artifacts memory-mapped (MODEL_MMAP_MODE=r) and loaded privately
+(MODEL_MMAP_MODE=''). Reports RSS, PSS and USS per worker from
+/proc/self/smaps_rollup (Linux); PSS splits shared pages between the workers.
+
+    python benchmarks/model_memory.py [--workers 4] [--train-rows 5000]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def memory_kb():
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {'rss': rss, 'pss': rss, 'uss': rss}
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+def worker(workdir, mmap_mode, loaded, results, done):
+    os.environ['MODEL_MMAP_MODE'] = mmap_mode
+    os.chdir(workdir)
+    from ml_models.ai_categorizer import ExpenseCategorizer
+
+    baseline = memory_kb()
+    categorizer = ExpenseCategorizer()
+    categorizer.predict_category("coffee shop", 4.5, "expense")
+    # Measure only once every worker has mapped the model, and stay alive until
+    # all have measured, so shared pages are counted as shared
+    loaded.wait()
+    after = memory_kb()
+    results.put({key: after[key] - baseline[key] for key in after})
+    done.wait()
+
+def train_synthetic(workdir, rows, seed=42):
+    import pandas as pd
+    from ml_models.ai_categorizer import ExpenseCategorizer
+
+    rng = random.Random(seed)
+    words = [f"merchant{i}" for i in range(400)]
+    categories = ['Food', 'Transportation', 'Entertainment', 'Shopping', 'Bills', 'Healthcare', 'Education', 'Other']
+    df = pd.DataFrame([{
+        'description': ' '.join(rng.sample(words, 3)),
+        'amount': round(rng.lognormvariate(3.5, 1.0), 2),
+        'type': 'expense',
+        'category': rng.choice(categories),
+    } for _ in range(rows)])
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        categorizer = ExpenseCategorizer()
+        categorizer.train(df)
+        return os.path.getsize(categorizer.model_path)
+    finally:
+        os.chdir(cwd)
+
+def run(workers=4, train_rows=5000):
+    workdir = tempfile.mkdtemp()
+    try:
+        artifact_bytes = train_synthetic(workdir, train_rows)
+        ctx = multiprocessing.get_context('spawn')
+        results = {'artifact_mb': artifact_bytes / 2**20}
+        for mode, mmap_mode in (('private', ''), ('mmap', 'r')):
+            loaded, queue, done = ctx.Barrier(workers), ctx.Queue(), ctx.Event()
+            processes = [ctx.Process(target=worker, args=(workdir, mmap_mode, loaded, queue, done))
+                         for _ in range(workers)]
+            for process in processes:
+                process.start()
+            samples = [queue.get() for _ in processes]
+            done.set()
+            for process in processes:
+                process.join()
+            results[mode] = {key: sum(s[key] for s in samples) / len(samples) / 1024
+                             for key in ('rss', 'pss', 'uss')}
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Model artifact memory per worker")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--train-rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    results = run(args.workers, args.train_rows)
+    print(f"model artifact: {results['artifact_mb']:.1f} MB, {args.workers} workers")
+    for mode in ('private', 'mmap'):
+        r = results[mode]
+        print(f"{mode:>7}: per worker RSS +{r['rss']:.1f} MB  PSS +{r['pss']:.1f} MB  USS +{r['uss']:.1f} MB")
@@ -0,0 +1,67 @@
+"""
+Precompute throughput vs worker count
+
+Computes analytics bundles for --users synthetic users (--rows transactions
+each) the way `run.py precompute-insights` does: one AnalyticsEngine.build
+per user, fanned out over a spawn ProcessPoolExecutor. Transactions are
+generated inside the workers instead of read from MySQL, so this measures
+the compute side only. Reports users/sec for each worker count, including
+pool start-up and model loading.
+
+    python benchmarks/precompute.py [--users 200] [--rows 1000] [--workers 1,2,4]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ProcessPoolExecutor
+
+def synthetic_columns(user_id, rows):
+    import numpy as np
+    from models.transaction_columns import TransactionColumns
+
+    rng = np.random.default_rng(user_id)
+    categories = ['Food', 'Transportation', 'Entertainment', 'Shopping', 'Bills', 'Healthcare', 'Other']
+    return TransactionColumns(
+        ids=np.arange(rows, 0, -1, dtype=np.int64),
+        amount_cents=rng.integers(100, 50000, rows, dtype=np.int64),
+        dates=np.sort(np.datetime64('2023-01-01') + rng.integers(0, 730, rows))[::-1],
+        type_codes=(rng.random(rows) < 0.1).astype(np.int8),
+        category_codes=rng.integers(0, len(categories), rows).astype(np.int16),
+        categories=categories,
+        descriptions=[f"synthetic transaction {i % 97}" for i in range(rows)],
+    )
+
+def build_user(args):
+    from ml_models.model_registry import get_analytics_engine
+
+    user_id, rows = args
+    return get_analytics_engine().build(user_id, synthetic_columns(user_id, rows), keep_model=False)['transaction_count']
+
+def run(users=200, rows=1000, worker_counts=(1, 2, 4)):
+    results = {'users': users, 'rows': rows, 'cpus': os.cpu_count(), 'runs': []}
+    tasks = [(user_id, rows) for user_id in range(1, users + 1)]
+    for workers in worker_counts:
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            computed = sum(1 for _ in executor.map(build_user, tasks, chunksize=max(1, users // (workers * 4))))
+        seconds = time.perf_counter() - started
+        results['runs'].append({'workers': workers, 'seconds': seconds, 'users_per_second': computed / seconds})
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute throughput vs worker count")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--workers', default='1,2,4', help="Comma-separated worker counts")
+    args = parser.parse_args()
+
+    results = run(args.users, args.rows, [int(w) for w in args.workers.split(',')])
+    print(f"{results['users']} users x {results['rows']} transactions, {results['cpus']} CPUs")
+    base = results['runs'][0]['users_per_second']
+    for r in results['runs']:
+        print(f"{r['workers']:>2} workers: {r['seconds']:.2f}s  {r['users_per_second']:.1f} users/sec  "
+              f"({r['users_per_second'] / base:.2f}x)")
@@ -0,0 +1,108 @@
+"""
+Transaction/Budget record size and construction cost
+
+Builds --rows Transaction and Budget objects from synthetic rows and compares
+them with plain __dict__ classes shaped like the old models: construction
+time, memory retained per 100k objects (tracemalloc), and the cost of turning
+'YYYY-MM-DD' string dates into ordinals the old way (strptime per row in
+AnomalyDetector) against reading the already-normalized dates.
+
+    python benchmarks/records.py [--rows 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date, datetime, timedelta
+
+class DictTransaction:
+    """The pre-slots Transaction: a __dict__ per object and dates stored as given."""
+    def __init__(self, id=None, user_id=None, amount=0, description="", category="Other",
+                 type="expense", transaction_date=None):
+        self.id = id
+        self.user_id = user_id
+        self.amount = amount
+        self.description = description
+        self.category = category
+        self.type = type
+        self.transaction_date = transaction_date or datetime.now().date()
+
+class DictBudget:
+    def __init__(self, id=None, user_id=None, category=None, amount=0, month_year=None):
+        self.id = id
+        self.user_id = user_id
+        self.category = category
+        self.amount = amount
+        self.month_year = month_year
+
+def synthetic_rows(rows, seed=42):
+    rng = random.Random(seed)
+    categories = ['Food', 'Transportation', 'Entertainment', 'Shopping', 'Bills', 'Healthcare', 'Other']
+    # Half the dates arrive as strings, as they do from forms and the batch API
+    return [dict(id=i, user_id=7, amount=round(rng.uniform(1, 500), 2), description=f"synthetic transaction {i % 997}",
+                 category=rng.choice(categories), type='expense',
+                 transaction_date=day.isoformat() if i % 2 else day)
+            for i, day in ((i, date(2015, 1, 1) + timedelta(days=rng.randint(0, 3650))) for i in range(rows))]
+
+def measure(build):
+    started = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - started
+    del result
+    tracemalloc.start()
+    result = build()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, seconds, retained
+
+def old_ordinals(transactions):
+    # AnomalyDetector.date_to_numeric before dates were normalized
+    ordinals = []
+    for t in transactions:
+        day = t.transaction_date
+        if isinstance(day, str):
+            day = datetime.strptime(day, '%Y-%m-%d')
+        ordinals.append(day.toordinal())
+    return ordinals
+
+def run(rows=100000):
+    from models.transaction import Transaction
+    from models.budget import Budget
+
+    transaction_rows = synthetic_rows(rows)
+    budget_rows = [dict(id=i, user_id=7, category=row['category'], amount=500.0, month_year='2024-01')
+                   for i, row in enumerate(transaction_rows)]
+    scale = 100000 / rows
+    results = {'rows': rows}
+    for name, cls, data in (('transaction_dict', DictTransaction, transaction_rows),
+                            ('transaction_slots', Transaction, transaction_rows),
+                            ('budget_dict', DictBudget, budget_rows),
+                            ('budget_slots', Budget, budget_rows)):
+        objects, seconds, retained = measure(lambda: [cls(**row) for row in data])
+        results[name] = {'build_seconds': seconds, 'mb_per_100k': retained * scale / 2**20}
+        if name.startswith('transaction'):
+            ordinals = old_ordinals if cls is DictTransaction else (
+                lambda ts: [t.transaction_date.toordinal() for t in ts])
+            started = time.perf_counter()
+            ordinals(objects)
+            results[name]['ordinals_seconds'] = time.perf_counter() - started
+        del objects
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Transaction/Budget record size and construction cost")
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    results = run(args.rows)
+    print(f"{results['rows']} objects each")
+    for name in ('transaction_dict', 'transaction_slots', 'budget_dict', 'budget_slots'):
+        r = results[name]
+        line = f"{name:>17}: build {r['build_seconds']:.3f}s  {r['mb_per_100k']:.1f} MB per 100k"
+        if 'ordinals_seconds' in r:
+            line += f"  date ordinals {r['ordinals_seconds']:.3f}s"
+        print(line)
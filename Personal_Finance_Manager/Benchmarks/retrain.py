@@ -0,0 +1,81 @@
+"""
+Categorizer retraining throughput and memory
+
+Runs CategorizerTrainer over --rows synthetic labelled transactions served
+--chunk-size at a time, the way `run.py retrain-categorizer` reads the
+transactions table, then an incremental run over --new-rows more. Rows are
+generated on the fly instead of read from MySQL, so this measures the
+training side only. Reports rows/sec, held-out accuracy and peak traced
+memory, which should track the chunk size rather than the table size.
+
+    python benchmarks/retrain.py [--rows 200000] [--new-rows 20000] [--chunk-size 5000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from ml_models.categorizer_training import CategorizerTrainer
+
+CATEGORIES = ['Food', 'Transportation', 'Entertainment', 'Shopping', 'Bills', 'Healthcare', 'Other']
+WORDS = ['store', 'market', 'online', 'payment', 'monthly', 'card', 'city', 'express']
+
+class SyntheticTable:
+    """Labelled rows generated per chunk, so any range can be served without keeping the table."""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetch_batch(self, after_id=0, limit=5000):
+        ids = np.arange(after_id + 1, min(after_id + limit, self.rows) + 1)
+        rng = np.random.default_rng(after_id)
+        codes = rng.integers(len(CATEGORIES), size=len(ids))
+        # One description in ten comes from another category's merchant
+        merchant_codes = np.where(rng.random(len(ids)) < 0.1, rng.integers(len(CATEGORIES), size=len(ids)), codes)
+        merchants = rng.integers(40, size=len(ids))
+        words = rng.integers(len(WORDS), size=len(ids))
+        amounts = rng.uniform(5, 50 * (codes + 1))
+        return [(int(i), f"{CATEGORIES[m].lower()} merchant {n} {WORDS[w]}", float(a), 'expense', CATEGORIES[c])
+                for i, m, n, w, a, c in zip(ids, merchant_codes, merchants, words, amounts, codes)]
+
+    def fetch_categories(self):
+        return CATEGORIES
+
+def run(rows=200000, new_rows=20000, chunk_size=5000):
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    try:
+        table = SyntheticTable(rows)
+        trainer = CategorizerTrainer(chunk_size=chunk_size, fetch_batch=table.fetch_batch,
+                                     fetch_categories=table.fetch_categories)
+        tracemalloc.start()
+        full = trainer.run(full=True)
+        full['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.reset_peak()
+
+        table.rows += new_rows
+        incremental = trainer.run()
+        incremental['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {'rows': rows, 'new_rows': new_rows, 'chunk_size': chunk_size, 'full': full, 'incremental': incremental}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Categorizer retraining throughput and memory")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--new-rows', type=int, default=20000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.new_rows, args.chunk_size)
+    print(f"{results['rows']} rows + {results['new_rows']} new, chunks of {results['chunk_size']}")
+    for name in ('full', 'incremental'):
+        r = results[name]
+        print(f"{name:>12}: {r['rows_trained']} trained in {r['seconds']:.2f}s  {r['rows_per_second']:.0f} rows/sec  "
+              f"accuracy {r['holdout_accuracy']:.3f}  peak {r['peak_mb']:.1f} MB")
@@ -0,0 +1,62 @@
+"""
+Startup-time benchmark for the web app
+
+Imports `app` in a fresh interpreter and reports how long the import took,
+whether scikit-learn/pandas were pulled in, and how long the first
+categorization takes once the model is needed. Runs both the lazy default and
+PRELOAD_MODELS=1, which matches the old behaviour of building models at import.
+
+    python benchmarks/startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = {name: name in sys.modules for name in ('sklearn', 'pandas')}
+from ml_models.model_registry import get_categorizer
+get_categorizer().predict_category('coffee shop', 4.5, 'expense')
+first_prediction = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'first_prediction_seconds': first_prediction - imported,
+    'modules_at_import': heavy,
+}))
+"""
+
+def probe(preload):
+    env = dict(os.environ, PRELOAD_MODELS='1' if preload else '0')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(runs=5):
+    results = {}
+    for mode, preload in (('lazy', False), ('preload', True)):
+        samples = [probe(preload) for _ in range(runs)]
+        results[mode] = {
+            'import_seconds': statistics.median(s['import_seconds'] for s in samples),
+            'first_prediction_seconds': statistics.median(s['first_prediction_seconds'] for s in samples),
+            'modules_at_import': samples[-1]['modules_at_import'],
+        }
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="App startup benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    for mode, r in run(args.runs).items():
+        loaded = ', '.join(name for name, present in r['modules_at_import'].items() if present) or 'none'
+        print(f"{mode:>7}: import {r['import_seconds']:.3f}s  first prediction "
+              f"{r['first_prediction_seconds']:.3f}s  heavy modules at import: {loaded}")
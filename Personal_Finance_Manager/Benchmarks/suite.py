@@ -0,0 +1,203 @@
+"""
+Benchmark suite: the app's hot paths from 1k to 1M transactions per user
+
+For each size in --sizes, loads --users synthetic users with that many
+transactions each (benchmarks/synthetic.py, seeded) and times, for the first
+of them, the best of --repeat runs of:
+
+    load_columns             TransactionColumns.load, the analytics page's fetch
+    predict_category         one description through the categorizer
+    predict_categories_1k    1,000 of the user's rows in one batch
+    detect_anomalies         a fresh AnomalyDetector on the loaded columns
+    predict_future_spending
+    analyze_spending_trends  from the loaded columns, as the app does
+    dashboard                GET /dashboard, rendered
+    api_transactions_page    GET /api/transactions?limit=100
+    api_transactions_stream  GET /api/transactions?stream=1, the whole body
+
+API requests run with the user's response cache invalidated, so each one
+reaches the database. Everything runs against a throwaway SQLite database
+unless --database uses the configured one; the users are deleted afterwards.
+
+Results are written to --output as JSON. With --baseline (an earlier
+output file), each timing is compared with the stored one and the run exits
+with status 1 if any is more than --tolerance slower, ignoring differences
+under MIN_REGRESSION_SECONDS.
+
+    python benchmarks/suite.py [--sizes 1k,10k,100k,1m] [--users 1] [--repeat 3]
+                               [--output results.json] [--baseline baseline.json] [--tolerance 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+SIZES = '1k,10k,100k,1m'
+
+# Smaller slowdowns than this are timer noise, whatever the percentage
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def size_label(rows):
+    for suffix, scale in (('m', 1000000), ('k', 1000)):
+        if rows >= scale and rows % scale == 0:
+            return f"{rows // scale}{suffix}"
+    return str(rows)
+
+
+def timed(function, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def benchmark_user(client, user_id, repeat=3):
+    from models.cache import bump_data_version
+    from models.transaction_columns import TransactionColumns
+    from ml_models.anomaly_detector import AnomalyDetector
+    from ml_models.model_registry import get_categorizer, get_predictor
+
+    categorizer = get_categorizer()
+    predictor = get_predictor()
+    columns = TransactionColumns.load(user_id)
+    sample = [{'description': t.description, 'amount': t.amount, 'type': t.type}
+              for t in map(columns.row, range(min(1000, len(columns))))]
+
+    def get(path):
+        # A new data version, so the response cache cannot answer
+        bump_data_version(user_id)
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {path} returned {response.status_code}")
+        return response.get_data()
+
+    return {
+        'load_columns': timed(lambda: TransactionColumns.load(user_id), repeat),
+        'predict_category': timed(lambda: categorizer.predict_category(
+            sample[0]['description'], sample[0]['amount'], sample[0]['type']), max(repeat, 20)),
+        'predict_categories_1k': timed(lambda: categorizer.predict_categories(sample), repeat),
+        'detect_anomalies': timed(lambda: AnomalyDetector().detect_anomalies(columns), repeat),
+        'predict_future_spending': timed(lambda: predictor.predict_future_spending(columns), repeat),
+        'analyze_spending_trends': timed(lambda: predictor.analyze_spending_trends_from_columns(columns), repeat),
+        'dashboard': timed(lambda: get('/dashboard'), repeat),
+        'api_transactions_page': timed(lambda: get('/api/transactions?limit=100'), repeat),
+        'api_transactions_stream': timed(lambda: get('/api/transactions?stream=1'), repeat),
+    }
+
+
+def run(sizes=SIZES, users=1, months=24, seed=42, repeat=3, database=False):
+    from app import app
+    from models.storage import SQLiteStorage, use_storage, get_storage
+    from benchmarks.synthetic import create_users, delete_users
+
+    tmp = None
+    previous = None
+    if not database:
+        tmp = tempfile.TemporaryDirectory()
+        previous = use_storage(SQLiteStorage(os.path.join(tmp.name, 'benchmark.sqlite3')))
+
+    results = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'backend': get_storage().name,
+        'seed': seed,
+        'users': users,
+        'months': months,
+        'repeat': repeat,
+        'sizes': {},
+    }
+    try:
+        for rows in (parse_size(size) for size in sizes.split(',')):
+            started = time.perf_counter()
+            user_ids = create_users(users, rows, months, seed)
+            try:
+                client = app.test_client()
+                with client.session_transaction() as session:
+                    session['_user_id'] = str(user_ids[0])
+                loaded = time.perf_counter() - started
+                timings = benchmark_user(client, user_ids[0], repeat)
+            finally:
+                delete_users(user_ids)
+            results['sizes'][size_label(rows)] = {'rows': rows, 'load_seconds': loaded, 'timings': timings}
+            print(f"✅ {size_label(rows)} rows per user: loaded in {loaded:.1f}s, "
+                  f"benchmarked in {time.perf_counter() - started - loaded:.1f}s")
+    finally:
+        if tmp is not None:
+            use_storage(previous).close()
+            tmp.cleanup()
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """One row per timing present in both runs: (size, name, baseline, current, ratio, regressed)."""
+    rows = []
+    for label, size in results['sizes'].items():
+        stored = baseline.get('sizes', {}).get(label, {}).get('timings', {})
+        for name, seconds in size['timings'].items():
+            if name not in stored:
+                continue
+            before = stored[name]
+            ratio = seconds / before if before else float('inf')
+            regressed = seconds > before * (1 + tolerance) and seconds - before > MIN_REGRESSION_SECONDS
+            rows.append((label, name, before, seconds, ratio, regressed))
+    return rows
+
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.1f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark suite at growing transactions per user")
+    parser.add_argument('--sizes', default=SIZES, help="Comma-separated rows per user, e.g. 1k,10k")
+    parser.add_argument('--users', type=int, default=1, help="Users loaded per size; the first is timed")
+    parser.add_argument('--months', type=int, default=24, help="Months of history per user")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per timing; the best is kept")
+    parser.add_argument('--database', action='store_true', help="Use the configured database, not a throwaway SQLite file")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="Earlier --output file to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.users, args.months, args.seed, args.repeat, args.database)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        for label, size in results['sizes'].items():
+            print(f"\n{label} rows per user")
+            for name, seconds in size['timings'].items():
+                print(f"  {name:<25} {format_seconds(seconds):>10}")
+        raise SystemExit(0)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.tolerance)
+    for label, name, before, seconds, ratio, regressed in rows:
+        print(f"{'❌' if regressed else '  '} {label:>5} {name:<25} {format_seconds(before):>10} -> "
+              f"{format_seconds(seconds):>10}  ({ratio - 1:+.0%})")
+    regressions = sum(1 for row in rows if row[-1])
+    if regressions:
+        print(f"❌ {regressions} timings more than {args.tolerance:.0%} slower than {args.baseline}")
+        raise SystemExit(1)
+    print(f"✅ No timings more than {args.tolerance:.0%} slower than {args.baseline}")
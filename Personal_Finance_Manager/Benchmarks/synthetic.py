@@ -0,0 +1,207 @@
+"""
+Seeded synthetic users and transactions for the benchmarks
+
+Each user gets a monthly salary, a personal set of recurring bills and
+subscriptions on fixed days of the month, and day-to-day spending spread
+over --months of history. Day-to-day categories follow per-user shares
+around CATEGORY_PROFILES, amounts are log-normal around each category's
+typical amount, and a few purchases are ten times the usual size so the
+anomaly detector has something to find. The same seed always gives the
+same rows.
+
+    python benchmarks/synthetic.py [--users 3] [--rows 10000] [--months 24] [--seed 42]
+
+prints a summary; create_users() loads them into the configured database.
+"""
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collections import Counter
+from datetime import date, timedelta
+import numpy as np
+
+# Share of day-to-day expenses, typical amount, log-normal sigma, descriptions
+CATEGORY_PROFILES = {
+    'Food': (0.38, 18.0, 0.7, ['Grocery shopping at supermarket', 'Dinner at restaurant', 'Coffee at Starbucks',
+                               'Pizza delivery', 'Lunch at cafe', 'Bakery']),
+    'Transportation': (0.18, 14.0, 0.6, ['Uber ride to office', 'Gas station refill', 'Train ticket',
+                                         'Parking fee', 'Bus pass top up']),
+    'Entertainment': (0.11, 25.0, 0.6, ['Movie tickets', 'Concert tickets', 'Bowling night', 'Video game purchase']),
+    'Shopping': (0.15, 45.0, 0.9, ['Amazon online shopping', 'Clothing store purchase', 'Electronics store',
+                                   'Home decor purchase']),
+    'Healthcare': (0.06, 35.0, 0.8, ['Pharmacy medicines', 'Doctor consultation', 'Dental checkup']),
+    'Education': (0.05, 30.0, 0.9, ['Book store purchase', 'Online course fee', 'Stationery']),
+    'Other': (0.07, 20.0, 1.0, ['Gift for friend', 'Charity donation', 'Haircut', 'Dry cleaning']),
+}
+
+# Description, category, day of month, amount, relative month-to-month variation
+RECURRING = [
+    ('Monthly rent payment', 'Bills', 1, 1200.0, 0.0),
+    ('Electricity bill payment', 'Bills', 5, 90.0, 0.25),
+    ('Internet bill', 'Bills', 5, 65.0, 0.0),
+    ('Mobile phone bill', 'Bills', 6, 45.0, 0.1),
+    ('Water bill payment', 'Bills', 15, 30.0, 0.2),
+    ('Netflix subscription', 'Entertainment', 10, 15.99, 0.0),
+    ('Spotify subscription', 'Entertainment', 12, 9.99, 0.0),
+    ('Gym membership', 'Healthcare', 3, 40.0, 0.0),
+    ('Car insurance premium', 'Transportation', 20, 110.0, 0.0),
+]
+
+INCOME = [('Monthly Salary', 1, 3500.0), ('Freelance Work', 18, 600.0)]
+
+# Share of day-to-day purchases that are ten times the usual size
+SPIKE_SHARE = 0.005
+
+END_DATE = date(2025, 1, 1)
+
+
+def month_starts(months, end=END_DATE):
+    """First days of the `months` months before `end`, oldest first."""
+    last = end - timedelta(days=1)
+    first = date(last.year, last.month, 1)
+    starts = []
+    for _ in range(months):
+        starts.append(first)
+        first = (first - timedelta(days=1)).replace(day=1)
+    return starts[::-1]
+
+
+def scheduled_rows(rng, months, end=END_DATE):
+    """(amount, description, category, type, date) for salary, freelance income and recurring bills."""
+    salary = INCOME[0][2] * rng.uniform(0.6, 2.0)
+    bills = [bill for bill in RECURRING if bill[0] == 'Monthly rent payment' or rng.random() < 0.7]
+    freelance = rng.random() < 0.4
+    rows = []
+    for start in month_starts(months, end):
+        rows.append((round(salary, 2), INCOME[0][0], 'Income', 'income', start.replace(day=INCOME[0][1])))
+        if freelance and rng.random() < 0.5:
+            rows.append((round(INCOME[1][2] * rng.uniform(0.5, 1.5), 2), INCOME[1][0], 'Income', 'income',
+                         start.replace(day=INCOME[1][1])))
+        for description, category, day, amount, variation in bills:
+            amount *= 1 + variation * rng.uniform(-1, 1)
+            rows.append((round(amount, 2), description, category, 'expense', start.replace(day=day)))
+    return [row for row in rows if row[4] < end]
+
+
+def generate_transactions(user_id, rows, months=24, seed=42, end=END_DATE):
+    """Exactly `rows` (user_id, amount, description, category, type, date) tuples, oldest first."""
+    rng = np.random.default_rng([seed, user_id])
+    scheduled = scheduled_rows(rng, months, end)[-rows:] if rows else []
+    count = rows - len(scheduled)
+
+    names = list(CATEGORY_PROFILES)
+    shares = np.array([CATEGORY_PROFILES[name][0] for name in names])
+    # Every user spends a little differently
+    shares = rng.dirichlet(shares * 100)
+    categories = rng.choice(len(names), size=count, p=shares)
+
+    medians = np.array([CATEGORY_PROFILES[name][1] for name in names])
+    sigmas = np.array([CATEGORY_PROFILES[name][2] for name in names])
+    amounts = rng.lognormal(np.log(medians[categories]), sigmas[categories])
+    amounts[rng.random(count) < SPIKE_SHARE] *= 10
+    amounts = np.maximum(np.round(amounts, 2), 0.5)
+
+    first = month_starts(months, end)[0]
+    days = (end - first).days
+    # More spending at the weekend: a quarter of Monday-Thursday purchases move to Saturday
+    offsets = rng.integers(0, days, size=count)
+    weekday = (first.weekday() + offsets) % 7
+    moved = (weekday < 4) & (rng.random(count) < 0.25)
+    offsets[moved] = np.minimum(offsets[moved] + (5 - weekday[moved]), days - 1)
+    ordinals = first.toordinal() + offsets
+
+    pick = rng.random(count)
+    generated = []
+    for category, amount, ordinal, p in zip(categories.tolist(), amounts.tolist(), ordinals.tolist(), pick.tolist()):
+        name = names[category]
+        descriptions = CATEGORY_PROFILES[name][3]
+        generated.append((user_id, amount, descriptions[int(p * len(descriptions))], name, 'expense',
+                          date.fromordinal(ordinal)))
+    generated.extend((user_id,) + row for row in scheduled)
+    generated.sort(key=lambda row: row[5])
+    return generated
+
+
+def create_users(users, rows, months=24, seed=42, batch=5000, prefix='bench'):
+    """Insert `users` synthetic users with `rows` transactions each, plus budgets for the last month.
+
+    Writes straight to the configured database and rebuilds their rollups;
+    returns the new user ids. Everyone's password is "benchmark".
+    """
+    from werkzeug.security import generate_password_hash
+    from models.database import connection
+    from models.rollup import MonthlyRollup
+
+    password_hash = generate_password_hash("benchmark", method='pbkdf2:sha256:1000')
+    last_month = (END_DATE - timedelta(days=1)).strftime('%Y-%m')
+    user_ids = []
+    for number in range(users):
+        with connection() as conn:
+            cursor = conn.cursor()
+            name = f"{prefix}_{seed}_{rows}_{number}_{os.urandom(3).hex()}"
+            cursor.execute("INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                           (name, f"{name}@example.com", password_hash))
+            user_id = cursor.lastrowid
+            cursor.close()
+
+        transactions = generate_transactions(number + 1, rows, months, seed)
+        spent = Counter()
+        for start in range(0, len(transactions), batch):
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """INSERT INTO transactions (user_id, amount, description, category, type, transaction_date)
+                    VALUES (%s, %s, %s, %s, %s, %s)""",
+                    [(user_id,) + row[1:] for row in transactions[start:start + batch]]
+                )
+                cursor.close()
+        for row in transactions:
+            if row[4] == 'expense' and row[5].strftime('%Y-%m') == last_month:
+                spent[row[3]] += row[1]
+
+        with connection() as conn:
+            cursor = conn.cursor()
+            # Budgets around last month's spending, so some are over and some at risk
+            cursor.executemany(
+                "INSERT INTO budgets (user_id, category, amount, month_year) VALUES (%s, %s, %s, %s)",
+                [(user_id, category, round(total * (0.8 + 0.1 * i), 2), last_month)
+                 for i, (category, total) in enumerate(spent.most_common(5))]
+            )
+            cursor.close()
+        MonthlyRollup.rebuild(user_id)
+        user_ids.append(user_id)
+    return user_ids
+
+
+def delete_users(user_ids):
+    from models.database import connection
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM users WHERE id = %s", [(user_id,) for user_id in user_ids])
+        cursor.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seeded synthetic users and transactions")
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for user_id in range(1, args.users + 1):
+        rows = generate_transactions(user_id, args.rows, args.months, args.seed)
+        expenses = Counter()
+        income = 0.0
+        for row in rows:
+            if row[4] == 'expense':
+                expenses[row[3]] += row[1]
+            else:
+                income += row[1]
+        print(f"user {user_id}: {len(rows)} transactions {rows[0][5]}..{rows[-1][5]}, income {income:,.0f}")
+        total = sum(expenses.values())
+        for category, amount in expenses.most_common():
+            print(f"  {category:<15} {amount:>12,.0f}  {amount / total:.0%}")
@@ -0,0 +1,127 @@
+"""
+/api/transactions on a synthetic large user
+
+Creates a throwaway user with --rows transactions in the configured database,
+then requests /api/transactions through the Flask test client three ways:
+the old behaviour (every row loaded and jsonify'd at once), one keyset page,
+and ?stream=1. Reports time to first byte, total time, response size and the
+peak Python memory allocated while serving (tracemalloc). The user and their
+rows are deleted afterwards.
+
+    python benchmarks/transactions_api.py [--rows 100000] [--page-size 100]
+"""
+import argparse
+import random
+import sys
+import os
+import time
+import tracemalloc
+import uuid
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date, timedelta
+
+def create_user_with_rows(rows, seed=42, batch=5000):
+    from models.database import connection
+    from models.user import User
+
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    user = User.create(name, f"{name}@example.com", "benchmark")
+    rng = random.Random(seed)
+    categories = ['Food', 'Transportation', 'Entertainment', 'Shopping', 'Bills', 'Healthcare']
+    with connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, rows, batch):
+            cursor.executemany(
+                """INSERT INTO transactions (user_id, amount, description, category, type, transaction_date)
+                VALUES (%s, %s, %s, %s, %s, %s)""",
+                [(user.id, round(rng.uniform(1, 500), 2), f"synthetic transaction {i}",
+                  rng.choice(categories), 'expense', date(2015, 1, 1) + timedelta(days=rng.randint(0, 3650)))
+                 for i in range(start, min(rows, start + batch))]
+            )
+        cursor.close()
+    return user
+
+def delete_user(user):
+    from models.database import connection
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM users WHERE id = %s", (user.id,))
+        cursor.close()
+
+def legacy_view(user_id):
+    """The endpoint before pagination: load every row, then jsonify the list."""
+    from flask import jsonify
+    from models.transaction import Transaction
+
+    return jsonify([{
+        'id': t.id,
+        'amount': t.amount,
+        'description': t.description,
+        'category': t.category,
+        'type': t.type,
+        'date': t.transaction_date.strftime('%Y-%m-%d')
+    } for t in Transaction.get_user_transactions(user_id)])
+
+def measure(request_body, trace=False):
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    chunks = request_body()
+    first = next(chunks, b'')
+    first_byte = time.perf_counter() - started
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    total = time.perf_counter() - started
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'ttfb_seconds': first_byte, 'total_seconds': total, 'bytes': size, 'peak_mb': peak / 2**20}
+
+def run(rows=100000, page_size=100):
+    from app import app
+
+    user = create_user_with_rows(rows)
+    try:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+
+        def endpoint(query):
+            def body():
+                response = client.get(f"/api/transactions{query}", buffered=False)
+                return iter(response.response)
+            return body
+
+        def legacy():
+            with app.test_request_context():
+                response = legacy_view(user.id)
+                return iter(response.response)
+
+        modes = {
+            'legacy': legacy,
+            'page': endpoint(f"?limit={page_size}"),
+            'stream': endpoint("?stream=1"),
+        }
+        results = {'rows': rows}
+        for mode, body in modes.items():
+            timing = measure(body)
+            timing['peak_mb'] = measure(body, trace=True)['peak_mb']
+            results[mode] = timing
+        return results
+    finally:
+        delete_user(user)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="/api/transactions latency and memory")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.page_size)
+    print(f"{results['rows']} transactions")
+    for mode in ('legacy', 'page', 'stream'):
+        r = results[mode]
+        print(f"{mode:>7}: first byte {r['ttfb_seconds'] * 1000:.1f} ms  total {r['total_seconds']:.2f}s  "
+              f"{r['bytes'] / 2**20:.1f} MB body  peak {r['peak_mb']:.1f} MB allocated")
@@ -32,7 +32,9 @@ CREATE TABLE IF NOT EXISTS transactions (
     INDEX idx_user_id (user_id),
     INDEX idx_transaction_date (transaction_date),
     INDEX idx_category (category),
-    INDEX idx_type (type)
+    INDEX idx_type (type),
+    INDEX idx_user_date (user_id, transaction_date),
+    INDEX idx_user_type_date (user_id, type, transaction_date)
 );
 
 -- Budgets table
@@ -49,6 +51,29 @@ CREATE TABLE IF NOT EXISTS budgets (
     INDEX idx_user_month (user_id, month_year)
 );
 
+-- Monthly per-category rollups, maintained by Transaction.save()/delete()
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    user_id INT NOT NULL,
+    month_year VARCHAR(7) NOT NULL, -- Format: YYYY-MM
+    category VARCHAR(50) NOT NULL,
+    type ENUM('income', 'expense') NOT NULL,
+    total DECIMAL(14,2) NOT NULL DEFAULT 0,
+    txn_count INT NOT NULL DEFAULT 0,
+    sum_squares DECIMAL(24,4) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month_year, category, type),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Analytics bundles computed by `run.py precompute-insights`, served while the
+-- fingerprint still matches the user's transactions
+CREATE TABLE IF NOT EXISTS precomputed_insights (
+    user_id INT PRIMARY KEY,
+    fingerprint VARCHAR(100) NOT NULL,
+    insights MEDIUMTEXT NOT NULL,
+    computed_at DATETIME NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
 -- Financial goals table
 CREATE TABLE IF NOT EXISTS financial_goals (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -107,6 +132,13 @@ INSERT IGNORE INTO transactions (user_id, amount, description, category, type, t
 (1, 45.00, 'Book store purchase', 'Education', 'expense', '2024-11-13'),
 (1, 89.99, 'Online course subscription', 'Education', 'expense', '2024-11-14');
 
+-- Rollups for the demo user's sample transactions
+REPLACE INTO monthly_rollups (user_id, month_year, category, type, total, txn_count, sum_squares)
+SELECT user_id, SUBSTR(transaction_date, 1, 7), COALESCE(category, 'Other'), type,
+    SUM(amount), COUNT(*), SUM(amount * amount)
+FROM transactions WHERE user_id = 1
+GROUP BY user_id, SUBSTR(transaction_date, 1, 7), COALESCE(category, 'Other'), type;
+
 -- Sample budgets for demo user
 INSERT IGNORE INTO budgets (user_id, category, amount, month_year) VALUES
 (1, 'Food', 300.00, '2024-11'),
@@ -1,38 +1,259 @@
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import StandardScaler
 import joblib
+import hashlib
+import json
 import os
+import shutil
+import time
 from models.transaction import Transaction
+from models.validation import parse_amount, parse_description
+from config import Config
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class FlatForest:
+    """A fitted random forest flattened into a few contiguous arrays.
+
+    scikit-learn copies every tree into private memory when a forest is
+    unpickled, so each worker holds its own copy. These arrays are dumped
+    uncompressed and loaded with joblib's mmap_mode instead, letting all
+    workers share one page-cache copy. Predictions match the source forest.
+    """
+
+    def __init__(self, classes, feature, threshold, children_left, children_right, value, roots, n_features_in):
+        self.classes_ = classes
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.n_features_in_ = n_features_in
+
+    @classmethod
+    def from_forest(cls, forest):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            # Leaves keep -1 as their child so they can be told apart after shifting
+            lefts.append(np.where(tree.children_left == -1, -1, tree.children_left + offset))
+            rights.append(np.where(tree.children_right == -1, -1, tree.children_right + offset))
+            features.append(tree.feature)
+            thresholds.append(tree.threshold)
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :len(forest.classes_)]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+        
+        return cls(
+            classes=np.asarray(forest.classes_),
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            children_left=np.concatenate(lefts).astype(np.intp),
+            children_right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            n_features_in=forest.n_features_in_
+        )
+
+    def predict_proba(self, X, chunk_size=1024):
+        if sparse.issparse(X):
+            X = X.tocsr()
+        proba = np.zeros((X.shape[0], len(self.classes_)))
+        for start in range(0, X.shape[0], chunk_size):
+            proba[start:start + chunk_size] = self._predict_chunk(X[start:start + chunk_size])
+        return proba
+
+    def _predict_chunk(self, X):
+        # Trees compare float32 features against float64 thresholds
+        X = X.toarray() if sparse.issparse(X) else np.asarray(X)
+        X = X.astype(np.float32)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        # Plain ndarray views of the (possibly memory-mapped) arrays: same pages,
+        # but fancy indexing skips np.memmap's per-call wrapping
+        feature, threshold, value = (np.asarray(a) for a in (self.feature, self.threshold, self.value))
+        children_left, children_right = np.asarray(self.children_left), np.asarray(self.children_right)
+        
+        # Walk every (row, tree) pair down one level per step until all reach a leaf
+        nodes = np.repeat(np.asarray(self.roots)[np.newaxis, :], X.shape[0], axis=0)
+        while True:
+            left = children_left[nodes]
+            internal = left != -1
+            if not internal.any():
+                break
+            go_left = X[rows, feature[nodes]] <= threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, children_right[nodes]), nodes)
+        
+        leaf_values = value[nodes]
+        proba = np.zeros((X.shape[0], len(self.classes_)))
+        for tree in range(len(self.roots)):
+            proba += leaf_values[:, tree]
+        return proba / len(self.roots)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
 
 class ExpenseCategorizer:
-    def __init__(self):
+    """Categorizes transactions with a model saved under ml_models/trained_models.
+
+    Each save writes a complete artifact set (model, vectorizer, scaler and a
+    manifest of their checksums) into a new versioned directory, then switches
+    the CURRENT pointer file to it with one rename, so a loading worker sees
+    either the old set or the new one, never a mix.
+    """
+    ARTIFACT_NAMES = ('categorizer_model.joblib', 'vectorizer.joblib', 'scaler.joblib')
+
+    def __init__(self, load=True):
         self.model = None
         self.vectorizer = TfidfVectorizer(max_features=100, stop_words='english')
         self.scaler = StandardScaler()
         self.categories = ['Food', 'Transportation', 'Entertainment', 'Shopping', 'Bills', 'Healthcare', 'Education', 'Other']
-        self.model_path = 'ml_models/trained_models/categorizer_model.joblib'
-        self.vectorizer_path = 'ml_models/trained_models/vectorizer.joblib'
-        self.scaler_path = 'ml_models/trained_models/scaler.joblib'
+        # Fixed one-hot layout for the transaction type, shared by training and inference
+        self.transaction_types = ['expense', 'income']
+        self.models_dir = 'ml_models/trained_models'
+        self.current_path = os.path.join(self.models_dir, 'CURRENT')
+        # Version directory the artifacts were loaded from or saved to; None is
+        # the flat layout used before artifacts were versioned
+        self.version_dir = None
         
-        self.load_or_train_model()
+        # load=False gives an empty instance for CategorizerTrainer to fill in
+        if load:
+            self.load_or_train_model()
+
+    @property
+    def model_path(self):
+        return os.path.join(self.version_dir or self.models_dir, self.ARTIFACT_NAMES[0])
+
+    @property
+    def vectorizer_path(self):
+        return os.path.join(self.version_dir or self.models_dir, self.ARTIFACT_NAMES[1])
+
+    @property
+    def scaler_path(self):
+        return os.path.join(self.version_dir or self.models_dir, self.ARTIFACT_NAMES[2])
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.version_dir or self.models_dir, 'manifest.json')
+
+    def current_version(self):
+        """Directory CURRENT points at, or None when only the flat layout (or nothing) exists."""
+        try:
+            with open(self.current_path) as f:
+                return os.path.join(self.models_dir, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def has_artifacts(self):
+        return os.path.exists(self.current_path) or \
+            os.path.exists(os.path.join(self.models_dir, self.ARTIFACT_NAMES[0]))
 
     def load_or_train_model(self):
-        if os.path.exists(self.model_path):
+        if not self.has_artifacts():
+            self.train_with_sample_data()
+            return
+        
+        for attempt in range(Config.MODEL_LOAD_ATTEMPTS):
             try:
-                self.model = joblib.load(self.model_path)
-                self.vectorizer = joblib.load(self.vectorizer_path)
-                self.scaler = joblib.load(self.scaler_path)
+                self.load_artifacts()
+                if self.version_dir is None:
+                    # Flat pre-versioning layout: move it into a version of its own,
+                    # which also gives artifacts older than checksums a manifest
+                    training = self.load_manifest().get('training') if os.path.exists(self.manifest_path) else None
+                    self.save_artifacts(training=training)
                 print("✅ AI Model loaded successfully")
                 return
             except Exception as e:
-                print(f"❌ Error loading model: {e}")
+                print(f"❌ Error loading model (attempt {attempt + 1}): {e}")
+                time.sleep(0.2 * (attempt + 1))
+        
+        # Never overwrite saved artifacts here: they may be a retrained model
+        # that only this process failed to read
+        print("🔄 Serving the sample-data model from memory until the saved one loads")
+        self.train_with_sample_data(save=False)
+
+    def artifact_paths(self):
+        return [self.model_path, self.vectorizer_path, self.scaler_path]
+
+    def load_manifest(self):
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def verify_artifacts(self):
+        manifest = self.load_manifest()
+        for path in self.artifact_paths():
+            if manifest.get(os.path.basename(path)) != file_sha256(path):
+                raise ValueError(f"Checksum mismatch for {path}")
+
+    def load_artifacts(self, writable=False):
+        self.version_dir = self.current_version()
+        # Flat-layout artifacts saved before checksums existed have no manifest to check
+        legacy = self.version_dir is None and not os.path.exists(self.manifest_path)
+        if Config.MODEL_VERIFY_CHECKSUM and not legacy:
+            self.verify_artifacts()
         
-        self.train_with_sample_data()
+        # Uncompressed artifacts come back as read-only memory maps shared by all workers;
+        # writable=True is for training code that updates the model in place
+        mmap_mode = None if writable else Config.MODEL_MMAP_MODE
+        self.model = joblib.load(self.model_path, mmap_mode=mmap_mode)
+        self.vectorizer = joblib.load(self.vectorizer_path, mmap_mode=mmap_mode)
+        self.scaler = joblib.load(self.scaler_path, mmap_mode=mmap_mode)
+        
+        # Artifacts written before FlatForest hold the scikit-learn forest itself
+        if hasattr(self.model, 'estimators_'):
+            self.model = FlatForest.from_forest(self.model)
+
+    def save_artifacts(self, training=None):
+        """Write the artifacts and their manifest as a new version and make it current.
 
-    def train_with_sample_data(self):
+        `training` is extra metadata kept in the manifest.
+        """
+        name = f"v{time.strftime('%Y%m%d%H%M%S')}-{os.urandom(4).hex()}"
+        version_dir = os.path.join(self.models_dir, name)
+        os.makedirs(version_dir)
+        
+        manifest = {}
+        for artifact, filename in zip([self.model, self.vectorizer, self.scaler], self.ARTIFACT_NAMES):
+            path = os.path.join(version_dir, filename)
+            joblib.dump(artifact, path)
+            manifest[filename] = file_sha256(path)
+        if training is not None:
+            manifest['training'] = training
+        with open(os.path.join(version_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        
+        # The only step other workers can observe: one rename of the pointer
+        pointer = f"{self.current_path}.{os.getpid()}.tmp"
+        with open(pointer, 'w') as f:
+            f.write(name)
+        os.replace(pointer, self.current_path)
+        self.version_dir = version_dir
+        self.prune_versions()
+
+    def prune_versions(self):
+        """Delete all but the newest MODEL_KEEP_VERSIONS versions; workers may still be reading older ones."""
+        versions = [os.path.join(self.models_dir, name) for name in os.listdir(self.models_dir)
+                    if name.startswith('v') and os.path.isdir(os.path.join(self.models_dir, name))]
+        versions.sort(key=os.path.getmtime, reverse=True)
+        for path in versions[Config.MODEL_KEEP_VERSIONS:]:
+            if path != self.version_dir:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def train_with_sample_data(self, save=True):
         print("🔄 Training AI model with sample data...")
         
         sample_data = [
@@ -87,51 +308,117 @@ class ExpenseCategorizer:
             {"description": "bonus", "amount": 200.00, "type": "income", "category": "Income"},
         ]
         
-        df = pd.DataFrame(sample_data)
+        self.train(pd.DataFrame(sample_data), save=save)
+
+    def train(self, df, save=True):
         X = self.preprocess_features(df[['description', 'amount', 'type']])
         y = df['category']
         
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.model.fit(X, y)
+        forest = RandomForestClassifier(n_estimators=100, random_state=42)
+        forest.fit(X, y)
+        self.model = FlatForest.from_forest(forest)
         
-        os.makedirs('ml_models/trained_models', exist_ok=True)
-        joblib.dump(self.model, self.model_path)
-        joblib.dump(self.vectorizer, self.vectorizer_path)
-        joblib.dump(self.scaler, self.scaler_path)
+        if save:
+            self.save_artifacts()
         
-        print("✅ AI Model trained and saved successfully")
-        print(f"✅ Model accuracy: {self.model.score(X, y):.2f}")
+        print(f"✅ AI Model trained{' and saved' if save else ''} successfully")
+        print(f"✅ Model accuracy: {forest.score(X, y):.2f}")
+
+    def encode_types(self, transaction_types):
+        return np.array([[float(t == name) for name in self.transaction_types] for t in transaction_types])
 
     def preprocess_features(self, data):
+        """Fit the vectorizer and scaler on training data and return its features."""
         descriptions = data['description'].fillna('')
         text_features = self.vectorizer.fit_transform(descriptions).toarray()
         
         numerical_features = data[['amount']].values
         numerical_features = self.scaler.fit_transform(numerical_features)
         
-        type_features = pd.get_dummies(data['type']).values
+        type_features = self.encode_types(data['type'])
         
         features = np.hstack([text_features, numerical_features, type_features])
         return features
 
+    def transform_features(self, descriptions, amounts, transaction_types):
+        """Featurize new rows with the already-fitted vectorizer and scaler.
+
+        Used at inference time: nothing is refitted, no DataFrame is built and
+        the TF-IDF output stays sparse.
+        """
+        text_features = self.vectorizer.transform([(d or '').lower() for d in descriptions])
+        
+        amounts = np.asarray(amounts, dtype=float).reshape(-1, 1)
+        numerical_features = (amounts - self.scaler.mean_) / self.scaler.scale_
+        
+        type_features = self.encode_types(transaction_types)
+        
+        return sparse.hstack([text_features, numerical_features, type_features], format='csr')
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(X)
+
+    def fallback_category(self, transaction_type):
+        return "Other" if transaction_type == "expense" else "Income"
+
+    def predict_categories(self, batch, with_confidence=False):
+        """Categorize a list of {description, amount, type} dicts in one model pass.
+
+        Returns one category per row, or {category, confidence} dicts when
+        with_confidence is set. Results match predict_category row for row.
+        A row whose description is not a string or whose amount is not a
+        finite number gets the fallback category (and an 'error'
+        with_confidence) without affecting the others.
+        """
+        types = [row.get('type', 'expense') for row in batch]
+        categories = [self.fallback_category(t) for t in types]
+        confidences = [0.0] * len(batch)
+        
+        errors = {}
+        rows, descriptions, amounts = [], [], []
+        for i, row in enumerate(batch):
+            try:
+                description = parse_description(row.get('description'))
+                amount = parse_amount(row.get('amount'))
+                rows.append(i)
+                descriptions.append(description)
+                amounts.append(amount)
+            except ValueError as e:
+                errors[i] = str(e)
+        
+        if self.model is not None and rows:
+            try:
+                X = self.transform_features(
+                    descriptions,
+                    amounts,
+                    [types[i] for i in rows]
+                )
+                proba = self.predict_proba(X)
+                best = proba.argmax(axis=1)
+                for i, category, confidence in zip(rows, self.model.classes_[best], proba[np.arange(len(rows)), best]):
+                    categories[i] = str(category)
+                    confidences[i] = confidence
+            except Exception as e:
+                print(f"❌ Error predicting categories: {e}")
+        
+        if not with_confidence:
+            return categories
+        predictions = [{'category': category, 'confidence': round(float(confidence), 4)}
+                       for category, confidence in zip(categories, confidences)]
+        for i, error in errors.items():
+            predictions[i]['error'] = error
+        return predictions
+
     def predict_category(self, description, amount, transaction_type):
-        if self.model is None:
-            return "Other" if transaction_type == "expense" else "Income"
+        return self.predict_categories([{
+            'description': description,
+            'amount': amount,
+            'type': transaction_type
+        }])[0]
+
+    def retrain_model(self, full=False):
+        """Train on the transactions table, continuing from the last run unless `full`."""
+        from ml_models.categorizer_training import CategorizerTrainer
         
-        try:
-            data = pd.DataFrame([{
-                'description': description.lower(),
-                'amount': amount,
-                'type': transaction_type
-            }])
-            
-            X = self.preprocess_features(data)
-            prediction = self.model.predict(X)[0]
-            return prediction
-        except Exception as e:
-            print(f"❌ Error predicting category: {e}")
-            return "Other" if transaction_type == "expense" else "Income"
-
-    def retrain_model(self):
         print("🔄 Retraining AI model with new data...")
-        self.load_or_train_model()
\ No newline at end of file
+        return CategorizerTrainer().run(full=full)
\ No newline at end of file
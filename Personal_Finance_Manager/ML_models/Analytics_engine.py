@@ -0,0 +1,150 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from models.cache import get_cache, get_data_version
+from models.insights import PrecomputedInsights
+from models.transaction_columns import TransactionColumns
+from ml_models.model_registry import get_predictor, get_anomaly_detector, get_analytics_engine
+
+FORECAST_HORIZONS = range(1, 13)
+
+
+def analytics_cache():
+    return get_cache('analytics', maxsize=Config.ANALYTICS_CACHE_SIZE, ttl=Config.ANALYTICS_CACHE_TTL)
+
+
+def cached_bundle(user_id):
+    """The user's cached analytics bundle if their data has not changed since, or None.
+
+    Does not load any models.
+    """
+    bundle = analytics_cache().get(user_id)
+    if bundle is not None and bundle['version'] != get_data_version(user_id):
+        return None
+    return bundle
+
+
+def ready_bundle(user_id):
+    """The cached bundle, else the precomputed one if still current, else None; computes nothing."""
+    bundle = cached_bundle(user_id)
+    if bundle is not None:
+        return bundle
+
+    version = get_data_version(user_id)
+    bundle = PrecomputedInsights.get_current(user_id)
+    if bundle is not None:
+        bundle['version'] = version
+        analytics_cache().set(user_id, bundle)
+    return bundle
+
+
+class AnalyticsEngine:
+    """Everything the analytics page shows, computed from one fetch of the user's transactions.
+
+    The transactions are loaded once as TransactionColumns and shared by the
+    trend summary, anomaly detection, the 1-12 month forecasts and the category
+    totals. The resulting bundle is cached per user, tagged with their data
+    version, so the page's follow-up JSON requests do not go back to the
+    database until the user's transactions change.
+    """
+    def __init__(self, predictor=None, detector=None):
+        self.predictor = predictor or get_predictor()
+        self.detector = detector or get_anomaly_detector()
+
+    def build(self, user_id, columns=None, keep_model=True):
+        """The user's bundle, uncached; pass `columns` to skip the database fetch.
+
+        keep_model=False skips keeping the user's fitted anomaly model around,
+        for batch jobs that will not score their new transactions.
+        """
+        if columns is None:
+            columns = TransactionColumns.load(user_id)
+
+        forecasts = self.predictor.predict_spending_horizons(columns, FORECAST_HORIZONS)
+        return {
+            'trends': self.predictor.analyze_spending_trends_from_columns(columns),
+            'anomalies': self.detector.detect_anomalies(columns, user_id=user_id if keep_model else None),
+            'predictions': forecasts[0] if forecasts else None,
+            # None when there is too little data, as forecast_from_daily_totals returns
+            'forecasts': forecasts if forecasts and 'message' not in forecasts[0] else None,
+            'category_totals': columns.category_totals('expense'),
+            'transaction_count': len(columns),
+            'computed_at': time.time(),
+        }
+
+    def compute(self, user_id, columns=None):
+        """Compute and cache the user's bundle."""
+        # Read the version first, so a write during the computation leaves this bundle marked stale
+        version = get_data_version(user_id)
+        bundle = self.build(user_id, columns)
+        bundle['version'] = version
+        analytics_cache().set(user_id, bundle)
+        return bundle
+
+    def get_bundle(self, user_id):
+        """The cached bundle, else the precomputed one if still current, else one computed now."""
+        bundle = ready_bundle(user_id)
+        if bundle is None:
+            bundle = self.compute(user_id)
+        return bundle
+
+    def invalidate(self, user_id):
+        analytics_cache().delete(user_id)
+
+
+def analytics_job(user_id):
+    """Job handler: compute the user's bundle, cache it here and store it for every other process."""
+    # Fingerprint first, so a write during the computation leaves the stored bundle stale
+    fingerprint = PrecomputedInsights.current_fingerprint(user_id)
+    bundle = get_analytics_engine().compute(user_id)
+    if fingerprint is not None:
+        PrecomputedInsights.save_many([(user_id, fingerprint, bundle)])
+    return {'transaction_count': bundle['transaction_count']}
+
+
+def precompute_user(user_id):
+    """Process-pool task: one user's bundle, or None if it failed."""
+    try:
+        return get_analytics_engine().build(user_id, keep_model=False)
+    except Exception as e:
+        print(f"Error precomputing insights for user {user_id}: {e}")
+        return None
+
+
+def precompute_insights(workers=None, chunk_size=None, force=False):
+    """Recompute stored insights for every user whose transactions changed since the last run.
+
+    Users are scanned in id order, `chunk_size` at a time; each chunk's changed
+    users are fanned out over a pool of `workers` processes and their results
+    written back in one statement. Returns counts and timing.
+    """
+    workers = workers or Config.PRECOMPUTE_WORKERS
+    chunk_size = chunk_size or Config.PRECOMPUTE_CHUNK_SIZE
+    report = {'users_scanned': 0, 'users_computed': 0, 'users_failed': 0, 'workers': workers}
+    started = time.perf_counter()
+
+    # spawn, not fork: each worker opens its own connection pool and loads its own models
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        after_id = 0
+        while True:
+            changed, last_id, scanned = PrecomputedInsights.changed_users(after_id, chunk_size, force)
+            if last_id is None:
+                break
+            report['users_scanned'] += scanned
+            after_id = last_id
+
+            user_ids = [user_id for user_id, _ in changed]
+            bundles = executor.map(precompute_user, user_ids, chunksize=max(1, len(user_ids) // (workers * 4)))
+            results = []
+            for (user_id, fingerprint), bundle in zip(changed, bundles):
+                if bundle is None:
+                    report['users_failed'] += 1
+                else:
+                    results.append((user_id, fingerprint, bundle))
+            PrecomputedInsights.save_many(results)
+            report['users_computed'] += len(results)
+
+    report['seconds'] = time.perf_counter() - started
+    report['users_per_second'] = report['users_computed'] / report['seconds'] if report['seconds'] else 0.0
+    return report
@@ -1,49 +1,128 @@
 import pandas as pd
 import numpy as np
+import threading
+from collections import OrderedDict
 from sklearn.ensemble import IsolationForest
 from datetime import datetime, timedelta
+from config import Config
+from models.transaction_columns import TransactionColumns
 
 class AnomalyDetector:
-    def __init__(self):
+    def __init__(self, max_cached_users=None):
         self.model = IsolationForest(contamination=0.1, random_state=42)
+        # user_id -> (data version, fitted IsolationForest, anomalies), least recently used first
+        self.user_models = OrderedDict()
+        self.max_cached_users = max_cached_users or Config.ANOMALY_MODEL_CACHE_SIZE
+        self.lock = threading.Lock()
     
-    def detect_anomalies(self, transactions):
+    def new_model(self):
+        return IsolationForest(contamination=0.1, random_state=42)
+    
+    def to_columns(self, transactions):
+        if isinstance(transactions, TransactionColumns):
+            return transactions
+        return TransactionColumns.from_transactions(transactions)
+    
+    def build_features(self, transactions):
+        columns = self.to_columns(transactions)
+        category_numeric = np.array([self.category_to_numeric(c) for c in columns.categories], dtype=float)
+        return np.column_stack([
+            columns.amounts,
+            columns.description_lengths,
+            category_numeric[columns.category_codes],
+            columns.ordinals
+        ]).astype(float)
+    
+    def data_version(self, columns):
+        # Any insert or delete changes the count or the newest id; edits usually change the total
+        return (
+            len(columns),
+            int(columns.ids.max()),
+            int(columns.amount_cents.sum())
+        )
+    
+    def get_cached(self, user_id):
+        with self.lock:
+            entry = self.user_models.get(user_id)
+            if entry is not None:
+                self.user_models.move_to_end(user_id)
+            return entry
+    
+    def cache_model(self, user_id, version, model, anomalies):
+        with self.lock:
+            self.user_models[user_id] = (version, model, anomalies)
+            self.user_models.move_to_end(user_id)
+            while len(self.user_models) > self.max_cached_users:
+                self.user_models.popitem(last=False)
+    
+    def invalidate(self, user_id):
+        with self.lock:
+            self.user_models.pop(user_id, None)
+    
+    def detect_anomalies(self, transactions, user_id=None, version=None):
+        """Flag unusual expenses in a list of Transactions or a TransactionColumns.
+
+        With a user_id the fitted model and its result are cached per user and
+        reused until the data version changes (by default derived from the
+        user's expense count, newest id and total).
+        """
         if len(transactions) < 10:
             return []
         
-        expense_transactions = [t for t in transactions if t.type == 'expense']
+        columns = self.to_columns(transactions)
+        expenses = columns.select(columns.is_expense)
         
-        if len(expense_transactions) < 5:
+        if len(expenses) < 5:
             return []
         
-        features = []
-        transaction_info = []
+        if user_id is not None:
+            if version is None:
+                version = self.data_version(expenses)
+            cached = self.get_cached(user_id)
+            if cached is not None and cached[0] == version:
+                return cached[2]
         
-        for transaction in expense_transactions:
-            features.append([
-                transaction.amount,
-                len(transaction.description),
-                self.category_to_numeric(transaction.category),
-                self.date_to_numeric(transaction.transaction_date)
-            ])
-            transaction_info.append(transaction)
-        
-        X = np.array(features)
-        anomalies = self.model.fit_predict(X)
+        X = self.build_features(expenses)
+        model = self.new_model()
+        anomalies = model.fit_predict(X)
         
         anomalous_transactions = []
-        for i, is_anomaly in enumerate(anomalies):
-            if is_anomaly == -1:
-                anomalous_transactions.append({
-                    'description': transaction_info[i].description,
-                    'amount': transaction_info[i].amount,
-                    'category': transaction_info[i].category,
-                    'date': transaction_info[i].transaction_date,
-                    'reason': self.get_anomaly_reason(transaction_info[i])
-                })
+        for i in np.flatnonzero(anomalies == -1):
+            transaction = expenses.row(i)
+            anomalous_transactions.append({
+                'description': transaction.description,
+                'amount': transaction.amount,
+                'category': transaction.category,
+                'date': transaction.transaction_date,
+                'reason': self.get_anomaly_reason(transaction)
+            })
+        
+        if user_id is not None:
+            self.cache_model(user_id, version, model, anomalous_transactions)
+        else:
+            self.model = model
         
         return anomalous_transactions
     
+    def score_transaction(self, user_id, transaction):
+        """Score one new expense against the user's cached model without refitting.
+
+        Returns None when the user has no fitted model yet or the transaction is income.
+        """
+        if transaction.type != 'expense':
+            return None
+        
+        cached = self.get_cached(user_id)
+        if cached is None:
+            return None
+        
+        score = cached[1].decision_function(self.build_features([transaction]))[0]
+        return {
+            'score': float(score),
+            'is_anomaly': bool(score < 0),
+            'reason': self.get_anomaly_reason(transaction)
+        }
+    
     def category_to_numeric(self, category):
         category_mapping = {
             'Food': 1, 'Transportation': 2, 'Entertainment': 3,
@@ -53,8 +132,7 @@ class AnomalyDetector:
         return category_mapping.get(category, 8)
     
     def date_to_numeric(self, date):
-        if isinstance(date, str):
-            date = datetime.strptime(date, '%Y-%m-%d')
+        # Transaction normalizes transaction_date to a date on construction
         return date.toordinal()
     
     def get_anomaly_reason(self, transaction):
@@ -71,13 +149,12 @@ class AnomalyDetector:
         
         return ", ".join(reasons) if reasons else "Unusual spending pattern"
     
-    def calculate_anomaly_score(self, transaction):
-        features = np.array([[
-            transaction.amount,
-            len(transaction.description),
-            self.category_to_numeric(transaction.category),
-            self.date_to_numeric(transaction.transaction_date)
-        ]])
+    def calculate_anomaly_score(self, transaction, user_id=None):
+        model = self.model
+        if user_id is not None:
+            cached = self.get_cached(user_id)
+            if cached is not None:
+                model = cached[1]
         
-        score = self.model.decision_function(features)[0]
+        score = model.decision_function(self.build_features([transaction]))[0]
         return score
\ No newline at end of file
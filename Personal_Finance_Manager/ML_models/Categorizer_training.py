@@ -0,0 +1,139 @@
+import time
+from datetime import datetime
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from config import Config
+from models.transaction import Transaction
+from ml_models.ai_categorizer import ExpenseCategorizer
+from ml_models.model_registry import replace_model, is_loaded
+
+class CategorizerTrainer:
+    """Trains the categorizer on the transactions table without holding the table in memory.
+
+    Labelled rows are read `chunk_size` at a time in id order and fed to an
+    SGDClassifier with partial_fit. Descriptions go through a HashingVectorizer,
+    which has no vocabulary to grow, and the amount scaler is fitted on the
+    first chunk and then kept, so memory depends on the chunk size only. Rows
+    whose id is a multiple of `holdout_modulo` are never trained on; up to
+    `max_holdout` of them measure accuracy at the end.
+
+    The newest id seen is saved in the manifest as a watermark, and the next
+    run continues the same model from there with only newer rows. The result
+    is saved like any other categorizer and swapped into the model registry,
+    so requests already in flight finish with the model they started with.
+    """
+    def __init__(self, chunk_size=None, holdout_modulo=None, max_holdout=None,
+                 fetch_batch=Transaction.get_labelled_batch, fetch_categories=Transaction.get_categories):
+        self.chunk_size = chunk_size or Config.RETRAIN_CHUNK_SIZE
+        self.holdout_modulo = holdout_modulo or Config.RETRAIN_HOLDOUT_MODULO
+        self.max_holdout = Config.RETRAIN_MAX_HOLDOUT if max_holdout is None else max_holdout
+        self.fetch_batch = fetch_batch
+        self.fetch_categories = fetch_categories
+
+    def new_categorizer(self):
+        categorizer = ExpenseCategorizer(load=False)
+        categorizer.vectorizer = HashingVectorizer(n_features=Config.CATEGORIZER_HASH_FEATURES,
+                                                   ngram_range=(1, 2), alternate_sign=False)
+        # Fitted on the first chunk
+        categorizer.scaler = None
+        categorizer.model = SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+        return categorizer
+
+    def resume(self):
+        """(categorizer, training metadata) saved by a previous run, or (None, None)."""
+        categorizer = ExpenseCategorizer(load=False)
+        try:
+            categorizer.load_artifacts(writable=True)
+            training = categorizer.load_manifest().get('training')
+        except Exception:
+            return None, None
+        if training is None or not hasattr(categorizer.model, 'partial_fit'):
+            # Still the bundled sample-data forest
+            return None, None
+        return categorizer, training
+
+    def evaluate(self, categorizer, rows):
+        descriptions, amounts, types, labels = zip(*rows)
+        predicted = categorizer.model.predict(categorizer.transform_features(descriptions, amounts, types))
+        return float(np.mean(predicted == np.asarray(labels)))
+
+    def run(self, full=False):
+        """Train from scratch (`full`) or continue from the saved watermark; returns a report."""
+        categorizer, previous = (None, None) if full else self.resume()
+        if categorizer is None:
+            categorizer, previous = self.new_categorizer(), None
+            # partial_fit needs every class up front
+            classes = sorted(set(self.fetch_categories()) | set(categorizer.categories) | {'Income'})
+        else:
+            classes = list(categorizer.model.classes_)
+        known = set(classes)
+
+        report = {
+            'mode': 'incremental' if previous else 'full',
+            'watermark_from': previous['watermark'] if previous else 0,
+            'rows_trained': 0,
+            'rows_held_out': 0,
+            'rows_skipped': 0,
+            'chunks': 0,
+        }
+        holdout = []
+        after_id = report['watermark_from']
+        started = time.perf_counter()
+
+        while True:
+            rows = self.fetch_batch(after_id, self.chunk_size)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            report['chunks'] += 1
+
+            train = []
+            for transaction_id, description, amount, transaction_type, category in rows:
+                row = (description or '', float(amount), transaction_type, category)
+                if category not in known:
+                    # A category the continuing model has no output for; picked up by the next full run
+                    report['rows_skipped'] += 1
+                elif transaction_id % self.holdout_modulo == 0:
+                    report['rows_held_out'] += 1
+                    if len(holdout) < self.max_holdout:
+                        holdout.append(row)
+                else:
+                    train.append(row)
+            if not train:
+                continue
+
+            descriptions, amounts, types, labels = zip(*train)
+            if categorizer.scaler is None:
+                categorizer.scaler = StandardScaler().fit(np.asarray(amounts).reshape(-1, 1))
+            X = categorizer.transform_features(descriptions, amounts, types)
+            categorizer.model.partial_fit(X, labels, classes=classes)
+            report['rows_trained'] += len(train)
+
+        seconds = time.perf_counter() - started
+        report['seconds'] = seconds
+        report['rows_per_second'] = (report['rows_trained'] + report['rows_held_out']) / seconds if seconds else 0.0
+        report['watermark'] = after_id
+        report['holdout_accuracy'] = self.evaluate(categorizer, holdout) if holdout else None
+
+        total_trained = report['rows_trained'] + (previous['rows_trained'] if previous else 0)
+        if report['rows_trained'] == 0 or total_trained < Config.RETRAIN_MIN_ROWS:
+            report['swapped'] = False
+            return report
+
+        categorizer.save_artifacts(training={
+            'watermark': after_id,
+            'rows_trained': total_trained,
+            'holdout_accuracy': report['holdout_accuracy'],
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+        })
+        if is_loaded('categorizer'):
+            replace_model('categorizer', categorizer)
+        report['swapped'] = True
+        return report
+
+
+def retrain_job(user_id=None, full=False):
+    """Job handler: retrain in the worker's process, which then serves the new model."""
+    return CategorizerTrainer().run(full=full)
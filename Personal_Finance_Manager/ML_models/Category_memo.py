@@ -0,0 +1,230 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from models.transaction import Transaction
+
+def normalize_description(description):
+    """Lowercase words of a description, without numbers and punctuation.
+
+    "UBER *TRIP 4411" and "Uber trip" both become ('uber', 'trip'), so card
+    references and amounts in statement text do not defeat the memo.
+    """
+    return tuple(re.findall(r"[^\W\d_]+", (description or '').lower().replace("'", "")))
+
+class DescriptionIndex:
+    """Normalized description -> category, with a word-prefix index for near-exact matches.
+
+    Entries are kept in LRU order up to `maxsize`. Every entry also counts its
+    category under its first 1..CATEGORY_MEMO_PREFIX_TOKENS words, so "uber
+    ride home" can be answered from "uber ride to office" when the descriptions
+    starting with "uber ride" (nearly) all agree.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.prefixes = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _index(self, key, category, delta):
+        transaction_type, tokens = key
+        for n in range(1, min(len(tokens), Config.CATEGORY_MEMO_PREFIX_TOKENS) + 1):
+            prefix = (transaction_type, tokens[:n])
+            counts = self.prefixes.setdefault(prefix, {})
+            counts[category] = counts.get(category, 0) + delta
+            if counts[category] <= 0:
+                del counts[category]
+                if not counts:
+                    del self.prefixes[prefix]
+
+    def add(self, transaction_type, tokens, category):
+        key = (transaction_type, tokens)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self._index(key, old, -1)
+        self.entries[key] = category
+        self._index(key, category, 1)
+        while len(self.entries) > self.maxsize:
+            self._index(*self.entries.popitem(last=False), -1)
+
+    def lookup(self, transaction_type, tokens):
+        """(category, 'exact' or 'prefix'), or (None, None) on a miss."""
+        key = (transaction_type, tokens)
+        category = self.entries.get(key)
+        if category is not None:
+            self.entries.move_to_end(key)
+            return category, 'exact'
+
+        shortest = min(len(tokens), Config.CATEGORY_MEMO_MIN_PREFIX_TOKENS)
+        for n in range(min(len(tokens), Config.CATEGORY_MEMO_PREFIX_TOKENS), shortest - 1, -1):
+            counts = self.prefixes.get((transaction_type, tokens[:n]))
+            if counts:
+                # Only the longest known prefix decides; shorter ones are less specific
+                category, count = max(counts.items(), key=lambda item: item[1])
+                if count >= Config.CATEGORY_MEMO_MIN_SHARE * sum(counts.values()):
+                    return category, 'prefix'
+                break
+        return None, None
+
+class CategoryMemo:
+    """Remembers description -> category so repeated descriptions skip the categorizer.
+
+    Each user's memo is loaded from their own most recent descriptions the
+    first time they add a transaction, then kept up to date with what they
+    save. A global memo of merchants that several users categorized the same
+    way answers descriptions the user has not used yet. Only descriptions
+    neither memo knows go to the model, in one batch.
+
+    Recategorizing a transaction drops that user's memo in this process;
+    other worker processes reload theirs after CATEGORY_MEMO_TTL seconds.
+    The global memo is a query over every user's transactions, so it is
+    rebuilt on a background thread; lookups use the previous one (or none,
+    at start-up) until it is ready.
+    """
+    SOURCES = ('user_exact', 'user_prefix', 'global_exact', 'global_prefix', 'model')
+
+    def __init__(self, categorizer=None, fetch_history=Transaction.get_description_history,
+                 fetch_merchants=Transaction.get_frequent_merchants, clock=time.monotonic):
+        self.categorizer = categorizer
+        self.fetch_history = fetch_history
+        self.fetch_merchants = fetch_merchants
+        self.clock = clock
+        self.users = OrderedDict()
+        self.global_index = None
+        self.global_expires = 0
+        self.refresh_thread = None
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(self.SOURCES, 0)
+
+    def get_categorizer(self):
+        if self.categorizer is None:
+            from ml_models.model_registry import get_categorizer
+            self.categorizer = get_categorizer()
+        return self.categorizer
+
+    def user_index(self, user_id):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is not None and entry[0] > self.clock():
+                self.users.move_to_end(user_id)
+                return entry[1]
+
+        index = DescriptionIndex(Config.CATEGORY_MEMO_USER_ENTRIES)
+        for description, transaction_type, category in self.fetch_history(user_id, Config.CATEGORY_MEMO_USER_ENTRIES):
+            tokens = normalize_description(description)
+            if tokens:
+                index.add(transaction_type, tokens, category)
+
+        with self.lock:
+            self.users[user_id] = (self.clock() + Config.CATEGORY_MEMO_TTL, index)
+            self.users.move_to_end(user_id)
+            while len(self.users) > Config.CATEGORY_MEMO_USERS:
+                self.users.popitem(last=False)
+        return index
+
+    def merchant_index(self):
+        """The current global memo, or None before the first one is built.
+
+        Starts a rebuild in the background when it is missing or expired.
+        """
+        with self.lock:
+            stale = self.global_index is None or self.global_expires <= self.clock()
+            if stale and (self.refresh_thread is None or not self.refresh_thread.is_alive()):
+                self.refresh_thread = threading.Thread(target=self.refresh_merchants, name="merchant-memo",
+                                                       daemon=True)
+                self.refresh_thread.start()
+            return self.global_index
+
+    def refresh_merchants(self):
+        """Build the global memo from the transactions table and swap it in."""
+        # Several raw descriptions can normalize to one key; keep it only if most users agree
+        votes = {}
+        for description, transaction_type, category, users in self.fetch_merchants(
+                Config.CATEGORY_MEMO_MIN_USERS, Config.CATEGORY_MEMO_GLOBAL_ENTRIES):
+            tokens = normalize_description(description)
+            if tokens:
+                counts = votes.setdefault((transaction_type, tokens), {})
+                counts[category] = counts.get(category, 0) + users
+
+        index = DescriptionIndex(Config.CATEGORY_MEMO_GLOBAL_ENTRIES)
+        for (transaction_type, tokens), counts in votes.items():
+            category, users = max(counts.items(), key=lambda item: item[1])
+            if users >= Config.CATEGORY_MEMO_MIN_SHARE * sum(counts.values()):
+                index.add(transaction_type, tokens, category)
+
+        with self.lock:
+            self.global_index, self.global_expires = index, self.clock() + Config.CATEGORY_MEMO_GLOBAL_TTL
+        return index
+
+    def predict_categories(self, user_id, batch):
+        """One category per {description, amount, type} dict, like ExpenseCategorizer.predict_categories."""
+        categories = [None] * len(batch)
+        keys = [(row.get('type', 'expense'), normalize_description(row.get('description'))) for row in batch]
+        user_index = self.user_index(user_id)
+        merchant_index = self.merchant_index()
+        scopes = [('user', user_index)] + ([('global', merchant_index)] if merchant_index is not None else [])
+
+        sources = []
+        with self.lock:
+            for i, (transaction_type, tokens) in enumerate(keys):
+                if not tokens:
+                    continue
+                for scope, index in scopes:
+                    category, match = index.lookup(transaction_type, tokens)
+                    if category is not None:
+                        categories[i] = category
+                        sources.append(f"{scope}_{match}")
+                        break
+
+        misses = [i for i, category in enumerate(categories) if category is None]
+        if misses:
+            predicted = self.get_categorizer().predict_categories([batch[i] for i in misses])
+            for i, category in zip(misses, predicted):
+                categories[i] = category
+
+        with self.lock:
+            for source in sources:
+                self.counts[source] += 1
+            self.counts['model'] += len(misses)
+        return categories
+
+    def predict_category(self, user_id, description, amount, transaction_type):
+        return self.predict_categories(user_id, [{
+            'description': description,
+            'amount': amount,
+            'type': transaction_type
+        }])[0]
+
+    def learn(self, user_id, description, transaction_type, category):
+        """Record a saved transaction's category in the user's memo, if it is loaded."""
+        tokens = normalize_description(description)
+        with self.lock:
+            entry = self.users.get(user_id)
+            if tokens and category and entry is not None:
+                entry[1].add(transaction_type, tokens, category)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.users.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.users.clear()
+            self.global_index = None
+
+    def stats(self):
+        """Lookups answered by each source since start-up, and the share that skipped the model."""
+        with self.lock:
+            counts = dict(self.counts)
+            users = len(self.users)
+            merchants = len(self.global_index) if self.global_index is not None else 0
+        lookups = sum(counts.values())
+        return dict(counts, lookups=lookups, users=users, merchants=merchants,
+                    hit_rate=(lookups - counts['model']) / lookups if lookups else 0.0)
+
+    def reset_stats(self):
+        with self.lock:
+            self.counts = dict.fromkeys(self.SOURCES, 0)
@@ -0,0 +1,76 @@
+import importlib
+import threading
+import time
+
+# Models are imported by name on first use, so importing the web app does not
+# pull in scikit-learn or pandas until a request actually needs a model.
+MODEL_FACTORIES = {
+    'categorizer': ('ml_models.ai_categorizer', 'ExpenseCategorizer'),
+    'predictor': ('ml_models.spending_predictor', 'SpendingPredictor'),
+    'anomaly_detector': ('ml_models.anomaly_detector', 'AnomalyDetector'),
+    'analytics_engine': ('ml_models.analytics_engine', 'AnalyticsEngine'),
+    'category_memo': ('ml_models.category_memo', 'CategoryMemo'),
+}
+
+_models = {}
+_load_times = {}
+_locks = {name: threading.Lock() for name in MODEL_FACTORIES}
+
+
+def get_model(name):
+    """Return the process-wide instance of a model, loading it once on first use."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _locks[name]:
+        model = _models.get(name)
+        if model is None:
+            started = time.perf_counter()
+            module_name, class_name = MODEL_FACTORIES[name]
+            model_class = getattr(importlib.import_module(module_name), class_name)
+            model = model_class()
+            _load_times[name] = time.perf_counter() - started
+            _models[name] = model
+            print(f"✅ Loaded {name} in {_load_times[name]:.2f}s")
+    return model
+
+
+def get_categorizer():
+    return get_model('categorizer')
+
+
+def get_predictor():
+    return get_model('predictor')
+
+
+def get_anomaly_detector():
+    return get_model('anomaly_detector')
+
+
+def get_analytics_engine():
+    return get_model('analytics_engine')
+
+
+def get_category_memo():
+    return get_model('category_memo')
+
+
+def replace_model(name, model):
+    """Swap in a new instance; requests already holding the old one finish with it."""
+    with _locks[name]:
+        _models[name] = model
+
+
+def preload_models():
+    for name in MODEL_FACTORIES:
+        get_model(name)
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def load_times():
+    """Seconds spent loading (or training) each model loaded so far."""
+    return dict(_load_times)
@@ -1,14 +1,56 @@
-import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
 from datetime import datetime, timedelta
 import json
 
-class SpendingPredictor:
+class LinearTrend:
+    """Least-squares line y = intercept + slope * x, accumulated one point at a time.
+
+    Keeps running means and centered sums (Welford), which gives the same fit as
+    LinearRegression on a single feature without storing the points.
+    """
     def __init__(self):
-        self.model = LinearRegression()
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+    
+    def add(self, x, y):
+        self.n += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.n
+        dy = y - self.mean_y
+        self.mean_y += dy / self.n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+    
+    @property
+    def slope(self):
+        return self.c_xy / self.m2_x if self.m2_x else 0.0
     
+    @property
+    def intercept(self):
+        return self.mean_y - self.slope * self.mean_x
+    
+    @property
+    def r_squared(self):
+        if not self.m2_y:
+            # Constant series: the horizontal line fits exactly
+            return 1.0
+        if not self.m2_x:
+            return 0.0
+        return self.c_xy * self.c_xy / (self.m2_x * self.m2_y)
+    
+    def predict(self, x):
+        return self.intercept + self.slope * x
+
+class SpendingPredictor:
     def analyze_spending_trends(self, transactions):
+        # pandas is only needed for this per-transaction path; the app uses rollups
+        import pandas as pd
+        
         if not transactions:
             return {
                 "average_monthly_spending": 0,
@@ -43,39 +85,110 @@ class SpendingPredictor:
         
         return trends
     
-    def predict_future_spending(self, transactions, months_ahead=1):
-        if len(transactions) < 5:
-            return {
-                'estimated_spending': 0,
-                'confidence': 0,
-                'prediction_period': f'Next {months_ahead} month(s)',
-                'message': 'Insufficient data for prediction'
-            }
+    def analyze_spending_trends_from_rollups(self, rollups):
+        """Same result as analyze_spending_trends, computed from MonthlyRollup rows."""
+        if not rollups:
+            return self.summarize_trends({}, {}, 0)
         
-        df = pd.DataFrame([{
-            'date': t.transaction_date,
-            'amount': t.amount if t.type == 'expense' else 0
-        } for t in transactions])
+        monthly_spending = {}
+        category_counts = {}
+        total_transactions = 0
         
-        df['date'] = pd.to_datetime(df['date'])
-        daily_spending = df.groupby('date')['amount'].sum()
+        for rollup in rollups:
+            total_transactions += rollup.count
+            if rollup.type == 'expense':
+                monthly_spending[rollup.month_year] = monthly_spending.get(rollup.month_year, 0) + rollup.total
+                category_counts[rollup.category] = category_counts.get(rollup.category, 0) + rollup.count
         
-        if len(daily_spending) < 5:
-            return None
+        return self.summarize_trends(monthly_spending, category_counts, total_transactions)
+    
+    def analyze_spending_trends_from_columns(self, columns):
+        """Same result as analyze_spending_trends, computed from a TransactionColumns."""
+        if not len(columns):
+            return self.summarize_trends({}, {}, 0)
+        
+        expenses = columns.select(columns.is_expense)
+        months, month_index = np.unique(expenses.dates.astype('datetime64[M]'), return_inverse=True)
+        month_cents = np.bincount(month_index, weights=expenses.amount_cents, minlength=len(months))
+        counts = np.bincount(expenses.category_codes, minlength=len(columns.categories))
+        
+        monthly_spending = dict(zip(months.astype(str), (month_cents / 100.0).tolist()))
+        category_counts = {columns.categories[code]: int(count) for code, count in enumerate(counts) if count}
+        return self.summarize_trends(monthly_spending, category_counts, len(columns))
+    
+    @staticmethod
+    def summarize_trends(monthly_spending, category_counts, total_transactions):
+        """Trend summary from {month: expense total} and {category: expense count}."""
+        if not total_transactions:
+            return {
+                "average_monthly_spending": 0,
+                "spending_volatility": 0,
+                "top_categories": {},
+                "message": "Insufficient data for analysis"
+            }
         
-        days = np.array(range(len(daily_spending))).reshape(-1, 1)
-        amounts = daily_spending.values
+        monthly_totals = list(monthly_spending.values())
+        months = len(monthly_totals)
+        top_categories = dict(sorted(category_counts.items(), key=lambda item: item[1], reverse=True)[:3])
         
-        self.model.fit(days, amounts)
+        trends = {
+            'average_monthly_spending': sum(monthly_totals) / months if months else 0,
+            'spending_volatility': float(np.std(monthly_totals, ddof=1)) if months > 1 else 0,
+            'top_categories': top_categories,
+            'total_transactions': total_transactions,
+            'analysis_period': f"{months} months"
+        }
         
-        future_day = len(daily_spending) + (30 * months_ahead)
-        predicted_amount = max(0, self.model.predict([[future_day]])[0])
+        return trends
+    
+    @staticmethod
+    def daily_expense_totals(transactions):
+        """Expense total per transaction date, oldest first. Days with only income count as 0."""
+        if hasattr(transactions, 'daily_expense_totals'):
+            # TransactionColumns aggregates its arrays directly
+            return transactions.daily_expense_totals()
+        totals = {}
+        for t in transactions:
+            totals[t.transaction_date] = totals.get(t.transaction_date, 0) + (t.amount if t.type == 'expense' else 0)
+        return sorted(totals.items())
+    
+    def forecast_from_daily_totals(self, daily_totals, horizons=range(1, 13)):
+        """Forecast from (date, expense_total) pairs in date order, one result per horizon.
+
+        Days are numbered 0, 1, 2... in order, as in the original regression, and
+        each horizon is projected 30 days per month past the last day.
+        """
+        trend = LinearTrend()
+        for day, (_, amount) in enumerate(daily_totals):
+            trend.add(day, float(amount))
+        
+        if trend.n < 5:
+            return None
         
-        confidence = min(95, max(50, self.model.score(days, amounts) * 100))
+        confidence = round(min(95, max(50, trend.r_squared * 100)))
+        forecasts = []
+        for months_ahead in horizons:
+            predicted_amount = max(0, trend.predict(trend.n + 30 * months_ahead))
+            forecasts.append({
+                'estimated_spending': round(predicted_amount, 2),
+                'confidence': confidence,
+                'prediction_period': f'Next {months_ahead} month(s)',
+                'data_points': trend.n
+            })
+        return forecasts
+    
+    def predict_spending_horizons(self, transactions, horizons=range(1, 13)):
+        horizons = list(horizons)
+        if len(transactions) < 5:
+            return [{
+                'estimated_spending': 0,
+                'confidence': 0,
+                'prediction_period': f'Next {months_ahead} month(s)',
+                'message': 'Insufficient data for prediction'
+            } for months_ahead in horizons]
         
-        return {
-            'estimated_spending': round(predicted_amount, 2),
-            'confidence': round(confidence),
-            'prediction_period': f'Next {months_ahead} month(s)',
-            'data_points': len(daily_spending)
-        }
\ No newline at end of file
+        return self.forecast_from_daily_totals(self.daily_expense_totals(transactions), horizons)
+    
+    def predict_future_spending(self, transactions, months_ahead=1):
+        forecasts = self.predict_spending_horizons(transactions, [months_ahead])
+        return forecasts[0] if forecasts else None
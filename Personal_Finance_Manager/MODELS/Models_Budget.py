@@ -1,7 +1,13 @@
-import mysql.connector
+import calendar
+from datetime import date
+from models.database import connection
+from models.rollup import MonthlyRollup
+from models.cache import bump_data_version
 from config import Config
 
 class Budget:
+    __slots__ = ('id', 'user_id', 'category', 'amount', 'month_year')
+
     def __init__(self, id=None, user_id=None, category=None, amount=0, month_year=None):
         self.id = id
         self.user_id = user_id
@@ -11,50 +17,188 @@ class Budget:
 
     def save(self):
         try:
-            conn = mysql.connector.connect(**Config.MYSQL_CONFIG)
-            cursor = conn.cursor()
-            
-            if self.id:
-                cursor.execute(
-                    """UPDATE budgets SET category=%s, amount=%s, month_year=%s WHERE id=%s""",
-                    (self.category, self.amount, self.month_year, self.id)
-                )
-            else:
-                cursor.execute(
-                    """INSERT INTO budgets (user_id, category, amount, month_year) 
-                    VALUES (%s, %s, %s, %s)""",
-                    (self.user_id, self.category, self.amount, self.month_year)
-                )
-                self.id = cursor.lastrowid
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with connection() as conn:
+                cursor = conn.cursor()
+                
+                if self.id:
+                    cursor.execute(
+                        """UPDATE budgets SET category=%s, amount=%s, month_year=%s WHERE id=%s""",
+                        (self.category, self.amount, self.month_year, self.id)
+                    )
+                else:
+                    cursor.execute(
+                        """INSERT INTO budgets (user_id, category, amount, month_year) 
+                        VALUES (%s, %s, %s, %s)""",
+                        (self.user_id, self.category, self.amount, self.month_year)
+                    )
+                    self.id = cursor.lastrowid
+                
+                cursor.close()
+            if self.user_id is not None:
+                bump_data_version(self.user_id)
             return True
         except Exception as e:
             print(f"Error saving budget: {e}")
             return False
 
-    @staticmethod
-    def get_user_budgets(user_id, month_year=None):
+    def upsert(self):
+        """Set the budget for its user, category and month, replacing any amount already set.
+
+        One INSERT ... ON DUPLICATE KEY UPDATE, so two requests for the same
+        category cannot both insert and trip unique_budget. Sets self.id and
+        returns True if the row was created. Database errors are raised.
+        """
+        key = (self.user_id, self.category, self.month_year)
         try:
-            conn = mysql.connector.connect(**Config.MYSQL_CONFIG)
-            cursor = conn.cursor(dictionary=True)
-            
-            if month_year:
+            with connection() as conn:
+                cursor = conn.cursor()
+                # Only decides the answer; the upsert below is safe either way
                 cursor.execute(
-                    "SELECT * FROM budgets WHERE user_id = %s AND month_year = %s",
-                    (user_id, month_year)
-                )
-            else:
+                    "SELECT id FROM budgets WHERE user_id = %s AND category = %s AND month_year = %s", key)
+                created = cursor.fetchone() is None
                 cursor.execute(
-                    "SELECT * FROM budgets WHERE user_id = %s",
-                    (user_id,)
+                    """INSERT INTO budgets (user_id, category, amount, month_year)
+                    VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE amount = VALUES(amount)""",
+                    (self.user_id, self.category, self.amount, self.month_year)
                 )
+                cursor.execute(
+                    "SELECT id FROM budgets WHERE user_id = %s AND category = %s AND month_year = %s", key)
+                self.id = cursor.fetchone()[0]
+                cursor.close()
+            bump_data_version(self.user_id)
+            return created
+        except Exception as e:
+            print(f"Error saving budget: {e}")
+            raise
+
+    def get_spent(self):
+        spent = MonthlyRollup.get_category_totals(self.user_id, type='expense', month_year=self.month_year)
+        return spent.get(self.category, 0.0)
+
+    # Each budget joined to its expense rollup row: one primary-key lookup per
+    # budgeted category, however many transactions the month has
+    STATUS_SQL = """SELECT b.user_id, b.id, b.category, b.amount, COALESCE(r.total, 0), COALESCE(r.txn_count, 0)
+        FROM budgets b LEFT JOIN monthly_rollups r
+            ON r.user_id = b.user_id AND r.month_year = b.month_year
+            AND r.category = b.category AND r.type = 'expense'
+        WHERE b.month_year = %s"""
+
+    @staticmethod
+    def month_progress(month_year, today=None):
+        """(days elapsed, days in month) for a 'YYYY-MM' month as of `today`."""
+        today = today or date.today()
+        year, month = (int(part) for part in month_year.split('-'))
+        days = calendar.monthrange(year, month)[1]
+        if (today.year, today.month) < (year, month):
+            return 0, days
+        if (today.year, today.month) > (year, month):
+            return days, days
+        return today.day, days
+
+    @staticmethod
+    def evaluate(amount, spent, month_year, today=None, threshold=None):
+        """Spent/remaining/percent and the month-end projection for one budget.
+
+        The projection extends the month's spending so far at the same daily
+        rate. Status is 'over' once spending passes the budget, 'at_risk' when
+        it has used `threshold` of it or is projected to pass it, else 'ok'.
+        """
+        threshold = Config.BUDGET_ALERT_THRESHOLD if threshold is None else threshold
+        elapsed, days = Budget.month_progress(month_year, today)
+        projected = spent * days / elapsed if elapsed else spent
+        
+        if spent > amount:
+            status = 'over'
+        elif projected > amount or (amount and spent >= amount * threshold):
+            status = 'at_risk'
+        else:
+            status = 'ok'
+        
+        return {
+            'budget': amount,
+            'spent': round(spent, 2),
+            'remaining': round(amount - spent, 2),
+            'percent_used': round(spent / amount * 100, 1) if amount else None,
+            'projected_spending': round(projected, 2),
+            'projected_overrun': round(max(0, projected - amount), 2),
+            'status': status
+        }
+
+    @staticmethod
+    def get_status(user_id, month_year=None, today=None):
+        """Budget-vs-actual for each of the user's budgets in a month, in one query.
+
+        Database errors are raised, so an outage is not mistaken for having no budgets.
+        """
+        today = today or date.today()
+        month_year = month_year or today.strftime('%Y-%m')
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(Budget.STATUS_SQL + " AND b.user_id = %s ORDER BY b.category",
+                               (month_year, user_id))
+                rows = cursor.fetchall()
+                cursor.close()
             
-            budgets_data = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            statuses = []
+            for _, budget_id, category, amount, spent, count in rows:
+                status = Budget.evaluate(float(amount), float(spent), month_year, today)
+                status.update({'id': budget_id, 'category': category, 'month_year': month_year,
+                               'transactions': count})
+                statuses.append(status)
+            return statuses
+        except Exception as e:
+            print(f"Error getting budget status: {e}")
+            raise
+
+    @staticmethod
+    def find_alerts(month_year=None, today=None, threshold=None, batch_size=1000):
+        """{user_id: [status, ...]} for every budget in the month that is over or at risk.
+
+        One query over all users' budgets, read from an unbuffered cursor a
+        batch at a time, for a periodic alerting job.
+        """
+        today = today or date.today()
+        month_year = month_year or today.strftime('%Y-%m')
+        alerts = {}
+        try:
+            with connection() as conn:
+                cursor = conn.cursor(buffered=False)
+                cursor.execute(Budget.STATUS_SQL + " ORDER BY b.user_id, b.category", (month_year,))
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for user_id, budget_id, category, amount, spent, count in rows:
+                        status = Budget.evaluate(float(amount), float(spent), month_year, today, threshold)
+                        if status['status'] != 'ok':
+                            status.update({'id': budget_id, 'category': category, 'month_year': month_year,
+                                           'transactions': count})
+                            alerts.setdefault(user_id, []).append(status)
+                cursor.close()
+        except Exception as e:
+            print(f"Error evaluating budget alerts: {e}")
+        return alerts
+
+    @staticmethod
+    def get_user_budgets(user_id, month_year=None):
+        try:
+            with connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                if month_year:
+                    cursor.execute(
+                        "SELECT * FROM budgets WHERE user_id = %s AND month_year = %s",
+                        (user_id, month_year)
+                    )
+                else:
+                    cursor.execute(
+                        "SELECT * FROM budgets WHERE user_id = %s",
+                        (user_id,)
+                    )
+                
+                budgets_data = cursor.fetchall()
+                cursor.close()
             
             budgets = []
             for data in budgets_data:
@@ -69,4 +213,4 @@ class Budget:
             return budgets
         except Exception as e:
             print(f"Error getting user budgets: {e}")
-            return []
\ No newline at end of file
+            return []
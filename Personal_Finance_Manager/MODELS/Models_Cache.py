@@ -0,0 +1,232 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from config import Config
+from models.storage import private_file
+
+_caches = {}
+
+
+class CacheStatsMixin:
+    def _init_stats(self):
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.hits = self.misses = self.evictions = 0
+
+
+class TTLCache(CacheStatsMixin):
+    """Bounded in-process LRU cache whose entries expire after `ttl` seconds.
+
+    Each worker process has its own copy, so an invalidation only reaches the
+    process that made it; the TTL bounds how stale other workers can be.
+    """
+    backend = 'memory'
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._init_stats()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._data[key]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+        self._count(entry is not None)
+        return entry[1] if entry is not None else default
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def _encode(value):
+    # Types json cannot write itself, tagged so decode_value gives them back
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    raise TypeError(f"Cannot cache {type(value).__name__} values")
+
+
+def _decode(obj):
+    if len(obj) == 1:
+        if '__bytes__' in obj:
+            return base64.b64decode(obj['__bytes__'])
+        if '__datetime__' in obj:
+            return datetime.fromisoformat(obj['__datetime__'])
+        if '__date__' in obj:
+            return date.fromisoformat(obj['__date__'])
+    return obj
+
+
+def encode_value(value):
+    """JSON for a cached value; tuples come back as lists."""
+    return json.dumps(value, default=_encode, separators=(',', ':'))
+
+
+def decode_value(text):
+    return json.loads(text, object_hook=_decode)
+
+
+class SQLiteCache(CacheStatsMixin):
+    """Cache shared by every worker on one host through a local SQLite file.
+
+    A stand-in for an external shared cache: values are stored as JSON in one
+    table keyed by (namespace, key), so an invalidation in one worker is seen
+    by all of them. Size is bounded by evicting the entries closest to expiry.
+    The file is created 0600 in a private directory; one another user owns or
+    can read is refused.
+    """
+    backend = 'sqlite'
+
+    def __init__(self, path, namespace='default', maxsize=1024, ttl=300, clock=time.time):
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._local = threading.local()
+        self._init_stats()
+        private_file(path)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL,
+                PRIMARY KEY (namespace, key))""")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def __len__(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires > ?",
+            (self.namespace, self.clock())).fetchone()[0]
+
+    def get(self, key, default=None):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires > ?",
+            (self.namespace, str(key), self.clock())).fetchone()
+        self._count(row is not None)
+        return decode_value(row[0]) if row is not None else default
+
+    def set(self, key, value, ttl=None):
+        conn = self._connect()
+        expires = self.clock() + (self.ttl if ttl is None else ttl)
+        conn.execute("INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                     (self.namespace, str(key), encode_value(value), expires))
+        stored = conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        if stored > self.maxsize:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND expires <= ?", (self.namespace, self.clock()))
+        excess = len(self) - self.maxsize
+        if excess > 0:
+            conn.execute("""DELETE FROM cache WHERE namespace = ? AND key IN (
+                SELECT key FROM cache WHERE namespace = ? ORDER BY expires LIMIT ?)""",
+                         (self.namespace, self.namespace, excess))
+            with self._stats_lock:
+                self.evictions += excess
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, str(key)))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+
+def get_cache(name, maxsize=1024, ttl=300):
+    """The process-wide cache called `name`, on the backend chosen by Config.CACHE_BACKEND."""
+    cache = _caches.get(name)
+    if cache is None:
+        if Config.CACHE_BACKEND == 'sqlite':
+            cache = SQLiteCache(Config.CACHE_SQLITE_PATH, namespace=name, maxsize=maxsize, ttl=ttl)
+        else:
+            cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        cache = _caches.setdefault(name, cache)
+    return cache
+
+
+def data_versions():
+    return get_cache('data_versions', maxsize=Config.DATA_VERSION_CACHE_SIZE, ttl=Config.RESPONSE_CACHE_TTL)
+
+
+def get_data_version(user_id):
+    """Token that changes whenever the user's transactions or budgets change.
+
+    Versions are nanosecond timestamps rather than a count from zero, so one
+    that expired or was evicted never comes back as a value an older cached
+    response was stored under.
+    """
+    version = data_versions().get(user_id)
+    if version is None:
+        version = time.time_ns()
+        data_versions().set(user_id, version)
+    return version
+
+
+def bump_data_version(user_id):
+    """Mark every cached response for this user as stale; called after each committed write."""
+    data_versions().set(user_id, max(time.time_ns(), (data_versions().get(user_id) or 0) + 1))
+
+
+def cache_stats():
+    """Hit/miss counters for every cache created in this process."""
+    return {name: cache.stats() for name, cache in _caches.items()}
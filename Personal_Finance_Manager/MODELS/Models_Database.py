@@ -0,0 +1,25 @@
+from models.storage import get_storage, error_count, PoolTimeoutError
+
+
+def connection():
+    """Borrow a pooled connection from the configured storage for one unit of work.
+
+    Commits when the block exits normally, rolls back if it raises, and always
+    returns the connection to the pool.
+    """
+    return get_storage().connection()
+
+
+def database_errors():
+    """Failed units of work on this thread so far; compare before and after a call
+    to learn whether a model hid an error behind an empty result."""
+    return error_count()
+
+
+def pool_stats():
+    """Checkout wait time and utilization counters for sizing the pool."""
+    return get_storage().stats()
+
+
+def reset_pool_stats():
+    get_storage().reset_stats()
@@ -0,0 +1,299 @@
+import codecs
+import csv
+import itertools
+import math
+import os
+import re
+import time
+import uuid
+from datetime import date, datetime
+from models.transaction import Transaction
+from models.storage import private_dir
+from config import Config
+
+CSV_COLUMNS = {
+    'date': ('date', 'transaction_date', 'posted', 'posting date', 'value date'),
+    'description': ('description', 'memo', 'payee', 'narration', 'details', 'name'),
+    'amount': ('amount', 'value'),
+    'debit': ('debit', 'withdrawal', 'paid out'),
+    'credit': ('credit', 'deposit', 'paid in'),
+    'type': ('type',),
+    'category': ('category',),
+}
+
+TYPE_ALIASES = {
+    'expense': 'expense', 'debit': 'expense', 'dr': 'expense',
+    'income': 'income', 'credit': 'income', 'cr': 'income',
+}
+
+OFX_TAG = re.compile(r'<(/?)(\w+)>([^<\r\n]*)')
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def parse_amount(value):
+    value = (value or '').strip().replace(',', '')
+    if not value:
+        return None
+    # Accounting style negatives: (12.50)
+    if value.startswith('(') and value.endswith(')'):
+        value = '-' + value[1:-1]
+    try:
+        amount = float(value)
+    except ValueError:
+        raise ImportRowError(f"invalid amount {value!r}")
+    # 'nan' and 'inf' parse as floats but would fail the whole chunk's insert
+    if not math.isfinite(amount):
+        raise ImportRowError(f"invalid amount {value!r}")
+    return amount
+
+
+def parse_date(value, date_format=None):
+    value = (value or '').strip()
+    if not date_format and len(value) == 10 and value[4] == '-':
+        # Fast path for ISO dates, much cheaper than strptime
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    for fmt in ([date_format] if date_format else ['%Y-%m-%d', '%Y/%m/%d']):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ImportRowError(f"invalid date {value!r}")
+
+
+def make_row(transaction_date, description, amount, transaction_type=None, category=None, date_format=None):
+    """Normalize one statement line to the fields of a Transaction."""
+    amount = parse_amount(amount) if isinstance(amount, str) else amount
+    if amount is None:
+        raise ImportRowError("missing amount")
+    if transaction_type:
+        transaction_type = TYPE_ALIASES.get(transaction_type.strip().lower())
+        if not transaction_type:
+            raise ImportRowError("type must be income or expense")
+    else:
+        # Bank statements sign money going out as negative
+        transaction_type = 'expense' if amount < 0 else 'income'
+    return {
+        'transaction_date': parse_date(transaction_date, date_format),
+        'description': (description or '').strip(),
+        'amount': round(abs(amount), 2),
+        'type': transaction_type,
+        'category': (category or '').strip()[:50] or None,
+    }
+
+
+def parse_csv(lines, date_format=None):
+    """Yield (line_number, row or ImportRowError) for a CSV statement with a header row."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    if 'date' not in columns or not ('amount' in columns or 'debit' in columns or 'credit' in columns):
+        raise ImportFormatError("CSV header needs a date column and an amount (or debit/credit) column")
+
+    def column(values, field):
+        index = columns.get(field)
+        return values[index] if index is not None and index < len(values) else None
+
+    for values in reader:
+        line_number = reader.line_num
+        if not any(value.strip() for value in values):
+            continue
+        try:
+            transaction_type = column(values, 'type')
+            amount = column(values, 'amount')
+            if 'amount' not in columns:
+                debit = parse_amount(column(values, 'debit'))
+                credit = parse_amount(column(values, 'credit'))
+                if debit:
+                    amount, transaction_type = abs(debit), 'expense'
+                elif credit:
+                    amount, transaction_type = abs(credit), 'income'
+                else:
+                    raise ImportRowError("missing debit and credit")
+            yield line_number, make_row(column(values, 'date'), column(values, 'description'), amount,
+                                        transaction_type, column(values, 'category'), date_format)
+        except ImportRowError as e:
+            yield line_number, e
+
+
+def parse_ofx(lines):
+    """Yield (line_number, row or ImportRowError) for each <STMTTRN> in an OFX/QFX file.
+
+    Handles both SGML (OFX 1.x, unclosed tags) and XML (OFX 2.x) layouts line by line.
+    """
+    fields = None
+    start_line = 0
+    for line_number, line in enumerate(lines, 1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and fields is not None:
+                    try:
+                        yield start_line, make_row(
+                            fields.get('DTPOSTED', '')[:8],
+                            fields.get('NAME') or fields.get('MEMO'),
+                            fields.get('TRNAMT'),
+                            date_format='%Y%m%d'
+                        )
+                    except ImportRowError as e:
+                        yield start_line, e
+                    fields = None
+                elif not closing:
+                    fields, start_line = {}, line_number
+            elif fields is not None and not closing and value.strip():
+                fields[tag] = value.strip()
+
+
+def decode_lines(raw):
+    """Text lines from a binary statement: UTF-8 (with or without a BOM), else Windows-1252.
+
+    Banks still export Latin-1/Windows-1252 files, so each line that is not
+    valid UTF-8 is decoded as Windows-1252 rather than failing the import.
+    """
+    for number, line in enumerate(raw):
+        if number == 0 and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+        try:
+            yield line.decode('utf-8')
+        except UnicodeDecodeError:
+            yield line.decode('cp1252', errors='replace')
+
+
+def detect_format(filename, first_line):
+    if filename and filename.lower().endswith(('.ofx', '.qfx')):
+        return 'ofx'
+    if 'OFXHEADER' in first_line or '<OFX>' in first_line.upper() or first_line.startswith('<?xml'):
+        return 'ofx'
+    return 'csv'
+
+
+class StatementImporter:
+    """Streams a bank statement into a user's transactions.
+
+    Rows are parsed lazily, categorized one chunk at a time with a single
+    batch call, and each chunk is written with one multi-row insert in its own
+    database transaction. A bad line is reported and skipped; it never aborts
+    the rest of the file.
+    """
+
+    def __init__(self, user_id, categorizer=None, chunk_size=None, dry_run=False):
+        self.user_id = user_id
+        self.categorizer = categorizer
+        self.chunk_size = chunk_size or Config.IMPORT_CHUNK_SIZE
+        self.dry_run = dry_run
+
+    def get_categorizer(self):
+        if self.categorizer is None:
+            from ml_models.model_registry import get_categorizer
+            self.categorizer = get_categorizer()
+        return self.categorizer
+
+    def import_lines(self, lines, format='csv', date_format=None):
+        # Load the model first so rows/sec measures the import, not model startup
+        self.get_categorizer()
+        started = time.perf_counter()
+        report = {'rows_imported': 0, 'rows_failed': 0, 'chunks': 0, 'errors': []}
+
+        def record_error(line_number, message):
+            report['rows_failed'] += 1
+            if len(report['errors']) < Config.IMPORT_MAX_REPORTED_ERRORS:
+                report['errors'].append({'line': line_number, 'error': message})
+
+        rows = parse_ofx(lines) if format == 'ofx' else parse_csv(lines, date_format)
+        chunk = []
+        line_number = 0
+        try:
+            for line_number, row in rows:
+                if isinstance(row, ImportRowError):
+                    record_error(line_number, str(row))
+                    continue
+                chunk.append((line_number, row))
+                if len(chunk) >= self.chunk_size:
+                    self.write_chunk(chunk, report, record_error)
+                    chunk = []
+            if chunk:
+                self.write_chunk(chunk, report, record_error)
+        except ImportFormatError as e:
+            # Unusable file (e.g. missing header columns) rather than a bad line
+            record_error(1, str(e))
+            report['error'] = str(e)
+        except csv.Error as e:
+            # Malformed CSV stops the import; chunks before it are already written
+            message = f"malformed CSV: {e}"
+            record_error(line_number + 1, message)
+            report['error'] = message
+
+        report['seconds'] = time.perf_counter() - started
+        report['rows_per_second'] = report['rows_imported'] / report['seconds'] if report['seconds'] else 0
+        return report
+
+    def write_chunk(self, chunk, report, record_error):
+        uncategorized = [row for _, row in chunk if not row['category']]
+        if uncategorized:
+            categories = self.get_categorizer().predict_categories(uncategorized)
+            for row, category in zip(uncategorized, categories):
+                row['category'] = category
+
+        transactions = [Transaction(user_id=self.user_id, **row) for _, row in chunk]
+        if self.dry_run or Transaction.bulk_insert(transactions):
+            report['rows_imported'] += len(transactions)
+        else:
+            for line_number, _ in chunk:
+                record_error(line_number, "database error while saving this chunk")
+        report['chunks'] += 1
+
+    def import_stream(self, text, filename=None, format=None, date_format=None):
+        """Import from text lines (an open text file or decode_lines), detecting CSV or OFX from the name or first line.
+
+        A file that cannot be read as a statement at all is reported with an
+        'error' as well as its line in 'errors'.
+        """
+        text = iter(text)
+        first_line = next(text, '')
+        lines = itertools.chain([first_line], text)
+        return self.import_lines(lines, format or detect_format(filename, first_line), date_format)
+
+    def import_file(self, path, format=None, date_format=None):
+        with open(path, 'rb') as f:
+            return self.import_stream(decode_lines(f), path, format, date_format)
+
+
+def spool_upload(upload):
+    """Save an uploaded file to a new 0600 file in the private JOB_SPOOL_DIR and return its path."""
+    spool_dir = private_dir(Config.JOB_SPOOL_DIR)
+    # Keep the extension, which is how the importer tells OFX from CSV
+    path = os.path.join(spool_dir, uuid.uuid4().hex + os.path.splitext(upload.filename or '')[1].lower())
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+        upload.save(f)
+    return path
+
+
+def import_job(user_id, path, format=None, date_format=None, dry_run=False):
+    """Job handler: import an uploaded statement spooled to `path`, then delete it."""
+    spool_dir = os.path.realpath(private_dir(Config.JOB_SPOOL_DIR))
+    if os.path.dirname(os.path.realpath(path)) != spool_dir:
+        raise ValueError(f"{path} is not in the upload spool directory")
+    try:
+        return StatementImporter(user_id, dry_run=dry_run).import_file(path, format, date_format)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,114 @@
+import json
+from datetime import datetime
+from models.database import connection
+
+class PrecomputedInsights:
+    """Analytics bundles computed offline by `run.py precompute-insights`, one row per user.
+
+    Each row stores the fingerprint of the user's transactions it was computed
+    from (count, newest id, latest update and total), and is only served while
+    the transactions table still gives the same fingerprint.
+    """
+    FINGERPRINT_COLUMNS = "COUNT(t.id), MAX(t.id), MAX(t.updated_at), ROUND(SUM(t.amount) * 100)"
+
+    UPSERT_SQL = """INSERT INTO precomputed_insights (user_id, fingerprint, insights, computed_at)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE fingerprint = VALUES(fingerprint), insights = VALUES(insights),
+            computed_at = VALUES(computed_at)"""
+
+    @staticmethod
+    def make_fingerprint(count, max_id, max_updated_at, total_cents):
+        return f"{count}:{max_id or 0}:{max_updated_at or ''}:{int(total_cents or 0)}"
+
+    @staticmethod
+    def fingerprint(cursor, user_id):
+        cursor.execute(
+            "SELECT " + PrecomputedInsights.FINGERPRINT_COLUMNS + " FROM transactions t WHERE t.user_id = %s",
+            (user_id,)
+        )
+        return PrecomputedInsights.make_fingerprint(*cursor.fetchone())
+
+    @staticmethod
+    def current_fingerprint(user_id):
+        """Fingerprint of the user's transactions as they are now, or None on a database error."""
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                fingerprint = PrecomputedInsights.fingerprint(cursor, user_id)
+                cursor.close()
+            return fingerprint
+        except Exception as e:
+            print(f"Error fingerprinting transactions: {e}")
+            return None
+
+    @staticmethod
+    def get_current(user_id):
+        """The user's precomputed bundle if their transactions have not changed since, else None."""
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                current = PrecomputedInsights.fingerprint(cursor, user_id)
+                cursor.execute(
+                    "SELECT fingerprint, insights, computed_at FROM precomputed_insights WHERE user_id = %s",
+                    (user_id,)
+                )
+                row = cursor.fetchone()
+                cursor.close()
+
+            if row is None or row[0] != current:
+                return None
+            bundle = json.loads(row[1])
+            bundle['computed_at'] = row[2].timestamp()
+            return bundle
+        except Exception as e:
+            print(f"Error getting precomputed insights: {e}")
+            return None
+
+    @staticmethod
+    def changed_users(after_id=0, limit=500, force=False):
+        """Users after `after_id` (by id, at most `limit`) whose insights are missing or out of date.
+
+        Returns ([(user_id, fingerprint), ...], last user id looked at, users
+        looked at), or ([], None, 0) once there are no users left.
+        """
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT u.id, """ + PrecomputedInsights.FINGERPRINT_COLUMNS + """, p.fingerprint
+                FROM (SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s) u
+                LEFT JOIN transactions t ON t.user_id = u.id
+                LEFT JOIN precomputed_insights p ON p.user_id = u.id
+                GROUP BY u.id, p.fingerprint ORDER BY u.id""",
+                (after_id, limit)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+
+        if not rows:
+            return [], None, 0
+        changed = []
+        for user_id, count, max_id, max_updated_at, total_cents, stored in rows:
+            fingerprint = PrecomputedInsights.make_fingerprint(count, max_id, max_updated_at, total_cents)
+            if force or fingerprint != stored:
+                changed.append((user_id, fingerprint))
+        return changed, rows[-1][0], len(rows)
+
+    @staticmethod
+    def save_many(results):
+        """Store (user_id, fingerprint, bundle) results in one statement."""
+        if not results:
+            return True
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                # default=str writes anomaly dates as 'YYYY-MM-DD'
+                cursor.executemany(PrecomputedInsights.UPSERT_SQL, [
+                    (user_id, fingerprint, json.dumps(bundle, default=str),
+                     datetime.fromtimestamp(bundle['computed_at']).replace(microsecond=0))
+                    for user_id, fingerprint, bundle in results
+                ])
+                cursor.close()
+            return True
+        except Exception as e:
+            print(f"Error saving precomputed insights: {e}")
+            return False
@@ -0,0 +1,356 @@
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from config import Config
+from models.storage import private_file
+
+# Handlers are imported by name when a job of that kind first runs, so the web
+# app does not import scikit-learn just to enqueue work
+JOB_HANDLERS = {
+    'analytics': ('ml_models.analytics_engine', 'analytics_job'),
+    'import_statement': ('models.importer', 'import_job'),
+    'retrain_categorizer': ('ml_models.categorizer_training', 'retrain_job'),
+}
+
+# Higher runs first: someone is watching the analytics page, retraining can wait
+JOB_PRIORITIES = {'analytics': 10, 'import_statement': 5, 'retrain_categorizer': 0}
+
+_queue = None
+_worker = None
+_lock = threading.Lock()
+
+
+def isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+class JobQueue:
+    """Persistent job queue in a local SQLite file, shared by every process on one host.
+
+    A stand-in for a real broker, as SQLiteCache is for a shared cache. Jobs
+    are claimed highest priority first, then oldest first, inside an IMMEDIATE
+    transaction, so two workers never get the same job and no more than
+    JOB_MAX_RUNNING run at once. Jobs carry a dedupe key (their kind and user
+    unless enqueued with dedupe=False): enqueueing while one with the same key
+    is still queued returns that job, and only one job per key runs at a time.
+    Everyone whose request was merged into a job is recorded in job_requesters
+    and can see it.
+
+    A claimed job holds a lease for JOB_LEASE_SECONDS that its worker renews
+    while the job runs. A job whose lease lapsed belongs to a worker that died
+    or hung, so the next claim queues it again; process ids are not used, as
+    they are reused after a restart.
+
+    Whoever can write the file can queue work as any user, so it is created
+    0600 in a private directory and one that is not is refused.
+    """
+    COLUMNS = ('id', 'kind', 'user_id', 'requested_by', 'payload', 'priority', 'status', 'result', 'error',
+               'created_at', 'started_at', 'finished_at')
+
+    def __init__(self, path=None):
+        self.path = private_file(path or Config.JOB_QUEUE_PATH)
+        self._local = threading.local()
+        # Wakes this process's workers on enqueue; workers in other processes poll
+        self.wakeup = threading.Event()
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                user_id INTEGER,
+                requested_by INTEGER,
+                dedupe_key TEXT,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                result TEXT,
+                error TEXT,
+                worker_pid INTEGER,
+                lease_token TEXT,
+                lease_expires REAL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL);
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, priority, id);
+            CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key, status);
+            CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id);
+            CREATE INDEX IF NOT EXISTS idx_jobs_requested_by ON jobs (requested_by);
+            CREATE TABLE IF NOT EXISTS job_requesters (
+                job_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                PRIMARY KEY (job_id, user_id));
+            CREATE INDEX IF NOT EXISTS idx_job_requesters_user ON job_requesters (user_id);""")
+        self._add_lease_columns()
+
+    def _add_lease_columns(self):
+        """Add the lease columns to a queue file created before jobs had leases."""
+        with self._transaction() as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in (('lease_token', 'TEXT'), ('lease_expires', 'REAL')):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front, so check-then-update cannot interleave
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def to_dict(self, row):
+        job = dict(zip(self.COLUMNS, row))
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        for name in ('created_at', 'started_at', 'finished_at'):
+            job[name] = isoformat(job[name])
+        return job
+
+    def enqueue(self, kind, user_id=None, payload=None, priority=None, requested_by=None, dedupe=True):
+        """Queue a job and return it, or the same kind of job already queued for this user."""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        priority = JOB_PRIORITIES.get(kind, 0) if priority is None else priority
+        payload = json.dumps(payload or {})
+        dedupe_key = f"{kind}:{'' if user_id is None else user_id}" if dedupe else None
+
+        with self._transaction() as conn:
+            queued = None
+            if dedupe_key is not None:
+                queued = conn.execute(
+                    "SELECT id, priority FROM jobs WHERE dedupe_key = ? AND status = 'queued'",
+                    (dedupe_key,)).fetchone()
+            if queued is not None:
+                # The latest request's options win; the job keeps its place in the queue
+                job_id = queued[0]
+                conn.execute("UPDATE jobs SET payload = ?, priority = ? WHERE id = ?",
+                             (payload, max(priority, queued[1]), job_id))
+            else:
+                job_id = conn.execute(
+                    """INSERT INTO jobs (kind, user_id, requested_by, dedupe_key, payload, priority, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (kind, user_id, requested_by, dedupe_key, payload, priority, time.time())).lastrowid
+            if requested_by is not None:
+                conn.execute("INSERT OR IGNORE INTO job_requesters (job_id, user_id) VALUES (?, ?)",
+                             (job_id, requested_by))
+        self.wakeup.set()
+        return self.get(job_id)
+
+    def _requeue_expired(self, conn):
+        # Jobs from before leases existed expire a lease length after they started
+        return conn.execute(
+            """UPDATE jobs SET status = 'queued', started_at = NULL, worker_pid = NULL,
+                lease_token = NULL, lease_expires = NULL
+            WHERE status = 'running' AND COALESCE(lease_expires, started_at + ?) < ?""",
+            (Config.JOB_LEASE_SECONDS, time.time())).rowcount
+
+    def claim(self):
+        """Mark the next runnable job as running under a new lease and return it, or None.
+
+        The job's 'lease' token must be passed to heartbeat, finish and fail.
+        """
+        lease = uuid.uuid4().hex
+        with self._transaction() as conn:
+            self._requeue_expired(conn)
+            running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+            if running >= Config.JOB_MAX_RUNNING:
+                return None
+            row = conn.execute(
+                """SELECT id FROM jobs q WHERE status = 'queued' AND (dedupe_key IS NULL OR NOT EXISTS (
+                    SELECT 1 FROM jobs r WHERE r.dedupe_key = q.dedupe_key AND r.status = 'running'))
+                ORDER BY priority DESC, id LIMIT 1""").fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute(
+                """UPDATE jobs SET status = 'running', started_at = ?, worker_pid = ?,
+                    lease_token = ?, lease_expires = ? WHERE id = ?""",
+                (now, os.getpid(), lease, now + Config.JOB_LEASE_SECONDS, row[0]))
+        job = self.get(row[0])
+        job['lease'] = lease
+        return job
+
+    def _update_leased(self, job_id, lease, assignments, params):
+        # Without a lease the update applies whoever holds the job
+        query = f"UPDATE jobs SET {assignments} WHERE id = ?"
+        params += (job_id,)
+        if lease is not None:
+            query += " AND status = 'running' AND lease_token = ?"
+            params += (lease,)
+        return self._connect().execute(query, params).rowcount > 0
+
+    def heartbeat(self, job_id, lease):
+        """Renew a running job's lease; False if it lapsed and the job was handed to another worker."""
+        return self._update_leased(job_id, lease, "lease_expires = ?", (time.time() + Config.JOB_LEASE_SECONDS,))
+
+    def finish(self, job_id, result=None, lease=None):
+        return self._update_leased(
+            job_id, lease, "status = 'done', result = ?, finished_at = ?, lease_expires = NULL",
+            (json.dumps(result, default=str), time.time()))
+
+    def fail(self, job_id, error, lease=None):
+        return self._update_leased(
+            job_id, lease, "status = 'failed', error = ?, finished_at = ?, lease_expires = NULL",
+            (str(error), time.time()))
+
+    # Jobs for the user, or ones they asked for (global jobs have no user_id)
+    VISIBLE_TO = """(user_id = ? OR requested_by = ? OR
+        id IN (SELECT job_id FROM job_requesters WHERE user_id = ?))"""
+
+    def get(self, job_id, user_id=None):
+        """The job, or None; with `user_id`, only if that user may see it."""
+        query = "SELECT " + ', '.join(self.COLUMNS) + " FROM jobs WHERE id = ?"
+        params = (job_id,)
+        if user_id is not None:
+            query += " AND " + self.VISIBLE_TO
+            params += (user_id, user_id, user_id)
+        row = self._connect().execute(query, params).fetchone()
+        return self.to_dict(row) if row is not None else None
+
+    def for_user(self, user_id, limit=20):
+        """The user's most recent jobs, including global ones they asked for."""
+        rows = self._connect().execute(
+            "SELECT " + ', '.join(self.COLUMNS) + " FROM jobs WHERE " + self.VISIBLE_TO + " ORDER BY id DESC LIMIT ?",
+            (user_id, user_id, user_id, limit)).fetchall()
+        return [self.to_dict(row) for row in rows]
+
+    def recover(self):
+        """Requeue jobs whose lease lapsed, and drop old finished jobs; returns jobs requeued."""
+        with self._transaction() as conn:
+            requeued = self._requeue_expired(conn)
+            conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                         (time.time() - Config.JOB_RETENTION_DAYS * 86400,))
+            conn.execute("DELETE FROM job_requesters WHERE job_id NOT IN (SELECT id FROM jobs)")
+        return requeued
+
+    def counts(self):
+        return dict(self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class JobWorker:
+    """Runs queued jobs on `concurrency` daemon threads in this process."""
+    def __init__(self, queue=None, concurrency=None, poll_interval=None):
+        self.queue = queue or get_job_queue()
+        self.concurrency = Config.JOB_WORKERS if concurrency is None else concurrency
+        self.poll_interval = poll_interval or Config.JOB_POLL_INTERVAL
+        self.stopping = threading.Event()
+        self.threads = []
+        self.handlers = {}
+
+    def handler(self, kind):
+        handler = self.handlers.get(kind)
+        if handler is None:
+            module_name, function_name = JOB_HANDLERS[kind]
+            handler = getattr(importlib.import_module(module_name), function_name)
+            self.handlers[kind] = handler
+        return handler
+
+    def run_one(self):
+        """Claim and run one job; False if there was nothing to run."""
+        job = self.queue.claim()
+        if job is None:
+            return False
+
+        started = time.perf_counter()
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self.renew_lease, args=(job, done),
+                                     name=f"job-heartbeat-{job['id']}", daemon=True)
+        heartbeat.start()
+        try:
+            result = self.handler(job['kind'])(job['user_id'], **job['payload'])
+            if self.queue.finish(job['id'], result, lease=job['lease']):
+                print(f"✅ Job {job['id']} ({job['kind']}) done in {time.perf_counter() - started:.2f}s")
+            else:
+                print(f"❌ Job {job['id']} ({job['kind']}) lost its lease; its result was dropped")
+        except Exception as e:
+            self.queue.fail(job['id'], e, lease=job['lease'])
+            print(f"❌ Job {job['id']} ({job['kind']}) failed: {e}")
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+
+    def renew_lease(self, job, done):
+        """Keep the job's lease alive until `done` is set."""
+        while not done.wait(Config.JOB_LEASE_SECONDS / 3):
+            try:
+                if not self.queue.heartbeat(job['id'], job['lease']):
+                    print(f"❌ Job {job['id']} ({job['kind']}) lost its lease")
+                    return
+            except Exception as e:
+                print(f"Error renewing lease for job {job['id']}: {e}")
+
+    def loop(self):
+        while not self.stopping.is_set():
+            try:
+                ran = self.run_one()
+            except Exception as e:
+                print(f"Error running jobs: {e}")
+                ran = False
+            if not ran:
+                self.queue.wakeup.wait(self.poll_interval)
+                self.queue.wakeup.clear()
+
+    def start(self):
+        requeued = self.queue.recover()
+        if requeued:
+            print(f"🔄 Requeued {requeued} jobs whose worker stopped renewing their lease")
+        for number in range(self.concurrency):
+            thread = threading.Thread(target=self.loop, name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        self.queue.wakeup.set()
+        for thread in self.threads:
+            thread.join(timeout)
+
+
+def get_job_queue():
+    global _queue
+    if _queue is None:
+        with _lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
+
+
+def start_job_worker(concurrency=None):
+    """Start this process's job threads once; later calls return the running worker."""
+    global _worker
+    queue = get_job_queue()
+    with _lock:
+        if _worker is None:
+            _worker = JobWorker(queue, concurrency).start()
+    return _worker
+
+
+def enqueue_job(kind, user_id=None, **options):
+    """Queue a job from a web request, starting this process's job threads on first use.
+
+    Threads start lazily so CLI commands that import the app never pick up jobs.
+    """
+    job = get_job_queue().enqueue(kind, user_id, **options)
+    if Config.JOB_WORKERS:
+        start_job_worker()
+    return job
@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import threading
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+from config import Config
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_pending = None
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are already queued; the caller should retry later."""
+    pass
+
+
+def _get_executor():
+    global _executor, _executor_pid, _pending
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                # spawn, not fork: forking a threaded web worker can deadlock the child
+                _executor = ProcessPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS,
+                                                mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=_lower_priority,
+                                                initargs=(Config.PASSWORD_HASH_NICE,))
+                _pending = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_MAX_QUEUE)
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _lower_priority(niceness):
+    # Hash workers yield the CPU to request handling when cores are contended
+    if niceness and hasattr(os, 'nice'):
+        os.nice(niceness)
+
+
+def _run(function, *args):
+    """Run a hashing function in the process pool, or inline when the pool is disabled."""
+    if Config.PASSWORD_HASH_WORKERS <= 0:
+        return function(*args)
+
+    executor = _get_executor()
+    pending = _pending
+    # Fail fast instead of letting a login burst queue up behind the workers
+    if not pending.acquire(blocking=False):
+        raise PasswordHasherBusy("Password hashing queue is full")
+    try:
+        try:
+            future = executor.submit(function, *args)
+        except BaseException:
+            pending.release()
+            raise
+        # The slot is freed when the hash finishes, not when this caller stops
+        # waiting for it, so hashes that timed out still count against the limit
+        future.add_done_callback(lambda _: pending.release())
+        return future.result(timeout=Config.PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        raise PasswordHasherBusy(f"Password hashing took longer than {Config.PASSWORD_HASH_TIMEOUT}s")
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM killed); start a fresh pool next time
+        shutdown()
+        raise PasswordHasherBusy("Password hashing pool restarted")
+
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def hash_password(password):
+    return _run(_hash, password, Config.PASSWORD_HASH_METHOD, Config.PASSWORD_SALT_LENGTH)
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+@lru_cache(maxsize=None)
+def hash_prefix(method):
+    """The method part of hashes werkzeug makes for `method`, with defaults filled in.
+
+    werkzeug expands shorthand, e.g. 'scrypt' to 'scrypt:32768:8:1' and 'pbkdf2'
+    to 'pbkdf2:sha256:1000000', so the configured string cannot be compared as is.
+    The expansion mirrors werkzeug's own, so no hash is computed here.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    return method
+
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with a different method or work factor than configured."""
+    return password_hash.split('$', 1)[0] != hash_prefix(Config.PASSWORD_HASH_METHOD)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
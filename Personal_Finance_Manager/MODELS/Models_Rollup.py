@@ -0,0 +1,162 @@
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from models.database import connection
+
+class MonthlyRollup:
+    """Per-user, per-month, per-category running sums of transactions.
+
+    Kept up to date by Transaction.save()/delete() inside the same database
+    transaction, so readers can answer totals, means and volatility in
+    O(months) instead of scanning every transaction.
+    """
+
+    def __init__(self, user_id=None, month_year=None, category=None, type=None,
+                 total=0, count=0, sum_squares=0):
+        self.user_id = user_id
+        self.month_year = month_year
+        self.category = category
+        self.type = type
+        self.total = total
+        self.count = count
+        self.sum_squares = sum_squares
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    @property
+    def std(self):
+        # Sample standard deviation of the individual transaction amounts
+        if self.count < 2:
+            return 0
+        variance = (self.sum_squares - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0))
+
+    @staticmethod
+    def month_key(transaction_date):
+        if isinstance(transaction_date, (date, datetime)):
+            return transaction_date.strftime('%Y-%m')
+        return str(transaction_date)[:7]
+
+    UPSERT_SQL = """INSERT INTO monthly_rollups (user_id, month_year, category, type, total, txn_count, sum_squares)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total),
+            txn_count = txn_count + VALUES(txn_count),
+            sum_squares = sum_squares + VALUES(sum_squares)"""
+
+    @staticmethod
+    def apply(cursor, user_id, transaction_date, category, type, amount, sign=1):
+        """Add (sign=1) or remove (sign=-1) one transaction using the caller's cursor."""
+        amount = Decimal(str(amount))
+        month_year = MonthlyRollup.month_key(transaction_date)
+        category = category or 'Other'
+        cursor.execute(
+            MonthlyRollup.UPSERT_SQL,
+            (user_id, month_year, category, type, sign * amount, sign, sign * amount * amount)
+        )
+        if sign < 0:
+            cursor.execute(
+                """DELETE FROM monthly_rollups WHERE user_id = %s AND month_year = %s
+                AND category = %s AND type = %s AND txn_count <= 0""",
+                (user_id, month_year, category, type)
+            )
+
+    @staticmethod
+    def apply_many(cursor, added=(), removed=()):
+        """Add and remove batches of transactions, one upsert per affected rollup row."""
+        deltas = {}
+        for transactions, sign in ((added, 1), (removed, -1)):
+            for t in transactions:
+                amount = Decimal(str(t.amount))
+                key = (t.user_id, MonthlyRollup.month_key(t.transaction_date), t.category or 'Other', t.type)
+                delta = deltas.setdefault(key, [Decimal(0), 0, Decimal(0)])
+                delta[0] += sign * amount
+                delta[1] += sign
+                delta[2] += sign * amount * amount
+        if deltas:
+            cursor.executemany(MonthlyRollup.UPSERT_SQL,
+                               [key + tuple(delta) for key, delta in deltas.items()])
+        if removed:
+            for user_id in set(key[0] for key in deltas):
+                cursor.execute("DELETE FROM monthly_rollups WHERE user_id = %s AND txn_count <= 0", (user_id,))
+        return len(deltas)
+
+    @staticmethod
+    def get_user_rollups(user_id, type=None, start_month=None, end_month=None):
+        try:
+            query = """SELECT user_id, month_year, category, type, total, txn_count, sum_squares
+                FROM monthly_rollups WHERE user_id = %s"""
+            params = [user_id]
+            if type:
+                query += " AND type = %s"
+                params.append(type)
+            if start_month:
+                query += " AND month_year >= %s"
+                params.append(start_month)
+            if end_month:
+                query += " AND month_year <= %s"
+                params.append(end_month)
+            query += " ORDER BY month_year"
+
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                cursor.close()
+
+            return [MonthlyRollup(
+                user_id=row[0],
+                month_year=row[1],
+                category=row[2],
+                type=row[3],
+                total=float(row[4]),
+                count=int(row[5]),
+                sum_squares=float(row[6])
+            ) for row in rows]
+        except Exception as e:
+            print(f"Error getting monthly rollups: {e}")
+            return []
+
+    @staticmethod
+    def get_category_totals(user_id, type='expense', month_year=None):
+        try:
+            query = """SELECT category, SUM(total) AS category_total FROM monthly_rollups
+                WHERE user_id = %s AND type = %s"""
+            params = [user_id, type]
+            if month_year:
+                query += " AND month_year = %s"
+                params.append(month_year)
+            query += " GROUP BY category ORDER BY category_total DESC"
+
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                cursor.close()
+
+            return {category: float(total or 0) for category, total in rows}
+        except Exception as e:
+            print(f"Error getting category totals: {e}")
+            return {}
+
+    @staticmethod
+    def rebuild(user_id=None):
+        """Recompute rollups from the transactions table for one user or everyone."""
+        user_clause = " WHERE user_id = %s" if user_id else ""
+        params = (user_id,) if user_id else ()
+
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM monthly_rollups" + user_clause, params)
+            cursor.execute(
+                """INSERT INTO monthly_rollups (user_id, month_year, category, type, total, txn_count, sum_squares)
+                SELECT user_id, SUBSTR(transaction_date, 1, 7), COALESCE(category, 'Other'), type,
+                    SUM(amount), COUNT(*), SUM(amount * amount)
+                FROM transactions""" + user_clause + """
+                GROUP BY user_id, SUBSTR(transaction_date, 1, 7), COALESCE(category, 'Other'), type""",
+                params
+            )
+            rows = cursor.rowcount
+            cursor.close()
+        return rows
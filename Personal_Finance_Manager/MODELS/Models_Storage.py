@@ -0,0 +1,524 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from config import Config
+
+_storage = None
+_storage_lock = threading.Lock()
+# Units of work that failed on each thread, so callers that swallow database
+# errors (models returning [] or None) can still be told apart from real results
+_errors = threading.local()
+
+
+def error_count():
+    """Database units of work that have failed on this thread so far."""
+    return getattr(_errors, 'count', 0)
+
+
+def _note_error():
+    _errors.count = error_count() + 1
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class Storage:
+    """A place the models' tables live, lending out connections one unit of work at a time.
+
+    Connections come from a per-process pool of `pool_size`; callers queue for
+    up to `timeout` seconds when all are in use. Subclasses open and release
+    the actual connections, which look like mysql.connector ones to the models:
+    cursor(dictionary=, buffered=), %s placeholders, commit and rollback.
+    """
+    name = None
+
+    def __init__(self, pool_size=None, timeout=None):
+        self.pool_size = pool_size or Config.MYSQL_POOL_SIZE
+        self.timeout = Config.MYSQL_POOL_TIMEOUT if timeout is None else timeout
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'checkout_timeouts': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'in_use': 0,
+            'peak_in_use': 0,
+            'health_check_failures': 0,
+        }
+
+    def _start(self):
+        """Set up this process's pool; a forked worker must not share connections with its parent."""
+        raise NotImplementedError
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _release(self, conn):
+        raise NotImplementedError
+
+    def initialize(self):
+        """Create the tables from Config.SCHEMA_PATH."""
+        raise NotImplementedError
+
+    def _prepare(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+                    self._slots = threading.BoundedSemaphore(self.pool_size)
+                    self._pid = os.getpid()
+
+    def _checkout(self):
+        self._prepare()
+        started = time.perf_counter()
+        # Drivers raise immediately when their pool is exhausted, so callers
+        # queue on a semaphore instead and the wait time is what we report
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._stats_lock:
+                self._stats['checkout_timeouts'] += 1
+            raise PoolTimeoutError(f"No database connection available after {self.timeout}s")
+
+        try:
+            conn = self._open()
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+            self._stats['in_use'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._stats['in_use'])
+        return conn
+
+    def _checkin(self, conn):
+        try:
+            self._release(conn)
+        finally:
+            self._slots.release()
+            with self._stats_lock:
+                self._stats['in_use'] -= 1
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for one unit of work.
+
+        Commits when the block exits normally, rolls back if it raises, and always
+        returns the connection to the pool.
+        """
+        try:
+            conn = self._checkout()
+        except Exception:
+            _note_error()
+            raise
+        try:
+            yield conn
+            conn.commit()
+        except BaseException as e:
+            if isinstance(e, Exception):
+                _note_error()
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self._checkin(conn)
+
+    def stats(self):
+        """Checkout wait time and utilization counters for sizing the pool."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        checkouts = stats['checkouts']
+        stats['backend'] = self.name
+        stats['pool_size'] = self.pool_size
+        stats['avg_wait_seconds'] = stats['total_wait_seconds'] / checkouts if checkouts else 0.0
+        stats['utilization'] = stats['in_use'] / self.pool_size
+        stats['peak_utilization'] = stats['peak_in_use'] / self.pool_size
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for key in self._stats:
+                if key != 'in_use':
+                    self._stats[key] = 0 if isinstance(self._stats[key], int) else 0.0
+
+
+class MySQLStorage(Storage):
+    """The MySQL server in Config.MYSQL_CONFIG."""
+    name = 'mysql'
+
+    def __init__(self, config=None, pool_size=None, timeout=None):
+        super().__init__(pool_size, timeout)
+        self.config = config or Config.MYSQL_CONFIG
+        self._pool = None
+
+    def _start(self):
+        from mysql.connector import pooling
+
+        self._pool = pooling.MySQLConnectionPool(
+            pool_name=Config.MYSQL_POOL_NAME,
+            pool_size=self.pool_size,
+            pool_reset_session=Config.MYSQL_POOL_RESET_SESSION,
+            **self.config
+        )
+
+    def get_pool(self):
+        self._prepare()
+        return self._pool
+
+    def _open(self):
+        conn = self._pool.get_connection()
+        if Config.MYSQL_POOL_HEALTH_CHECK:
+            try:
+                conn.ping(reconnect=True, attempts=2, delay=0)
+            except Exception:
+                with self._stats_lock:
+                    self._stats['health_check_failures'] += 1
+                conn.close()
+                raise
+        return conn
+
+    def _release(self, conn):
+        conn.close()
+
+    def initialize(self):
+        import mysql.connector
+
+        server = {key: value for key, value in self.config.items() if key != 'database'}
+        conn = mysql.connector.connect(**server)
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.config['database']}")
+        cursor.close()
+        conn.close()
+
+        with open(Config.SCHEMA_PATH, 'r') as f:
+            schema_sql = f.read()
+
+        conn = mysql.connector.connect(**self.config)
+        cursor = conn.cursor()
+        for statement in schema_sql.split(';'):
+            if statement.strip():
+                cursor.execute(statement)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+
+# SQLite stores dates and timestamps as ISO text and DECIMAL columns as REAL;
+# declared column types turn them back into what mysql.connector returns
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+
+WRITE_STATEMENT = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+
+
+@lru_cache(maxsize=1024)
+def translate_query(query):
+    """(SQLite statement, whether it writes) for a statement written for MySQL.
+
+    Covers the MySQL the models use: %s placeholders, SELECT ... FOR UPDATE,
+    INSERT IGNORE and ON DUPLICATE KEY UPDATE with VALUES(column).
+    """
+    locking = re.search(r"\bFOR\s+UPDATE\b", query, re.I) is not None
+    query = re.sub(r"\s+FOR\s+UPDATE\b", "", query, flags=re.I)
+    query = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", query, flags=re.I)
+    upsert = re.search(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", query, re.I)
+    if upsert:
+        # Only the update list's VALUES(column) means the row being inserted
+        tail = re.sub(r"\bVALUES\((\w+)\)", r"excluded.\1", query[upsert.end():], flags=re.I)
+        query = query[:upsert.start()] + "ON CONFLICT DO UPDATE SET" + tail
+    query = query.replace('%s', '?')
+    return query, locking or WRITE_STATEMENT.match(query) is not None
+
+
+def split_top_level(text):
+    """Split on commas outside parentheses."""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def translate_table(statement):
+    match = re.match(r"CREATE TABLE IF NOT EXISTS (\w+)\s*\((.*)\)\s*$", statement, re.S | re.I)
+    table, body = match.groups()
+    columns, indexes, triggers = [], [], []
+    for item in split_top_level(body):
+        index = re.match(r"(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\((.*)\)$", item, re.S | re.I)
+        if index:
+            unique, name, keys = index.groups()
+            if unique:
+                columns.append(f"UNIQUE ({keys})")
+            else:
+                indexes.append(f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} ({keys})")
+            continue
+
+        column = item.split()[0]
+        if re.search(r"\bON UPDATE CURRENT_TIMESTAMP\b", item, re.I):
+            item = re.sub(r"\s+ON UPDATE CURRENT_TIMESTAMP\b", "", item, flags=re.I)
+            triggers.append(
+                f"""CREATE TRIGGER IF NOT EXISTS {table}_{column}_on_update AFTER UPDATE ON {table}
+                FOR EACH ROW WHEN NEW.{column} IS OLD.{column}
+                BEGIN UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END""")
+        item = re.sub(r"\bINT AUTO_INCREMENT PRIMARY KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT", item, flags=re.I)
+        item = re.sub(r"^(\w+)\s+ENUM\s*\(([^)]*)\)", r"\1 TEXT CHECK (\1 IN (\2))", item, flags=re.I)
+        columns.append(item)
+
+    return [f"CREATE TABLE IF NOT EXISTS {table} (\n    " + ",\n    ".join(columns) + "\n)"] + indexes + triggers
+
+
+def translate_schema(script):
+    """SQLite statements for database/schema.sql: the same tables, indexes and sample data."""
+    statements = []
+    script = re.sub(r"--[^\n]*", "", script)
+    for statement in script.split(';'):
+        statement = statement.strip()
+        upper = statement.upper()
+        if not statement or upper.startswith(('SET ', 'USE ', 'CREATE DATABASE')) or 'INFORMATION_SCHEMA' in upper:
+            # Session settings, the server-side database and the summary query
+            continue
+        if upper.startswith('CREATE TABLE'):
+            statements.extend(translate_table(statement))
+        else:
+            statements.append(translate_query(statement)[0])
+    return statements
+
+
+class SQLiteCursor:
+    """A sqlite3 cursor taking MySQL statements, with dictionary rows on request."""
+    def __init__(self, connection, dictionary=False):
+        self.connection = connection
+        self.dictionary = dictionary
+        self._cursor = connection.raw.cursor()
+
+    def execute(self, query, params=()):
+        query, writes = translate_query(query)
+        self.connection.begin(writes)
+        self._cursor.execute(query, tuple(params or ()))
+
+    def executemany(self, query, seq_params):
+        query, writes = translate_query(query)
+        self.connection.begin(writes)
+        self._cursor.executemany(query, [tuple(params) for params in seq_params])
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return dict(zip((column[0] for column in self._cursor.description), row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """A sqlite3 connection that starts transactions the way the models expect from InnoDB.
+
+    The transaction begins with the first statement: IMMEDIATE (taking the
+    write lock) when that statement writes or is a SELECT ... FOR UPDATE, so a
+    read-modify-write cannot interleave with another writer.
+    """
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self, dictionary=False, buffered=True):
+        # sqlite3 reads rows lazily either way, so `buffered` needs no handling
+        return SQLiteCursor(self, dictionary)
+
+    def begin(self, writes):
+        if not self.raw.in_transaction:
+            self.raw.execute("BEGIN IMMEDIATE" if writes else "BEGIN")
+
+    def commit(self):
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT")
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def consume_results(self):
+        pass
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self.raw.execute("SELECT 1")
+
+    def close(self):
+        self.raw.close()
+
+
+class SQLiteStorage(Storage):
+    """An embedded SQLite file at `path`, created from the MySQL schema on first use.
+
+    For the test suite, benchmarks and single-node deployments without a
+    database server. Runs in WAL mode, so readers never wait for the writer,
+    and writers take turns for up to Config.SQLITE_BUSY_TIMEOUT seconds. Use a
+    file path: every connection to ':memory:' would get its own empty database.
+    The file holds password hashes, so it is created 0600 in a private
+    directory and one that is not is refused.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path=None, schema_path=None, pool_size=None, timeout=None):
+        super().__init__(pool_size, timeout)
+        self.path = path or Config.SQLITE_PATH
+        self.schema_path = schema_path or Config.SCHEMA_PATH
+        self._idle = []
+
+    def connect(self):
+        raw = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, isolation_level=None,
+                              detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        raw.execute("PRAGMA foreign_keys=ON")
+        return SQLiteConnection(raw)
+
+    def _start(self):
+        # The parent's connections stay with the parent
+        self._idle = []
+        private_file(self.path)
+        conn = self.connect()
+        try:
+            if conn.raw.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0] == 0:
+                self._create_tables(conn)
+        finally:
+            conn.close()
+
+    def _open(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self.connect()
+
+    def _release(self, conn):
+        # Never hand the next caller an open transaction
+        conn.rollback()
+        with self._lock:
+            self._idle.append(conn)
+
+    def _create_tables(self, conn):
+        with open(self.schema_path, 'r') as f:
+            statements = translate_schema(f.read())
+        # One IMMEDIATE transaction, so processes starting together create the tables once
+        conn.raw.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in statements:
+                conn.raw.execute(statement)
+            conn.raw.execute("COMMIT")
+        except BaseException:
+            conn.raw.execute("ROLLBACK")
+            raise
+
+    def initialize(self):
+        conn = self.connect()
+        try:
+            self._create_tables(conn)
+        finally:
+            conn.close()
+
+    def close(self):
+        """Close the idle connections, e.g. before a test deletes the file."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+STORAGE_BACKENDS = {'mysql': MySQLStorage, 'sqlite': SQLiteStorage}
+
+
+def check_private(path):
+    """Refuse (PermissionError) a file or directory another user owns or can reach.
+
+    Caches and job queues are trusted when read back, so whoever can write
+    them can act as any user of the app.
+    """
+    if not hasattr(os, 'getuid'):
+        return
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be owned by uid {os.getuid()} with no group or other access "
+                              f"(found uid {info.st_uid}, mode {info.st_mode & 0o777:o})")
+
+
+def private_dir(path):
+    """Create `path` as a 0700 directory, or check the existing one is private."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    check_private(path)
+    return path
+
+
+def private_file(path):
+    """Create `path` as a 0600 file in a private directory, or check the existing one is private."""
+    private_dir(os.path.dirname(os.path.abspath(path)))
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600))
+    check_private(path)
+    return path
+
+
+def get_storage():
+    """The process-wide storage for Config.DATABASE_BACKEND, created on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if Config.DATABASE_BACKEND not in STORAGE_BACKENDS:
+                    raise ValueError(f"Unknown database backend: {Config.DATABASE_BACKEND}")
+                _storage = STORAGE_BACKENDS[Config.DATABASE_BACKEND]()
+    return _storage
+
+
+def use_storage(storage):
+    """Make `storage` the process-wide storage and return the previous one (for tests and benchmarks)."""
+    global _storage
+    with _storage_lock:
+        previous, _storage = _storage, storage
+    return previous
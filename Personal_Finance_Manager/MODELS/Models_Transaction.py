@@ -1,8 +1,28 @@
-import mysql.connector
-from config import Config
-from datetime import datetime
+from models.database import connection
+from models.rollup import MonthlyRollup
+from models.cache import bump_data_version
+from datetime import date, datetime
+import base64
+
+def to_date(value):
+    """A transaction date as a `date`, from a date, datetime or 'YYYY-MM-DD' string."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def forget_categories(user_id):
+    """Drop the user's memoized description categories after they recategorize a transaction."""
+    # The memo only exists in processes that have categorized something
+    from ml_models.model_registry import is_loaded, get_category_memo
+    if is_loaded('category_memo'):
+        get_category_memo().invalidate(user_id)
 
 class Transaction:
+    # Analytics can hold tens of thousands of these; slots drop the per-instance __dict__
+    __slots__ = ('id', 'user_id', 'amount', 'description', 'category', 'type', 'transaction_date')
+
     def __init__(self, id=None, user_id=None, amount=0, description="", category="Other", 
                  type="expense", transaction_date=None):
         self.id = id
@@ -11,81 +31,510 @@ class Transaction:
         self.description = description
         self.category = category
         self.type = type
-        self.transaction_date = transaction_date or datetime.now().date()
+        self.transaction_date = to_date(transaction_date) if transaction_date else datetime.now().date()
 
     def save(self):
+        owner_id = None
+        recategorized = False
         try:
-            conn = mysql.connector.connect(**Config.MYSQL_CONFIG)
-            cursor = conn.cursor()
-            
-            if self.id:
-                cursor.execute(
-                    """UPDATE transactions SET amount=%s, description=%s, category=%s, 
-                    type=%s, transaction_date=%s WHERE id=%s""",
-                    (self.amount, self.description, self.category, self.type, 
-                     self.transaction_date, self.id)
-                )
-            else:
-                cursor.execute(
+            with connection() as conn:
+                cursor = conn.cursor()
+                
+                if self.id:
+                    cursor.execute(
+                        """SELECT user_id, amount, category, type, transaction_date
+                        FROM transactions WHERE id=%s FOR UPDATE""",
+                        (self.id,)
+                    )
+                    old = cursor.fetchone()
+                    cursor.execute(
+                        """UPDATE transactions SET amount=%s, description=%s, category=%s, 
+                        type=%s, transaction_date=%s WHERE id=%s""",
+                        (self.amount, self.description, self.category, self.type, 
+                         self.transaction_date, self.id)
+                    )
+                    if old:
+                        old_user_id, old_amount, old_category, old_type, old_date = old
+                        owner_id = old_user_id
+                        recategorized = old_category != self.category
+                        MonthlyRollup.apply(cursor, old_user_id, old_date, old_category,
+                                            old_type, old_amount, sign=-1)
+                        MonthlyRollup.apply(cursor, old_user_id, self.transaction_date, self.category,
+                                            self.type, self.amount)
+                else:
+                    cursor.execute(
+                        """INSERT INTO transactions (user_id, amount, description, category, type, transaction_date) 
+                        VALUES (%s, %s, %s, %s, %s, %s)""",
+                        (self.user_id, self.amount, self.description, self.category, 
+                         self.type, self.transaction_date)
+                    )
+                    self.id = cursor.lastrowid
+                    owner_id = self.user_id
+                    MonthlyRollup.apply(cursor, self.user_id, self.transaction_date, self.category,
+                                        self.type, self.amount)
+                
+                cursor.close()
+            if owner_id is not None:
+                bump_data_version(owner_id)
+            if recategorized:
+                forget_categories(owner_id)
+            return True
+        except Exception as e:
+            print(f"Error saving transaction: {e}")
+            return False
+
+    @staticmethod
+    def bulk_insert(transactions):
+        """Insert new transactions and their rollups in one database transaction.
+
+        Uses a multi-row INSERT, so ids are not assigned back to the objects.
+        """
+        if not transactions:
+            return True
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
                     """INSERT INTO transactions (user_id, amount, description, category, type, transaction_date) 
                     VALUES (%s, %s, %s, %s, %s, %s)""",
-                    (self.user_id, self.amount, self.description, self.category, 
-                     self.type, self.transaction_date)
+                    [(t.user_id, t.amount, t.description, t.category, t.type, t.transaction_date)
+                     for t in transactions]
                 )
-                self.id = cursor.lastrowid
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
+                MonthlyRollup.apply_many(cursor, added=transactions)
+                cursor.close()
+            for user_id in {t.user_id for t in transactions}:
+                bump_data_version(user_id)
             return True
         except Exception as e:
-            print(f"Error saving transaction: {e}")
+            print(f"Error bulk inserting transactions: {e}")
             return False
 
+    @staticmethod
+    def from_row(data):
+        return Transaction(
+            id=data['id'],
+            user_id=data['user_id'],
+            amount=float(data['amount']),
+            description=data['description'],
+            category=data['category'],
+            type=data['type'],
+            transaction_date=data['transaction_date']
+        )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'amount': self.amount,
+            'description': self.description,
+            'category': self.category,
+            'type': self.type,
+            'date': self.transaction_date.isoformat()
+        }
+
     @staticmethod
     def get_user_transactions(user_id, limit=None):
         try:
-            conn = mysql.connector.connect(**Config.MYSQL_CONFIG)
-            cursor = conn.cursor(dictionary=True)
+            with connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                query = "SELECT * FROM transactions WHERE user_id = %s ORDER BY transaction_date DESC, id DESC"
+                if limit:
+                    query += " LIMIT %s"
+                    cursor.execute(query, (user_id, limit))
+                else:
+                    cursor.execute(query, (user_id,))
+                
+                transactions_data = cursor.fetchall()
+                cursor.close()
             
-            query = "SELECT * FROM transactions WHERE user_id = %s ORDER BY transaction_date DESC"
-            if limit:
-                query += " LIMIT %s"
-                cursor.execute(query, (user_id, limit))
-            else:
-                cursor.execute(query, (user_id,))
+            return [Transaction.from_row(data) for data in transactions_data]
+        except Exception as e:
+            print(f"Error getting user transactions: {e}")
+            return []
+
+    @staticmethod
+    def encode_cursor(transaction):
+        """Opaque pagination cursor pointing just past the given transaction."""
+        raw = f"{transaction.transaction_date}:{transaction.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """(transaction_date, id) from encode_cursor; ValueError if it is malformed."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            day, transaction_id = raw.split(':')
+            return datetime.strptime(day, '%Y-%m-%d').date(), int(transaction_id)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+
+    @staticmethod
+    def _filter_clause(start_date=None, end_date=None, category=None, type=None, after=None):
+        clause, params = Transaction._date_range_filter(start_date, end_date)
+        if category:
+            clause += " AND category = %s"
+            params.append(category)
+        if type:
+            clause += " AND type = %s"
+            params.append(type)
+        if after:
+            # Keyset condition for ORDER BY transaction_date DESC, id DESC
+            day, transaction_id = after
+            clause += " AND (transaction_date < %s OR (transaction_date = %s AND id < %s))"
+            params += [day, day, transaction_id]
+        return clause, params
+
+    @staticmethod
+    def get_page(user_id, limit=100, after=None, **filters):
+        """One page of the user's transactions, newest first, and the cursor for the next.
+
+        `after` is a decoded cursor; filters are start_date, end_date, category and
+        type. The next cursor is None on the last page. Database errors are
+        raised, so an outage is not mistaken for an empty page.
+        """
+        try:
+            clause, params = Transaction._filter_clause(after=after, **filters)
+            with connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                # One extra row tells us whether another page exists
+                cursor.execute(
+                    "SELECT * FROM transactions WHERE user_id = %s" + clause +
+                    " ORDER BY transaction_date DESC, id DESC LIMIT %s",
+                    [user_id] + params + [limit + 1]
+                )
+                rows = cursor.fetchall()
+                cursor.close()
             
-            transactions_data = cursor.fetchall()
+            transactions = [Transaction.from_row(data) for data in rows[:limit]]
+            next_cursor = Transaction.encode_cursor(transactions[-1]) if len(rows) > limit else None
+            return transactions, next_cursor
+        except Exception as e:
+            print(f"Error getting transaction page: {e}")
+            raise
+
+    @staticmethod
+    def iter_user_transactions(user_id, batch_size=1000, **filters):
+        """Yield the user's transactions newest first without loading them all.
+
+        Rows are read from an unbuffered cursor, so the connection stays checked
+        out until the generator is exhausted or closed. Database errors are
+        raised, so a streamed response is cut off rather than ending as if
+        every row had been sent.
+        """
+        try:
+            clause, params = Transaction._filter_clause(**filters)
+            with connection() as conn:
+                cursor = conn.cursor(dictionary=True, buffered=False)
+                finished = False
+                try:
+                    cursor.execute(
+                        "SELECT * FROM transactions WHERE user_id = %s" + clause +
+                        " ORDER BY transaction_date DESC, id DESC",
+                        [user_id] + params
+                    )
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        for data in rows:
+                            yield Transaction.from_row(data)
+                    finished = True
+                finally:
+                    if not finished:
+                        # Stopped early (e.g. the client disconnected): drain the
+                        # rest of the result so the connection can be reused
+                        conn.consume_results()
+                    cursor.close()
+        except Exception as e:
+            print(f"Error streaming user transactions: {e}")
+            raise
+
+    @staticmethod
+    def get_labelled_batch(after_id=0, limit=5000):
+        """(id, description, amount, type, category) rows with id > after_id, in id order.
+
+        For training the categorizer a chunk at a time; errors are raised
+        rather than read as an empty table.
+        """
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT id, description, amount, type, category FROM transactions
+                WHERE id > %s AND category IS NOT NULL ORDER BY id LIMIT %s""",
+                (after_id, limit)
+            )
+            rows = cursor.fetchall()
             cursor.close()
-            conn.close()
-            
-            transactions = []
-            for data in transactions_data:
-                transactions.append(Transaction(
-                    id=data['id'],
-                    user_id=data['user_id'],
-                    amount=float(data['amount']),
-                    description=data['description'],
-                    category=data['category'],
-                    type=data['type'],
-                    transaction_date=data['transaction_date']
-                ))
-            
-            return transactions
+        return rows
+
+    @staticmethod
+    def get_description_history(user_id, limit=2000):
+        """(description, type, category) for the user's most recently used descriptions, oldest first."""
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """SELECT description, type, category FROM transactions
+                    WHERE user_id = %s AND category IS NOT NULL
+                    GROUP BY description, type, category
+                    ORDER BY MAX(updated_at) DESC, MAX(id) DESC LIMIT %s""",
+                    (user_id, limit)
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+            # Oldest first, so a later recategorization overrides an earlier one
+            return rows[::-1]
         except Exception as e:
-            print(f"Error getting user transactions: {e}")
+            print(f"Error getting description history: {e}")
             return []
 
     @staticmethod
-    def delete(transaction_id):
+    def get_frequent_merchants(min_users=3, limit=5000):
+        """(description, type, category, users) for descriptions that many users gave the same category."""
         try:
-            conn = mysql.connector.connect(**Config.MYSQL_CONFIG)
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """SELECT description, type, category, COUNT(DISTINCT user_id) AS users
+                    FROM transactions WHERE category IS NOT NULL
+                    GROUP BY description, type, category
+                    HAVING users >= %s ORDER BY users DESC LIMIT %s""",
+                    (min_users, limit)
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+            return rows
+        except Exception as e:
+            print(f"Error getting frequent merchants: {e}")
+            return []
+
+    @staticmethod
+    def get_categories():
+        """Every category in use across all users."""
+        with connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM transactions WHERE id = %s", (transaction_id,))
-            conn.commit()
+            cursor.execute("SELECT DISTINCT category FROM transactions WHERE category IS NOT NULL")
+            categories = [row[0] for row in cursor.fetchall()]
             cursor.close()
-            conn.close()
+        return categories
+
+    @staticmethod
+    def _date_range_filter(start_date=None, end_date=None):
+        clause = ""
+        params = []
+        if start_date:
+            clause += " AND transaction_date >= %s"
+            params.append(start_date)
+        if end_date:
+            clause += " AND transaction_date <= %s"
+            params.append(end_date)
+        return clause, params
+
+    @staticmethod
+    def get_totals_by_type(user_id, start_date=None, end_date=None):
+        totals = {'income': 0.0, 'expense': 0.0}
+        try:
+            date_clause, date_params = Transaction._date_range_filter(start_date, end_date)
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT type, SUM(amount) FROM transactions WHERE user_id = %s"
+                    + date_clause + " GROUP BY type",
+                    [user_id] + date_params
+                )
+                for transaction_type, total in cursor.fetchall():
+                    totals[transaction_type] = float(total or 0)
+                cursor.close()
+        except Exception as e:
+            print(f"Error getting totals by type: {e}")
+        return totals
+
+    @staticmethod
+    def get_totals_by_category(user_id, type='expense', start_date=None, end_date=None):
+        try:
+            date_clause, date_params = Transaction._date_range_filter(start_date, end_date)
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT category, SUM(amount) AS total FROM transactions WHERE user_id = %s AND type = %s"
+                    + date_clause + " GROUP BY category ORDER BY total DESC",
+                    [user_id, type] + date_params
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+            return {category: float(total or 0) for category, total in rows}
+        except Exception as e:
+            print(f"Error getting totals by category: {e}")
+            return {}
+
+    @staticmethod
+    def get_totals_by_month(user_id, type=None, start_date=None, end_date=None):
+        try:
+            date_clause, date_params = Transaction._date_range_filter(start_date, end_date)
+            type_clause = ""
+            params = [user_id]
+            if type:
+                type_clause = " AND type = %s"
+                params.append(type)
+            with connection() as conn:
+                cursor = conn.cursor()
+                # SUBSTR on a DATE yields 'YYYY-MM', the same format budgets use
+                cursor.execute(
+                    """SELECT SUBSTR(transaction_date, 1, 7) AS month, type, SUM(amount), COUNT(*)
+                    FROM transactions WHERE user_id = %s""" + type_clause + date_clause +
+                    " GROUP BY month, type ORDER BY month",
+                    params + date_params
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+            return [{
+                'month': month,
+                'type': transaction_type,
+                'total': float(total or 0),
+                'count': count
+            } for month, transaction_type, total, count in rows]
+        except Exception as e:
+            print(f"Error getting totals by month: {e}")
+            return []
+
+    @staticmethod
+    def get_daily_totals(user_id, start_date=None, end_date=None):
+        """(date, expense total) for every day with a transaction, oldest first."""
+        try:
+            date_clause, date_params = Transaction._date_range_filter(start_date, end_date)
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """SELECT transaction_date, SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END)
+                    FROM transactions WHERE user_id = %s""" + date_clause +
+                    " GROUP BY transaction_date ORDER BY transaction_date",
+                    [user_id] + date_params
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+            return [(day, float(total or 0)) for day, total in rows]
+        except Exception as e:
+            print(f"Error getting daily totals: {e}")
+            return []
+
+    @staticmethod
+    def delete(transaction_id, user_id=None):
+        """Delete one transaction; with user_id, only if that user owns it."""
+        try:
+            owner_clause = " AND user_id = %s" if user_id is not None else ""
+            params = (transaction_id, user_id) if user_id is not None else (transaction_id,)
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """SELECT user_id, amount, category, type, transaction_date
+                    FROM transactions WHERE id = %s""" + owner_clause + " FOR UPDATE",
+                    params
+                )
+                old = cursor.fetchone()
+                if not old:
+                    cursor.close()
+                    return False
+                cursor.execute("DELETE FROM transactions WHERE id = %s", (transaction_id,))
+                owner_id, amount, category, transaction_type, transaction_date = old
+                MonthlyRollup.apply(cursor, owner_id, transaction_date, category,
+                                    transaction_type, amount, sign=-1)
+                cursor.close()
+            bump_data_version(owner_id)
             return True
         except Exception as e:
             print(f"Error deleting transaction: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    @classmethod
+    def get_owned(cls, cursor, user_id, transaction_ids, for_update=False):
+        """{id: Transaction} for the ids in the list that belong to user_id, in one query."""
+        if not transaction_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(transaction_ids))
+        cursor.execute(
+            """SELECT id, user_id, amount, description, category, type, transaction_date
+            FROM transactions WHERE user_id = %s AND id IN (""" + placeholders + ")" +
+            (" FOR UPDATE" if for_update else ""),
+            [user_id] + list(transaction_ids)
+        )
+        columns = [column[0] for column in cursor.description]
+        return {row[0]: cls.from_row(dict(zip(columns, row))) for row in cursor.fetchall()}
+
+    @classmethod
+    def apply_batch(cls, user_id, saves=(), deletes=()):
+        """Save and delete a user's transactions in one database transaction.
+
+        `saves` are Transaction objects: new ones (no id) are created, others
+        replace the stored row. `deletes` are ids. Ownership of every id is
+        checked with one query; ids the user does not own are reported as
+        'not_found' and left alone. Returns (save_results, delete_results), one
+        dict per input item, or None if the database rejected the batch, in
+        which case nothing was applied.
+        """
+        saves, deletes = list(saves), list(deletes)
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                owned = cls.get_owned(cursor, user_id,
+                                      [t.id for t in saves if t.id] + list(deletes), for_update=True)
+                save_results, added, removed = [], [], []
+                recategorized = False
+                
+                for transaction in saves:
+                    transaction.user_id = user_id
+                    if not transaction.id:
+                        cursor.execute(
+                            """INSERT INTO transactions (user_id, amount, description, category, type, transaction_date) 
+                            VALUES (%s, %s, %s, %s, %s, %s)""",
+                            (user_id, transaction.amount, transaction.description, transaction.category,
+                             transaction.type, transaction.transaction_date)
+                        )
+                        transaction.id = cursor.lastrowid
+                        save_results.append({'id': transaction.id, 'status': 'created'})
+                    elif transaction.id in owned:
+                        cursor.execute(
+                            """UPDATE transactions SET amount=%s, description=%s, category=%s, 
+                            type=%s, transaction_date=%s WHERE id=%s""",
+                            (transaction.amount, transaction.description, transaction.category,
+                             transaction.type, transaction.transaction_date, transaction.id)
+                        )
+                        removed.append(owned[transaction.id])
+                        recategorized = recategorized or owned[transaction.id].category != transaction.category
+                        save_results.append({'id': transaction.id, 'status': 'updated'})
+                    else:
+                        save_results.append({'id': transaction.id, 'status': 'not_found'})
+                        continue
+                    added.append(transaction)
+                
+                delete_ids = [transaction_id for transaction_id in deletes if transaction_id in owned]
+                if delete_ids:
+                    cursor.execute(
+                        "DELETE FROM transactions WHERE user_id = %s AND id IN (" +
+                        ', '.join(['%s'] * len(delete_ids)) + ")",
+                        [user_id] + delete_ids
+                    )
+                    removed.extend(owned[transaction_id] for transaction_id in delete_ids)
+                delete_results = [{'id': transaction_id,
+                                   'status': 'deleted' if transaction_id in owned else 'not_found'}
+                                  for transaction_id in deletes]
+                
+                MonthlyRollup.apply_many(cursor, added=added, removed=removed)
+                cursor.close()
+            if added or removed:
+                bump_data_version(user_id)
+            if recategorized:
+                forget_categories(user_id)
+            return save_results, delete_results
+        except Exception as e:
+            print(f"Error applying transaction batch: {e}")
+            return None
+
+    @classmethod
+    def bulk_save(cls, user_id, transactions):
+        results = cls.apply_batch(user_id, saves=transactions)
+        return results[0] if results else None
+
+    @classmethod
+    def bulk_delete(cls, user_id, transaction_ids):
+        results = cls.apply_batch(user_id, deletes=transaction_ids)
+        return results[1] if results else None
@@ -0,0 +1,174 @@
+import numpy as np
+from datetime import date
+from models.database import connection
+from models.transaction import Transaction
+
+# date.toordinal() of 1970-01-01, to convert datetime64[D] day numbers to ordinals
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def fetch_rows(cursor, batch_size=10000):
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def to_datetime64(dates):
+    try:
+        # date.toordinal is far cheaper than NumPy parsing each date object
+        ordinals = np.fromiter(map(date.toordinal, dates), dtype=np.int64, count=len(dates))
+        return (ordinals - EPOCH_ORDINAL).astype('datetime64[D]')
+    except TypeError:
+        # e.g. 'YYYY-MM-DD' strings from a form
+        return np.array(dates, dtype='datetime64[D]')
+
+
+class TransactionColumns:
+    """A user's transactions as parallel NumPy arrays instead of one object per row.
+
+    Amounts are exact int64 cents, dates datetime64[D], and type and category
+    small integer codes into the `types` and `categories` lookup lists.
+    Descriptions stay a Python list; they are only read for the few rows an
+    analysis reports back. Rows are newest first, like get_user_transactions.
+    """
+    TYPES = ['expense', 'income']
+    COLUMNS = "id, ROUND(amount * 100), description, category, type, transaction_date"
+
+    def __init__(self, ids, amount_cents, dates, type_codes, category_codes, categories, descriptions):
+        self.ids = ids
+        self.amount_cents = amount_cents
+        self.dates = dates
+        self.type_codes = type_codes
+        self.category_codes = category_codes
+        self.categories = categories
+        self.types = self.TYPES
+        self.descriptions = descriptions
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def amounts(self):
+        return self.amount_cents / 100.0
+
+    @property
+    def is_expense(self):
+        return self.type_codes == self.TYPES.index('expense')
+
+    @property
+    def description_lengths(self):
+        return np.fromiter((len(d) for d in self.descriptions), dtype=np.int32, count=len(self.descriptions))
+
+    @property
+    def ordinals(self):
+        return self.dates.astype(np.int64) + EPOCH_ORDINAL
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, 'datetime64[D]'),
+                   np.zeros(0, np.int8), np.zeros(0, np.int16), [], [])
+
+    @classmethod
+    def from_rows(cls, rows, batch_size=10000):
+        """Build from (id, amount_cents, description, category, type, date) tuples.
+
+        Rows are converted a batch at a time so only one batch of Python
+        objects is alive alongside the arrays.
+        """
+        category_lookup = {}
+        type_lookup = {name: code for code, name in enumerate(cls.TYPES)}
+        parts = []
+        descriptions = []
+        batch = []
+
+        def flush():
+            ids, cents, texts, categories, types, dates = zip(*batch)
+            parts.append((
+                np.array(ids, dtype=np.int64),
+                np.array(cents, dtype=np.int64),
+                to_datetime64(dates),
+                np.array([type_lookup[t] for t in types], dtype=np.int8),
+                np.array([category_lookup.setdefault(c or 'Other', len(category_lookup)) for c in categories],
+                         dtype=np.int16),
+            ))
+            descriptions.extend(text or '' for text in texts)
+            batch.clear()
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        if not parts:
+            return cls.empty()
+
+        columns = [np.concatenate(arrays) for arrays in zip(*parts)]
+        return cls(*columns, categories=list(category_lookup), descriptions=descriptions)
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        return cls.from_rows((t.id or 0, round(t.amount * 100), t.description, t.category, t.type,
+                              t.transaction_date) for t in transactions)
+
+    @classmethod
+    def load(cls, user_id, **filters):
+        """Fetch a user's transactions as columns; filters as for Transaction.get_page."""
+        try:
+            clause, params = Transaction._filter_clause(**filters)
+            with connection() as conn:
+                # Unbuffered, so raw tuples are converted batch by batch as they arrive
+                cursor = conn.cursor(buffered=False)
+                cursor.execute(
+                    "SELECT " + cls.COLUMNS + " FROM transactions WHERE user_id = %s" + clause +
+                    " ORDER BY transaction_date DESC, id DESC",
+                    [user_id] + params
+                )
+                columns = cls.from_rows(fetch_rows(cursor))
+                cursor.close()
+            return columns
+        except Exception as e:
+            print(f"Error loading transaction columns: {e}")
+            return cls.empty()
+
+    def select(self, mask):
+        """The rows where mask is true (a boolean array or index array)."""
+        indexes = np.flatnonzero(mask) if np.asarray(mask).dtype == bool else np.asarray(mask)
+        return TransactionColumns(
+            self.ids[indexes], self.amount_cents[indexes], self.dates[indexes],
+            self.type_codes[indexes], self.category_codes[indexes], self.categories,
+            [self.descriptions[i] for i in indexes]
+        )
+
+    def category_names(self):
+        return np.array(self.categories, dtype=object)[self.category_codes] if len(self) else np.zeros(0, object)
+
+    def category_totals(self, type='expense'):
+        """{category: total} for one transaction type, largest first, like MonthlyRollup.get_category_totals."""
+        mask = self.type_codes == self.TYPES.index(type)
+        codes = self.category_codes[mask]
+        counts = np.bincount(codes, minlength=len(self.categories))
+        cents = np.bincount(codes, weights=self.amount_cents[mask], minlength=len(self.categories))
+        order = np.argsort(-cents, kind='stable')
+        return {self.categories[i]: float(cents[i]) / 100 for i in order if counts[i]}
+
+    def daily_expense_totals(self):
+        """(date, expense total) per transaction date, oldest first, like SpendingPredictor's."""
+        if not len(self):
+            return []
+        days, inverse = np.unique(self.dates, return_inverse=True)
+        cents = np.bincount(inverse, weights=np.where(self.is_expense, self.amount_cents, 0))
+        return list(zip(days.astype(object), (cents / 100.0).tolist()))
+
+    def row(self, index):
+        """Transaction for one row, for code that still wants objects."""
+        return Transaction(
+            id=int(self.ids[index]),
+            amount=float(self.amount_cents[index]) / 100,
+            description=self.descriptions[index],
+            category=self.categories[self.category_codes[index]],
+            type=self.TYPES[self.type_codes[index]],
+            transaction_date=self.dates[index].astype(object)
+        )
@@ -1,46 +1,89 @@
-import mysql.connector
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from models.database import connection
+from models.passwords import hash_password, verify_password, needs_rehash
+from models.cache import get_cache
 from config import Config
 
+def user_cache():
+    return get_cache('users', maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
+
 class User(UserMixin):
-    def __init__(self, id, username, email, password_hash):
+    def __init__(self, id, username, email, password_hash=None):
         self.id = id
         self.username = username
         self.email = email
         self.password_hash = password_hash
 
+    def cache_fields(self):
+        # Plain tuples, so every request gets its own User and the shared backend can store them
+        # as JSON. The password hash stays out of the cache; check_password reads it when needed.
+        return (self.id, self.username, self.email)
+
     @staticmethod
     def get_by_id(user_id):
+        """Look a user up by id, from the user cache when possible.
+
+        Flask-Login calls this on every authenticated request. Users from the
+        cache have no password_hash.
+        """
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        cached = user_cache().get(user_id)
+        if cached is not None:
+            return User(*cached)
+        
         try:
-            conn = mysql.connector.connect(**Config.MYSQL_CONFIG)
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-            user_data = cursor.fetchone()
-            cursor.close()
-            conn.close()
+            with connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+                user_data = cursor.fetchone()
+                cursor.close()
             
             if user_data:
-                return User(
+                user = User(
                     id=user_data['id'],
                     username=user_data['username'],
                     email=user_data['email'],
                     password_hash=user_data['password_hash']
                 )
+                user_cache().set(user_id, user.cache_fields())
+                return user
             return None
         except Exception as e:
             print(f"Error getting user by ID: {e}")
             return None
 
+    @staticmethod
+    def invalidate_cache(user_id):
+        user_cache().delete(int(user_id))
+
+    def save(self):
+        """Write username, email and password hash back and drop the cached copy."""
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE users SET username = %s, email = %s, password_hash = COALESCE(%s, password_hash) WHERE id = %s",
+                    (self.username, self.email, self.password_hash, self.id)
+                )
+                cursor.close()
+            return True
+        except Exception as e:
+            print(f"Error saving user: {e}")
+            return False
+        finally:
+            User.invalidate_cache(self.id)
+
     @staticmethod
     def get_by_username(username):
         try:
-            conn = mysql.connector.connect(**Config.MYSQL_CONFIG)
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-            user_data = cursor.fetchone()
-            cursor.close()
-            conn.close()
+            with connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+                user_data = cursor.fetchone()
+                cursor.close()
             
             if user_data:
                 return User(
@@ -56,20 +99,19 @@ class User(UserMixin):
 
     @staticmethod
     def create(username, email, password):
+        # Outside the try: a full hashing queue (PasswordHasherBusy) is for the route to report
+        password_hash = hash_password(password)
         try:
-            password_hash = generate_password_hash(password)
-            conn = mysql.connector.connect(**Config.MYSQL_CONFIG)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
-                (username, email, password_hash)
-            )
-            
-            conn.commit()
-            user_id = cursor.lastrowid
-            cursor.close()
-            conn.close()
+            with connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(
+                    "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                    (username, email, password_hash)
+                )
+                
+                user_id = cursor.lastrowid
+                cursor.close()
             
             return User(user_id, username, email, password_hash)
         except Exception as e:
@@ -77,4 +119,23 @@ class User(UserMixin):
             return None
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
\ No newline at end of file
+        """Verify in the hashing pool; may raise PasswordHasherBusy.
+
+        A correct password stored with an old method or work factor is rehashed
+        with the current Config.PASSWORD_HASH_METHOD and saved.
+        """
+        if self.password_hash is None:
+            stored = User.get_by_username(self.username)
+            if stored is None or stored.id != self.id:
+                return False
+            self.password_hash = stored.password_hash
+        if not verify_password(self.password_hash, password):
+            return False
+        if needs_rehash(self.password_hash):
+            try:
+                self.password_hash = hash_password(password)
+                self.save()
+            except Exception as e:
+                # The login itself succeeded; upgrade on a later one
+                print(f"Error upgrading password hash: {e}")
+        return True
@@ -0,0 +1,43 @@
+import math
+
+# Input checks shared by the web routes and the models. Kept free of heavy
+# imports so routes can use them without loading scikit-learn.
+
+# Column sizes from the schema: category VARCHAR(50), description TEXT
+CATEGORY_MAX_LENGTH = 50
+DESCRIPTION_MAX_BYTES = 65535
+
+
+def parse_amount(value):
+    """A row's amount as a finite float (missing counts as 0); ValueError otherwise."""
+    if isinstance(value, bool):
+        raise ValueError("amount must be a number")
+    try:
+        amount = float(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError("amount must be a number")
+    if not math.isfinite(amount):
+        raise ValueError("amount must be finite")
+    return amount
+
+
+def parse_description(value):
+    """A row's description as a string (missing counts as ''); ValueError otherwise."""
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError("description must be a string")
+    if len(value.encode('utf-8')) > DESCRIPTION_MAX_BYTES:
+        raise ValueError(f"description must be at most {DESCRIPTION_MAX_BYTES} bytes")
+    return value
+
+
+def parse_category(value):
+    """A category name, or None when missing or empty; ValueError otherwise."""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        raise ValueError("category must be a string")
+    if len(value) > CATEGORY_MAX_LENGTH:
+        raise ValueError(f"category must be at most {CATEGORY_MAX_LENGTH} characters")
+    return value
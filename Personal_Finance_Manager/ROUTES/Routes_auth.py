@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from models.user import User
+from models.passwords import PasswordHasherBusy
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -23,7 +24,11 @@ def register():
             flash('Username already exists', 'error')
             return render_template('register.html')
         
-        user = User.create(username, email, password)
+        try:
+            user = User.create(username, email, password)
+        except PasswordHasherBusy:
+            flash('The server is busy, please try again in a moment', 'error')
+            return render_template('register.html'), 503
         if user:
             flash('Registration successful! Please login.', 'success')
             return redirect(url_for('auth.login'))
@@ -42,7 +47,12 @@ def login():
         password = request.form['password']
         
         user = User.get_by_username(username)
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except PasswordHasherBusy:
+            flash('The server is busy, please try again in a moment', 'error')
+            return render_template('login.html'), 503
+        if valid:
             login_user(user)
             flash('Login successful!', 'success')
             return redirect(url_for('dashboard'))
@@ -1,14 +1,14 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from models.transaction import Transaction
-from ml_models.ai_categorizer import ExpenseCategorizer
-from ml_models.spending_predictor import SpendingPredictor
-from ml_models.anomaly_detector import AnomalyDetector
+from config import Config
+from ml_models.model_registry import get_categorizer, get_category_memo
+from models.validation import parse_amount, parse_description
+from models.jobs import enqueue_job
+from routes.cache import user_cached
+from routes.jobs import accepted
 
 ai_insights_bp = Blueprint('ai_insights', __name__)
-categorizer = ExpenseCategorizer()
-predictor = SpendingPredictor()
-anomaly_detector = AnomalyDetector()
 
 @ai_insights_bp.route('/api/ai/predict_category', methods=['POST'])
 @login_required
@@ -17,21 +17,66 @@ def predict_category():
     description = data.get('description', '')
     amount = data.get('amount', 0)
     transaction_type = data.get('type', 'expense')
+    try:
+        parse_description(description)
+        parse_amount(amount)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    category = categorizer.predict_category(description, amount, transaction_type)
+    prediction = get_categorizer().predict_categories([{
+        'description': description,
+        'amount': amount,
+        'type': transaction_type
+    }], with_confidence=True)[0]
     
-    return jsonify({
-        'category': category,
-        'confidence': 'high'  # Simplified for demo
-    })
+    return jsonify(prediction)
+
+@ai_insights_bp.route('/api/ai/predict_categories', methods=['POST'])
+@login_required
+def predict_categories():
+    batch = request.get_json(silent=True)
+    
+    if not isinstance(batch, list) or not all(isinstance(item, dict) for item in batch):
+        return jsonify({'error': 'Expected a JSON array of {description, amount, type} objects'}), 400
+    if len(batch) > Config.MAX_CATEGORIZE_BATCH:
+        return jsonify({'error': f'At most {Config.MAX_CATEGORIZE_BATCH} transactions per request'}), 413
+    for i, item in enumerate(batch):
+        try:
+            parse_description(item.get('description'))
+            parse_amount(item.get('amount'))
+        except ValueError as e:
+            return jsonify({'error': f'Row {i}: {e}', 'row': i}), 400
+    
+    return jsonify(get_categorizer().predict_categories(batch, with_confidence=True))
+
+@ai_insights_bp.route('/api/ai/retrain', methods=['POST'])
+@login_required
+def retrain_categorizer():
+    """Queue a categorizer retrain ({"full": true} to start over); at most one is ever waiting.
+
+    The model is shared, so only RETRAIN_ADMIN_USER_IDS may start over.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get('full') and current_user.id not in Config.RETRAIN_ADMIN_USER_IDS:
+        return jsonify({'error': 'Only an administrator can start a full retrain'}), 403
+    job = enqueue_job('retrain_categorizer', payload={'full': bool(data.get('full'))},
+                      requested_by=current_user.id)
+    return accepted(job)
+
+@ai_insights_bp.route('/api/ai/category_memo')
+@login_required
+def category_memo_stats():
+    """How many categorizations this worker answered from the memo instead of the model"""
+    return jsonify(get_category_memo().stats())
 
 @ai_insights_bp.route('/api/ai/financial_health')
 @login_required
+@user_cached
 def get_financial_health():
-    transactions = Transaction.get_user_transactions(current_user.id)
+    totals = Transaction.get_totals_by_type(current_user.id)
     
-    total_income = sum(t.amount for t in transactions if t.type == 'income')
-    total_expenses = sum(t.amount for t in transactions if t.type == 'expense')
+    total_income = totals['income']
+    total_expenses = totals['expense']
     
     if total_income == 0:
         score = 0
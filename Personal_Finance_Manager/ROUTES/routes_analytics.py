@@ -1,42 +1,84 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required, current_user
 from models.transaction import Transaction
-from ml_models.spending_predictor import SpendingPredictor
-from ml_models.anomaly_detector import AnomalyDetector
+from models.rollup import MonthlyRollup
+from models.jobs import enqueue_job
+from ml_models.model_registry import get_predictor, get_analytics_engine
+from ml_models.analytics_engine import cached_bundle, ready_bundle
+from routes.cache import user_cached
+from config import Config
+from datetime import datetime
 
 analytics_bp = Blueprint('analytics', __name__)
-predictor = SpendingPredictor()
-anomaly_detector = AnomalyDetector()
 
 @analytics_bp.route('/analytics')
 @login_required
 def analytics():
-    transactions = Transaction.get_user_transactions(current_user.id)
-    
-    spending_trends = predictor.analyze_spending_trends(transactions)
-    anomalies = anomaly_detector.detect_anomalies(transactions)
-    predictions = predictor.predict_future_spending(transactions)
+    # Cached or precomputed when the data has not changed; otherwise a job worker
+    # computes it while the page shows "computing". The bundle also serves the
+    # chart's JSON requests
+    bundle = ready_bundle(current_user.id)
+    if bundle is None:
+        if Config.BACKGROUND_JOBS:
+            job = enqueue_job('analytics', current_user.id, requested_by=current_user.id)
+            return render_template('analytics.html', computing=True, job=job)
+        bundle = get_analytics_engine().compute(current_user.id)
     
     return render_template('analytics.html',
-                         spending_trends=spending_trends,
-                         anomalies=anomalies,
-                         predictions=predictions)
+                         spending_trends=bundle['trends'],
+                         anomalies=bundle['anomalies'],
+                         predictions=bundle['predictions'],
+                         computed_at=datetime.fromtimestamp(bundle['computed_at']))
+
+@analytics_bp.route('/api/insights')
+@login_required
+@user_cached
+def get_insights():
+    """The whole analytics bundle, with the time it was computed."""
+    bundle = get_analytics_engine().get_bundle(current_user.id)
+    insights = {key: value for key, value in bundle.items() if key != 'version'}
+    insights['computed_at'] = datetime.fromtimestamp(bundle['computed_at']).isoformat(timespec='seconds')
+    return jsonify(insights)
 
 @analytics_bp.route('/api/transaction_categories')
 @login_required
+@user_cached
 def get_transaction_categories():
-    transactions = Transaction.get_user_transactions(current_user.id)
-    categories = {}
-    
-    for transaction in transactions:
-        if transaction.type == 'expense':
-            categories[transaction.category] = categories.get(transaction.category, 0) + transaction.amount
-    
+    bundle = cached_bundle(current_user.id)
+    if bundle is not None:
+        return jsonify(bundle['category_totals'])
+    categories = MonthlyRollup.get_category_totals(current_user.id, type='expense')
     return jsonify(categories)
 
 @analytics_bp.route('/api/spending_trends')
 @login_required
+@user_cached
 def get_spending_trends():
-    transactions = Transaction.get_user_transactions(current_user.id)
-    trends = predictor.analyze_spending_trends(transactions)
-    return jsonify(trends)
\ No newline at end of file
+    bundle = cached_bundle(current_user.id)
+    if bundle is not None:
+        return jsonify(bundle['trends'])
+    trends = get_predictor().analyze_spending_trends_from_rollups(
+        MonthlyRollup.get_user_rollups(current_user.id))
+    return jsonify(trends)
+
+@analytics_bp.route('/api/spending_forecast')
+@login_required
+@user_cached
+def get_spending_forecast():
+    # ?months=3 or ?months=1,3,6; defaults to every horizon from 1 to 12 months
+    try:
+        horizons = [int(m) for m in request.args.get('months', '').split(',') if m.strip()] or list(range(1, 13))
+    except ValueError:
+        return jsonify({'error': 'months must be integers'}), 400
+    if any(m < 1 or m > 12 for m in horizons):
+        return jsonify({'error': 'months must be between 1 and 12'}), 400
+    
+    bundle = cached_bundle(current_user.id)
+    if bundle is not None:
+        forecasts = bundle['forecasts'] and [bundle['forecasts'][m - 1] for m in horizons]
+    else:
+        forecasts = get_predictor().forecast_from_daily_totals(
+            Transaction.get_daily_totals(current_user.id), horizons)
+    if forecasts is None:
+        return jsonify({'forecasts': [], 'message': 'Insufficient data for prediction'})
+    return jsonify({'forecasts': forecasts})
@@ -0,0 +1,55 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from models.budget import Budget
+from models.validation import CATEGORY_MAX_LENGTH, parse_category
+from routes.cache import user_cached
+from datetime import datetime
+import math
+
+budgets_bp = Blueprint('budgets', __name__)
+
+def parse_month(value):
+    """'YYYY-MM' from a query or form value; ValueError if it is malformed."""
+    return datetime.strptime(value, '%Y-%m').strftime('%Y-%m')
+
+@budgets_bp.route('/api/budgets/status')
+@login_required
+@user_cached
+def get_budget_status():
+    """Spent, remaining, percent used and projected overrun for each budget in ?month= (default this month)."""
+    try:
+        month_year = parse_month(request.args['month']) if request.args.get('month') else None
+    except ValueError:
+        return jsonify({'error': 'month must be YYYY-MM'}), 400
+
+    try:
+        return jsonify(Budget.get_status(current_user.id, month_year))
+    except Exception:
+        return jsonify({'error': 'Could not load budget status'}), 500
+
+@budgets_bp.route('/api/budgets', methods=['POST'])
+@login_required
+def set_budget():
+    """Create or change the budget for one category and month: {category, amount, month}."""
+    data = request.get_json(silent=True) or {}
+    try:
+        category = parse_category(str(data['category']).strip())
+        if isinstance(data['amount'], bool):
+            raise TypeError
+        amount = round(float(data['amount']), 2)
+        month_year = parse_month(data.get('month') or datetime.now().strftime('%Y-%m'))
+        # 'nan' and 'inf' parse as floats but cannot be stored
+        if not category or not math.isfinite(amount) or amount < 0:
+            raise ValueError
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': f'Expected {{category (at most {CATEGORY_MAX_LENGTH} characters), '
+                                 'amount >= 0, month: YYYY-MM}'}), 400
+
+    budget = Budget(user_id=current_user.id, category=category, amount=amount, month_year=month_year)
+    try:
+        created = budget.upsert()
+    except Exception:
+        return jsonify({'error': 'Could not save budget'}), 500
+
+    status = 201 if created else 200
+    return jsonify({'id': budget.id, 'category': category, 'amount': amount, 'month_year': month_year}), status
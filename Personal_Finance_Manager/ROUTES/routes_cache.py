@@ -0,0 +1,57 @@
+import hashlib
+from functools import wraps
+from flask import Response, request, make_response
+from flask_login import current_user
+from config import Config
+from models.cache import get_cache, get_data_version
+from models.database import database_errors
+
+# Response headers worth keeping with a cached body
+CACHED_HEADERS = ('Content-Type', 'X-Next-Cursor')
+
+
+def response_cache():
+    return get_cache('responses', maxsize=Config.RESPONSE_CACHE_SIZE, ttl=Config.RESPONSE_CACHE_TTL)
+
+
+def response_key(user_id, endpoint, args, version):
+    params = '&'.join(f"{name}={value}" for name, value in sorted(args.items(multi=True)))
+    return hashlib.sha1(f"{user_id}|{endpoint}|{params}|{version}".encode()).hexdigest()
+
+
+def user_cached(view):
+    """Cache a GET JSON view per (user, endpoint, query args, data version).
+
+    The key doubles as the response's ETag, so a client repeating a request
+    with If-None-Match gets a 304 before the view runs or the database is
+    touched. Any write to the user's transactions or budgets bumps their data
+    version, which retires every cached response and ETag at once. Streamed
+    responses get an ETag but are not stored. Error responses, and 200s from a
+    view that hit a database error along the way (models often answer [] for
+    those), are neither stored nor given an ETag. Goes below @login_required.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Read the version before the view runs, so a write that lands meanwhile leaves the result under the old key
+        key = response_key(current_user.id, request.endpoint, request.args, get_data_version(current_user.id))
+        if key in request.if_none_match:
+            response = Response(status=304)
+        else:
+            cached = response_cache().get(key)
+            if cached is not None:
+                body, headers = cached
+                response = Response(body, headers=headers)
+            else:
+                errors = database_errors()
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or database_errors() != errors:
+                    response.headers['Cache-Control'] = 'no-store'
+                    return response
+                if not response.is_streamed:
+                    response_cache().set(key, (response.get_data(), [
+                        (name, response.headers[name]) for name in CACHED_HEADERS if name in response.headers]))
+        response.set_etag(key)
+        # Browsers must revalidate, and shared proxies must not store per-user data
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
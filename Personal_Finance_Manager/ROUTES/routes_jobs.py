@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify, url_for
+from flask_login import login_required, current_user
+from models.jobs import get_job_queue
+
+jobs_bp = Blueprint('jobs', __name__)
+
+def accepted(job):
+    """202 response for a job a route has queued instead of running it."""
+    response = jsonify(job)
+    response.status_code = 202
+    response.headers['Location'] = url_for('jobs.get_job', job_id=job['id'])
+    return response
+
+@jobs_bp.route('/api/jobs')
+@login_required
+def list_jobs():
+    """The current user's recent background jobs, newest first."""
+    return jsonify(get_job_queue().for_user(current_user.id))
+
+@jobs_bp.route('/api/jobs/<int:job_id>')
+@login_required
+def get_job(job_id):
+    """Status of one job: queued, running, done (with its result) or failed (with the error)."""
+    job = get_job_queue().get(job_id, user_id=current_user.id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
@@ -1,10 +1,20 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from models.transaction import Transaction
-from ml_models.ai_categorizer import ExpenseCategorizer
+from models.importer import StatementImporter, spool_upload, decode_lines
+from models.validation import parse_category, parse_description
+from models.jobs import enqueue_job
+from routes.cache import user_cached
+from routes.jobs import accepted
+from ml_models.model_registry import get_categorizer, get_category_memo, get_anomaly_detector, is_loaded
+from config import Config
+from datetime import datetime
+import json
+import math
 
 transactions_bp = Blueprint('transactions', __name__)
-categorizer = ExpenseCategorizer()
+# Registered by the app on its own; the page routes above are duplicated in app.py
+transactions_api_bp = Blueprint('transactions_api', __name__)
 
 @transactions_bp.route('/add_transaction', methods=['GET', 'POST'])
 @login_required
@@ -16,7 +26,7 @@ def add_transaction():
             transaction_type = request.form['type']
             date = request.form['date']
             
-            category = categorizer.predict_category(description, amount, transaction_type)
+            category = get_category_memo().predict_category(current_user.id, description, amount, transaction_type)
             
             transaction = Transaction(
                 user_id=current_user.id,
@@ -28,7 +38,13 @@ def add_transaction():
             )
             
             if transaction.save():
+                get_category_memo().learn(current_user.id, description, transaction_type, category)
                 flash('Transaction added successfully!', 'success')
+                # Cheap check against the user's cached anomaly model; never refits here
+                if is_loaded('anomaly_detector'):
+                    anomaly = get_anomaly_detector().score_transaction(current_user.id, transaction)
+                    if anomaly and anomaly['is_anomaly']:
+                        flash(f"This transaction looks unusual for you: {anomaly['reason']}", 'warning')
             else:
                 flash('Error adding transaction', 'error')
             
@@ -44,27 +60,206 @@ def add_transaction():
 @transactions_bp.route('/delete_transaction/<int:transaction_id>')
 @login_required
 def delete_transaction(transaction_id):
-    if Transaction.delete(transaction_id):
+    if Transaction.delete(transaction_id, user_id=current_user.id):
         flash('Transaction deleted successfully', 'success')
     else:
         flash('Error deleting transaction', 'error')
     
     return redirect(url_for('dashboard'))
 
-@transactions_bp.route('/api/transactions')
+def parse_transaction_filters(args):
+    """Filters for Transaction.get_page / iter_user_transactions from query args."""
+    filters = {}
+    for name in ('start_date', 'end_date'):
+        if args.get(name):
+            # Validate here so a bad date is a 400, not an empty result
+            filters[name] = datetime.strptime(args[name], '%Y-%m-%d').date()
+    if args.get('category'):
+        filters['category'] = args['category']
+    if args.get('type'):
+        if args['type'] not in ('income', 'expense'):
+            raise ValueError("type must be 'income' or 'expense'")
+        filters['type'] = args['type']
+    return filters
+
+def stream_json_array(transactions, chunk_rows=500):
+    """Serialize transactions as one JSON array, a chunk of rows at a time.
+
+    An error while reading rows propagates without the closing ']', so the
+    client sees a broken response instead of a complete-looking short one.
+    """
+    yield '['
+    chunk = []
+    first = True
+    for transaction in transactions:
+        chunk.append(json.dumps(transaction.to_dict()))
+        if len(chunk) >= chunk_rows:
+            yield ('' if first else ',') + ','.join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield ('' if first else ',') + ','.join(chunk)
+    yield ']'
+
+@transactions_api_bp.route('/api/transactions')
 @login_required
+@user_cached
 def get_transactions_api():
-    transactions = Transaction.get_user_transactions(current_user.id)
-    transactions_data = []
+    """Newest-first transactions as a JSON array.
+
+    Pages are keyset-paginated on (transaction_date, id): pass the X-Next-Cursor
+    response header back as ?cursor= to get the next page. ?stream=1 returns
+    every matching row in one response, read and written incrementally.
+    """
+    try:
+        filters = parse_transaction_filters(request.args)
+        if request.args.get('stream') in ('1', 'true'):
+            transactions = Transaction.iter_user_transactions(
+                current_user.id, batch_size=Config.STREAM_BATCH_SIZE, **filters)
+            return Response(stream_with_context(stream_json_array(transactions)),
+                            mimetype='application/json')
+        
+        limit = int(request.args.get('limit', Config.API_PAGE_SIZE))
+        if not 1 <= limit <= Config.API_MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {Config.API_MAX_PAGE_SIZE}")
+        after = Transaction.decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    for transaction in transactions:
-        transactions_data.append({
-            'id': transaction.id,
-            'amount': transaction.amount,
-            'description': transaction.description,
-            'category': transaction.category,
-            'type': transaction.type,
-            'date': transaction.transaction_date.strftime('%Y-%m-%d')
-        })
+    try:
+        transactions, next_cursor = Transaction.get_page(current_user.id, limit=limit, after=after, **filters)
+    except Exception:
+        return jsonify({'error': 'Could not load transactions'}), 500
+    response = jsonify([transaction.to_dict() for transaction in transactions])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@transactions_api_bp.route('/api/transactions/import', methods=['POST'])
+@login_required
+def import_statement():
+    """Import a CSV or OFX statement uploaded as the `statement` form field."""
+    statement = request.files.get('statement')
+    if not statement:
+        return jsonify({'error': 'Upload the statement as the "statement" file field'}), 400
+    if request.form.get('format') not in (None, '', 'csv', 'ofx'):
+        return jsonify({'error': "format must be 'csv' or 'ofx'"}), 400
+    
+    dry_run = request.form.get('dry_run') in ('1', 'true')
+    
+    # Large files (or background=1) are imported by a job worker; poll the returned job for the report
+    if Config.BACKGROUND_JOBS and (request.form.get('background') in ('1', 'true') or
+                                   (request.content_length or 0) > Config.IMPORT_BACKGROUND_BYTES):
+        path = spool_upload(statement)
+        job = enqueue_job('import_statement', current_user.id, payload={
+            'path': path,
+            'format': request.form.get('format') or None,
+            'date_format': request.form.get('date_format') or None,
+            'dry_run': dry_run,
+        }, requested_by=current_user.id, dedupe=False)
+        return accepted(job)
+    
+    importer = StatementImporter(current_user.id, categorizer=get_categorizer(), dry_run=dry_run)
+    report = importer.import_stream(decode_lines(statement.stream), statement.filename,
+                                    request.form.get('format') or None, request.form.get('date_format') or None)
+    # Nothing could be read from the file (no usable header, malformed CSV)
+    if report.get('error') and not report['rows_imported']:
+        return jsonify(report), 400
+    return jsonify(report)
+
+def parse_operation(item):
+    """Transaction to save, or id to delete, for one /api/transactions/batch item."""
+    if not isinstance(item, dict):
+        raise ValueError("each operation must be an object")
+    op = item.get('op')
+    if op not in ('create', 'update', 'delete'):
+        raise ValueError("op must be 'create', 'update' or 'delete'")
+    # bool is an int subclass, but true/false are not ids
+    if op != 'create' and (not isinstance(item.get('id'), int) or isinstance(item['id'], bool)):
+        raise ValueError(f"{op} needs an integer id")
+    if op == 'delete':
+        return item['id']
+    
+    try:
+        if isinstance(item['amount'], bool):
+            raise TypeError
+        amount = float(item['amount'])
+        transaction_date = datetime.strptime(item['date'], '%Y-%m-%d').date()
+    except KeyError as e:
+        raise ValueError(f"missing field {e.args[0]}")
+    except (TypeError, ValueError):
+        raise ValueError("amount must be a number and date YYYY-MM-DD")
+    # 'nan' and 'inf' parse as floats but cannot be stored
+    if not math.isfinite(amount):
+        raise ValueError("amount must be a finite number")
+    if item.get('type') not in ('income', 'expense'):
+        raise ValueError("type must be 'income' or 'expense'")
+    return Transaction(
+        id=item['id'] if op == 'update' else None,
+        amount=round(amount, 2),
+        description=parse_description(item.get('description')),
+        category=parse_category(item.get('category')),
+        type=item['type'],
+        transaction_date=transaction_date
+    )
+
+@transactions_api_bp.route('/api/transactions/batch', methods=['POST'])
+@login_required
+def transactions_batch():
+    """Apply a list of create/update/delete operations in one database transaction.
+
+    Body: a JSON list (or {"operations": [...]}) of
+    {"op": "create", "amount", "description", "type", "date", "category"?},
+    {"op": "update", "id", ...same fields} or {"op": "delete", "id"}.
+    Updates replace the whole transaction; a missing category is predicted.
+    Each item gets a result with its index and status.
+    """
+    payload = request.get_json(silent=True)
+    operations = payload.get('operations') if isinstance(payload, dict) else payload
+    if not isinstance(operations, list):
+        return jsonify({'error': 'Expected a JSON list of operations'}), 400
+    if len(operations) > Config.MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {Config.MAX_BATCH_OPERATIONS} operations per request'}), 413
+    
+    results = [None] * len(operations)
+    saves, save_indexes, deletes, delete_indexes = [], [], [], []
+    seen_ids = set()
+    for index, item in enumerate(operations):
+        try:
+            parsed = parse_operation(item)
+            transaction_id = parsed if isinstance(parsed, int) else parsed.id
+            # Rollups would be adjusted twice if one batch touched a row twice
+            if transaction_id is not None:
+                if transaction_id in seen_ids:
+                    raise ValueError("id appears more than once in this batch")
+                seen_ids.add(transaction_id)
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 'invalid', 'error': str(e)}
+            continue
+        if isinstance(parsed, int):
+            deletes.append(parsed)
+            delete_indexes.append(index)
+        else:
+            saves.append(parsed)
+            save_indexes.append(index)
+    
+    uncategorized = [t for t in saves if not t.category]
+    if uncategorized:
+        categories = get_category_memo().predict_categories(current_user.id, [
+            {'description': t.description, 'amount': t.amount, 'type': t.type} for t in uncategorized])
+        for transaction, category in zip(uncategorized, categories):
+            transaction.category = category
+    
+    applied = Transaction.apply_batch(current_user.id, saves=saves, deletes=deletes)
+    if applied is None:
+        return jsonify({'error': 'Database error; no changes were applied'}), 500
+    
+    memo = get_category_memo()
+    for transaction, result in zip(saves, applied[0]):
+        if result['status'] != 'not_found':
+            memo.learn(current_user.id, transaction.description, transaction.type, transaction.category)
     
-    return jsonify(transactions_data)
\ No newline at end of file
+    for indexes, item_results in zip((save_indexes, delete_indexes), applied):
+        for index, result in zip(indexes, item_results):
+            results[index] = dict(result, index=index)
+    return jsonify({'results': results})
@@ -1,12 +1,19 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from models.user import User
+from models.passwords import PasswordHasherBusy
 from models.transaction import Transaction
+from models.rollup import MonthlyRollup
 from models.budget import Budget
-from ml_models.ai_categorizer import ExpenseCategorizer
-from ml_models.spending_predictor import SpendingPredictor
-from ml_models.anomaly_detector import AnomalyDetector
-import mysql.connector
+from ml_models.model_registry import (get_category_memo, get_predictor, get_anomaly_detector, get_analytics_engine,
+                                      preload_models, is_loaded)
+from ml_models.analytics_engine import cached_bundle, ready_bundle
+from models.jobs import enqueue_job
+from routes.cache import user_cached
+from routes.ai_insights import ai_insights_bp
+from routes.transactions import transactions_api_bp
+from routes.budgets import budgets_bp
+from routes.jobs import jobs_bp
 from config import Config
 import os
 from datetime import datetime, timedelta
@@ -20,10 +27,14 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# AI Models
-categorizer = ExpenseCategorizer()
-predictor = SpendingPredictor()
-anomaly_detector = AnomalyDetector()
+app.register_blueprint(ai_insights_bp)
+app.register_blueprint(transactions_api_bp)
+app.register_blueprint(budgets_bp)
+app.register_blueprint(jobs_bp)
+
+# AI Models are loaded on first use; set PRELOAD_MODELS=1 to load them at startup
+if Config.PRELOAD_MODELS:
+    preload_models()
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -47,7 +58,11 @@ def register():
             flash('Username already exists', 'error')
             return render_template('register.html')
         
-        user = User.create(username, email, password)
+        try:
+            user = User.create(username, email, password)
+        except PasswordHasherBusy:
+            flash('The server is busy, please try again in a moment', 'error')
+            return render_template('register.html'), 503
         if user:
             flash('Registration successful! Please login.', 'success')
             return redirect(url_for('login'))
@@ -63,7 +78,12 @@ def login():
         password = request.form['password']
         
         user = User.get_by_username(username)
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except PasswordHasherBusy:
+            flash('The server is busy, please try again in a moment', 'error')
+            return render_template('login.html'), 503
+        if valid:
             login_user(user)
             flash('Login successful!', 'success')
             return redirect(url_for('dashboard'))
@@ -82,21 +102,27 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    transactions = Transaction.get_user_transactions(current_user.id)
+    totals = Transaction.get_totals_by_type(current_user.id)
     
-    total_income = sum(t.amount for t in transactions if t.type == 'income')
-    total_expenses = sum(t.amount for t in transactions if t.type == 'expense')
+    total_income = totals['income']
+    total_expenses = totals['expense']
     balance = total_income - total_expenses
     
-    recent_transactions = transactions[:5]
-    financial_health = calculate_financial_health(transactions)
+    recent_transactions = Transaction.get_user_transactions(current_user.id, limit=5)
+    financial_health = calculate_financial_health(total_income, total_expenses)
+    try:
+        budget_status = Budget.get_status(current_user.id)
+    except Exception:
+        budget_status = []
+        flash('Could not load your budgets', 'error')
     
     return render_template('dashboard.html',
                          total_income=total_income,
                          total_expenses=total_expenses,
                          balance=balance,
                          recent_transactions=recent_transactions,
-                         financial_health=financial_health)
+                         financial_health=financial_health,
+                         budget_status=budget_status)
 
 @app.route('/add_transaction', methods=['GET', 'POST'])
 @login_required
@@ -107,7 +133,7 @@ def add_transaction():
         transaction_type = request.form['type']
         date = request.form['date']
         
-        category = categorizer.predict_category(description, amount, transaction_type)
+        category = get_category_memo().predict_category(current_user.id, description, amount, transaction_type)
         
         transaction = Transaction(
             user_id=current_user.id,
@@ -119,7 +145,13 @@ def add_transaction():
         )
         
         if transaction.save():
+            get_category_memo().learn(current_user.id, description, transaction_type, category)
             flash('Transaction added successfully!', 'success')
+            # Cheap check against the user's cached anomaly model; never refits here
+            if is_loaded('anomaly_detector'):
+                anomaly = get_anomaly_detector().score_transaction(current_user.id, transaction)
+                if anomaly and anomaly['is_anomaly']:
+                    flash(f"This transaction looks unusual for you: {anomaly['reason']}", 'warning')
         else:
             flash('Error adding transaction', 'error')
         
@@ -130,33 +162,65 @@ def add_transaction():
 @app.route('/analytics')
 @login_required
 def analytics():
-    transactions = Transaction.get_user_transactions(current_user.id)
-    
-    spending_trends = predictor.analyze_spending_trends(transactions)
-    anomalies = anomaly_detector.detect_anomalies(transactions)
-    predictions = predictor.predict_future_spending(transactions)
+    # Cached or precomputed when the data has not changed; otherwise a job worker
+    # computes it while the page shows "computing". The bundle also serves the
+    # chart's JSON requests
+    bundle = ready_bundle(current_user.id)
+    if bundle is None:
+        if Config.BACKGROUND_JOBS:
+            job = enqueue_job('analytics', current_user.id, requested_by=current_user.id)
+            return render_template('analytics.html', computing=True, job=job)
+        bundle = get_analytics_engine().compute(current_user.id)
     
     return render_template('analytics.html',
-                         spending_trends=spending_trends,
-                         anomalies=anomalies,
-                         predictions=predictions)
+                         spending_trends=bundle['trends'],
+                         anomalies=bundle['anomalies'],
+                         predictions=bundle['predictions'],
+                         computed_at=datetime.fromtimestamp(bundle['computed_at']))
+
+@app.route('/api/insights')
+@login_required
+@user_cached
+def get_insights():
+    """The whole analytics bundle, with the time it was computed."""
+    bundle = get_analytics_engine().get_bundle(current_user.id)
+    insights = {key: value for key, value in bundle.items() if key != 'version'}
+    insights['computed_at'] = datetime.fromtimestamp(bundle['computed_at']).isoformat(timespec='seconds')
+    return jsonify(insights)
 
 @app.route('/api/transaction_categories')
 @login_required
+@user_cached
 def get_transaction_categories():
-    transactions = Transaction.get_user_transactions(current_user.id)
-    categories = {}
-    
-    for transaction in transactions:
-        if transaction.type == 'expense':
-            categories[transaction.category] = categories.get(transaction.category, 0) + transaction.amount
-    
+    bundle = cached_bundle(current_user.id)
+    if bundle is not None:
+        return jsonify(bundle['category_totals'])
+    categories = MonthlyRollup.get_category_totals(current_user.id, type='expense')
     return jsonify(categories)
 
-def calculate_financial_health(transactions):
-    total_income = sum(t.amount for t in transactions if t.type == 'income')
-    total_expenses = sum(t.amount for t in transactions if t.type == 'expense')
+@app.route('/api/spending_forecast')
+@login_required
+@user_cached
+def get_spending_forecast():
+    # ?months=3 or ?months=1,3,6; defaults to every horizon from 1 to 12 months
+    try:
+        horizons = [int(m) for m in request.args.get('months', '').split(',') if m.strip()] or list(range(1, 13))
+    except ValueError:
+        return jsonify({'error': 'months must be integers'}), 400
+    if any(m < 1 or m > 12 for m in horizons):
+        return jsonify({'error': 'months must be between 1 and 12'}), 400
     
+    bundle = cached_bundle(current_user.id)
+    if bundle is not None:
+        forecasts = bundle['forecasts'] and [bundle['forecasts'][m - 1] for m in horizons]
+    else:
+        forecasts = get_predictor().forecast_from_daily_totals(
+            Transaction.get_daily_totals(current_user.id), horizons)
+    if forecasts is None:
+        return jsonify({'forecasts': [], 'message': 'Insufficient data for prediction'})
+    return jsonify({'forecasts': forecasts})
+
+def calculate_financial_health(total_income, total_expenses):
     if total_income == 0:
         return 0
     
@@ -3,10 +3,141 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-here-change-in-production'
     
+    # Private (0700) directory for the app's local state files: the embedded
+    # database, the shared cache, the job queue and spooled uploads; never a world-writable place like /tmp
+    INSTANCE_DIR = os.environ.get('INSTANCE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance'))
+    
     MYSQL_CONFIG = {
         'host': 'localhost',
         'user': 'root',
         'password': 'password',
         'database': 'personal_finance',
         'auth_plugin': 'mysql_native_password'
-    }
\ No newline at end of file
+    }
+    
+    # Shared connection pool used by all models
+    MYSQL_POOL_NAME = 'personal_finance_pool'
+    MYSQL_POOL_SIZE = int(os.environ.get('MYSQL_POOL_SIZE', 5))
+    MYSQL_POOL_RESET_SESSION = True
+    MYSQL_POOL_HEALTH_CHECK = True
+    MYSQL_POOL_TIMEOUT = float(os.environ.get('MYSQL_POOL_TIMEOUT', 10))
+
+    # Where the tables live: 'mysql' (above) or 'sqlite', an embedded file created
+    # from database/schema.sql on first use, for tests, benchmarks and single-node
+    # deployments without a database server
+    DATABASE_BACKEND = os.environ.get('DATABASE_BACKEND', 'mysql')
+    SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(INSTANCE_DIR, 'personal_finance.sqlite3'))
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 30))
+    SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'schema.sql')
+
+    # Largest batch accepted by /api/ai/predict_categories
+    MAX_CATEGORIZE_BATCH = 10000
+    
+    # Password hashing runs in a small process pool so bursts of logins cannot
+    # starve web workers. Changing the method upgrades hashes on next login;
+    # PASSWORD_HASH_WORKERS=0 hashes inline.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+    PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    PASSWORD_HASH_NICE = 10
+    
+    # Caches: 'memory' is per process; 'sqlite' shares entries (and invalidations)
+    # between the workers on one host through a local file
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH', os.path.join(INSTANCE_DIR, 'cache.sqlite3'))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 300))
+    
+    # GET API responses cached per user and data version; the TTL also bounds how
+    # long another worker's write can go unnoticed with the 'memory' backend
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 5000))
+    RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    DATA_VERSION_CACHE_SIZE = 100000
+    
+    # /api/transactions page sizes, and rows fetched per round trip when streaming
+    API_PAGE_SIZE = 100
+    API_MAX_PAGE_SIZE = 1000
+    STREAM_BATCH_SIZE = 1000
+    
+    # Largest list of operations accepted by /api/transactions/batch
+    MAX_BATCH_OPERATIONS = 1000
+    
+    # Share of a budget spent before it is flagged as at risk
+    BUDGET_ALERT_THRESHOLD = float(os.environ.get('BUDGET_ALERT_THRESHOLD', 0.8))
+    
+    # Statement import: rows categorized and inserted per batch, and errors listed in the report
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
+    IMPORT_MAX_REPORTED_ERRORS = 1000
+    
+    # Load every ML model at startup instead of on first use
+    PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', '').lower() in ('1', 'true', 'yes')
+    
+    # Trained model artifacts: memory-map them ('' disables) and verify their checksums
+    MODEL_MMAP_MODE = os.environ.get('MODEL_MMAP_MODE', 'r') or None
+    MODEL_VERIFY_CHECKSUM = True
+    # Saved categorizer versions kept for workers still reading older ones, and
+    # load attempts before a worker serves the sample model from memory instead
+    MODEL_KEEP_VERSIONS = 3
+    MODEL_LOAD_ATTEMPTS = 3
+    
+    # `run.py retrain-categorizer`: rows read per chunk, every Nth id held out for
+    # accuracy (at most RETRAIN_MAX_HOLDOUT rows), fewest rows worth replacing the
+    # model for, and the size of the hashed description feature space
+    RETRAIN_CHUNK_SIZE = int(os.environ.get('RETRAIN_CHUNK_SIZE', 5000))
+    RETRAIN_HOLDOUT_MODULO = 10
+    RETRAIN_MAX_HOLDOUT = 20000
+    RETRAIN_MIN_ROWS = 50
+    CATEGORIZER_HASH_FEATURES = 2 ** 18
+    # Users allowed to start a full retrain of the shared model from /api/ai/retrain
+    RETRAIN_ADMIN_USER_IDS = {int(user_id) for user_id in os.environ.get('RETRAIN_ADMIN_USER_IDS', '').split(',')
+                              if user_id.strip()}
+    
+    # Description -> category memo checked before the categorizer: users kept
+    # (LRU) and descriptions kept per user, how long a user's memo lives before
+    # it is reloaded (bounds staleness in other workers), and the global memo of
+    # merchants categorized the same way by at least CATEGORY_MEMO_MIN_USERS users
+    CATEGORY_MEMO_USERS = int(os.environ.get('CATEGORY_MEMO_USERS', 1000))
+    CATEGORY_MEMO_USER_ENTRIES = 2000
+    CATEGORY_MEMO_TTL = int(os.environ.get('CATEGORY_MEMO_TTL', 600))
+    CATEGORY_MEMO_GLOBAL_ENTRIES = 5000
+    CATEGORY_MEMO_GLOBAL_TTL = 3600
+    CATEGORY_MEMO_MIN_USERS = 3
+    # A prefix match needs this many leading words (or the whole description)
+    # and this share of the descriptions under that prefix to agree
+    CATEGORY_MEMO_MIN_PREFIX_TOKENS = 2
+    CATEGORY_MEMO_PREFIX_TOKENS = 3
+    CATEGORY_MEMO_MIN_SHARE = 0.8
+    
+    # Per-user fitted anomaly detectors kept in memory
+    ANOMALY_MODEL_CACHE_SIZE = int(os.environ.get('ANOMALY_MODEL_CACHE_SIZE', 256))
+    
+    # Per-user analytics bundles (trends, anomalies, forecasts, category totals)
+    # computed by the /analytics page and reused by its JSON endpoints
+    ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE', 1000))
+    ANALYTICS_CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', 120))
+    
+    # `run.py precompute-insights`: worker processes, and users scanned per database round trip
+    PRECOMPUTE_WORKERS = int(os.environ.get('PRECOMPUTE_WORKERS', os.cpu_count() or 1))
+    PRECOMPUTE_CHUNK_SIZE = int(os.environ.get('PRECOMPUTE_CHUNK_SIZE', 200))
+    
+    # Background jobs (analytics, imports, retraining) live in a local SQLite
+    # file shared by every process on the host. A web process starts JOB_WORKERS
+    # threads when it first queues a job (0 leaves the work to `run.py worker`), and at most
+    # JOB_MAX_RUNNING jobs run at once across all of them. BACKGROUND_JOBS=0
+    # makes routes do the work inline instead of enqueueing it. The queue file
+    # and the spool directory for uploaded statements must be private to the
+    # app's user (0600/0700); workers refuse to start otherwise. A running job
+    # holds a lease its worker renews every third of JOB_LEASE_SECONDS; once
+    # the lease lapses the job is queued again.
+    BACKGROUND_JOBS = os.environ.get('BACKGROUND_JOBS', '1').lower() in ('1', 'true', 'yes')
+    JOB_QUEUE_PATH = os.environ.get('JOB_QUEUE_PATH', os.path.join(INSTANCE_DIR, 'jobs.sqlite3'))
+    JOB_SPOOL_DIR = os.environ.get('JOB_SPOOL_DIR', os.path.join(INSTANCE_DIR, 'uploads'))
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_MAX_RUNNING = int(os.environ.get('JOB_MAX_RUNNING', max(2, os.cpu_count() or 1)))
+    JOB_POLL_INTERVAL = 1.0
+    JOB_RETENTION_DAYS = 7
+    JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 60))
+    # Uploaded statements larger than this are imported in the background
+    IMPORT_BACKGROUND_BYTES = int(os.environ.get('IMPORT_BACKGROUND_BYTES', 1024 * 1024))
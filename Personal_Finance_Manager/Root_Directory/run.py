@@ -3,47 +3,178 @@
 Personal Finance Manager - Startup Script
 """
 import os
-import mysql.connector
+import argparse
 from app import app
+from models.storage import get_storage
 from config import Config
 
 def setup_database():
     """Initialize database with required tables"""
+    storage = get_storage()
     try:
-        conn = mysql.connector.connect(
-            host=Config.MYSQL_CONFIG['host'],
-            user=Config.MYSQL_CONFIG['user'],
-            password=Config.MYSQL_CONFIG['password']
-        )
-        cursor = conn.cursor()
-        
-        cursor.execute("CREATE DATABASE IF NOT EXISTS personal_finance")
-        print("✅ Database created or already exists")
-        
-        cursor.close()
-        conn.close()
-        
-        with open('database/schema.sql', 'r') as f:
-            schema_sql = f.read()
-        
-        conn = mysql.connector.connect(**Config.MYSQL_CONFIG)
-        cursor = conn.cursor()
-        
-        for statement in schema_sql.split(';'):
-            if statement.strip():
-                cursor.execute(statement)
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        print("✅ Database schema initialized successfully")
-        
+        storage.initialize()
+        print(f"✅ Database schema initialized successfully ({storage.name})")
     except Exception as e:
         print(f"❌ Database setup error: {e}")
-        print("Please make sure MySQL is running and credentials in config.py are correct")
+        if storage.name == 'mysql':
+            print("Please make sure MySQL is running and credentials in config.py are correct")
+            print("or set DATABASE_BACKEND=sqlite to use an embedded database file")
+
+def rebuild_rollups(user_id=None):
+    """Backfill or rebuild monthly rollups from the transactions table"""
+    from models.rollup import MonthlyRollup
+    
+    try:
+        rows = MonthlyRollup.rebuild(user_id)
+        scope = f"user {user_id}" if user_id else "all users"
+        print(f"✅ Rebuilt {rows} monthly rollup rows for {scope}")
+    except Exception as e:
+        print(f"❌ Rollup rebuild error: {e}")
+
+def import_statement(path, user_id, format=None, date_format=None, chunk_size=None, dry_run=False):
+    """Bulk import a CSV or OFX statement for one user"""
+    from models.importer import StatementImporter
+    
+    try:
+        report = StatementImporter(user_id, chunk_size=chunk_size, dry_run=dry_run).import_file(
+            path, format, date_format)
+        action = "Checked" if dry_run else "Imported"
+        print(f"✅ {action} {report['rows_imported']} rows in {report['seconds']:.2f}s "
+              f"({report['rows_per_second']:.0f} rows/sec, {report['chunks']} chunks)")
+        if report['rows_failed']:
+            print(f"❌ {report['rows_failed']} rows failed")
+            for error in report['errors']:
+                print(f"   line {error['line']}: {error['error']}")
+    except Exception as e:
+        print(f"❌ Import error: {e}")
+
+def check_budgets(month_year=None, threshold=None):
+    """Report every user's budgets that are over or projected to overrun this month"""
+    from models.budget import Budget
+    
+    try:
+        alerts = Budget.find_alerts(month_year, threshold=threshold)
+        count = sum(len(statuses) for statuses in alerts.values())
+        print(f"✅ Checked budgets: {count} alerts for {len(alerts)} users")
+        for user_id, statuses in alerts.items():
+            for status in statuses:
+                print(f"   user {user_id} {status['month_year']} {status['category']}: {status['status']}, "
+                      f"spent {status['spent']:.2f} of {status['budget']:.2f}, "
+                      f"projected {status['projected_spending']:.2f}")
+    except Exception as e:
+        print(f"❌ Budget check error: {e}")
+
+def precompute_insights(workers=None, chunk_size=None, force=False):
+    """Recompute stored analytics for users whose transactions changed since the last run"""
+    from ml_models.analytics_engine import precompute_insights as run_precompute
+    
+    try:
+        report = run_precompute(workers, chunk_size, force)
+        print(f"✅ Precomputed insights for {report['users_computed']} of {report['users_scanned']} users "
+              f"in {report['seconds']:.2f}s ({report['users_per_second']:.1f} users/sec, {report['workers']} workers)")
+        if report['users_failed']:
+            print(f"❌ {report['users_failed']} users failed")
+    except Exception as e:
+        print(f"❌ Precompute error: {e}")
+
+def retrain_categorizer(full=False, chunk_size=None):
+    """Train the categorizer on the transactions table, continuing from the last run unless --full"""
+    from ml_models.categorizer_training import CategorizerTrainer
+    
+    try:
+        report = CategorizerTrainer(chunk_size=chunk_size).run(full=full)
+        accuracy = report['holdout_accuracy']
+        print(f"✅ {report['mode'].title()} training: {report['rows_trained']} rows in {report['seconds']:.2f}s "
+              f"({report['rows_per_second']:.0f} rows/sec), held-out accuracy "
+              f"{'n/a' if accuracy is None else f'{accuracy:.3f}'} on {report['rows_held_out']} rows")
+        if report['rows_skipped']:
+            print(f"   {report['rows_skipped']} rows skipped with categories new since the last full run")
+        if report['swapped']:
+            print(f"✅ Saved the new model (watermark id {report['watermark']})")
+        else:
+            print("❌ Not enough new rows; kept the current model")
+    except Exception as e:
+        print(f"❌ Retraining error: {e}")
+
+def run_worker(concurrency=None):
+    """Run background jobs in the foreground until interrupted"""
+    from models.jobs import JobWorker
+    
+    worker = JobWorker(concurrency=concurrency or Config.JOB_WORKERS or 1).start()
+    print(f"✅ Job worker running {worker.concurrency} threads on {worker.queue.path}")
+    print("📍 Press Ctrl+C to stop the worker")
+    try:
+        while True:
+            worker.stopping.wait(60)
+    except KeyboardInterrupt:
+        print("🔄 Stopping; running jobs finish first...")
+        worker.stop()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AI Personal Finance Manager")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    subparsers.add_parser('serve', help="Initialize the database and start the web app (default)")
+    
+    rebuild_parser = subparsers.add_parser('rebuild-rollups', help="Backfill or rebuild monthly rollups")
+    rebuild_parser.add_argument('--user-id', type=int, help="Only rebuild this user's rollups")
+    
+    import_parser = subparsers.add_parser('import-statement', help="Bulk import a CSV or OFX statement")
+    import_parser.add_argument('path', help="Statement file (.csv, .ofx or .qfx)")
+    import_parser.add_argument('--user-id', type=int, required=True)
+    import_parser.add_argument('--format', choices=['csv', 'ofx'], help="Override detection from the file")
+    import_parser.add_argument('--date-format', help="strptime format for CSV dates (default YYYY-MM-DD)")
+    import_parser.add_argument('--chunk-size', type=int, help="Rows per categorize/insert batch")
+    import_parser.add_argument('--dry-run', action='store_true', help="Parse and categorize without saving")
+    
+    budgets_parser = subparsers.add_parser('check-budgets', help="List budgets that are over or at risk for all users")
+    budgets_parser.add_argument('--month', help="YYYY-MM (default this month)")
+    budgets_parser.add_argument('--threshold', type=float, help="Share of a budget that counts as at risk (default 0.8)")
+    
+    precompute_parser = subparsers.add_parser('precompute-insights',
+                                              help="Recompute analytics for users whose data changed (e.g. nightly)")
+    precompute_parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    precompute_parser.add_argument('--chunk-size', type=int, help="Users scanned per batch")
+    precompute_parser.add_argument('--force', action='store_true', help="Recompute every user, changed or not")
+    
+    retrain_parser = subparsers.add_parser('retrain-categorizer',
+                                           help="Train the categorizer on the transactions table")
+    retrain_parser.add_argument('--full', action='store_true', help="Start over instead of continuing from the watermark")
+    retrain_parser.add_argument('--chunk-size', type=int, help="Rows read and trained per batch")
+    
+    worker_parser = subparsers.add_parser('worker', help="Run queued analytics, import and retraining jobs")
+    worker_parser.add_argument('--concurrency', type=int, help="Jobs run at once by this process")
+    
+    return parser.parse_args()
 
 if __name__ == '__main__':
+    args = parse_args()
+    
+    if args.command == 'rebuild-rollups':
+        rebuild_rollups(args.user_id)
+        raise SystemExit(0)
+    
+    if args.command == 'check-budgets':
+        check_budgets(args.month, args.threshold)
+        raise SystemExit(0)
+    
+    if args.command == 'precompute-insights':
+        precompute_insights(args.workers, args.chunk_size, args.force)
+        raise SystemExit(0)
+    
+    if args.command == 'retrain-categorizer':
+        retrain_categorizer(args.full, args.chunk_size)
+        raise SystemExit(0)
+    
+    if args.command == 'worker':
+        run_worker(args.concurrency)
+        raise SystemExit(0)
+    
+    if args.command == 'import-statement':
+        import_statement(args.path, args.user_id, args.format, args.date_format,
+                         args.chunk_size, args.dry_run)
+        raise SystemExit(0)
+    
     print("🚀 Starting AI Personal Finance Manager...")
     
     setup_database()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import random
+from datetime import date, timedelta
+from models.transaction import Transaction
+from models.transaction_columns import TransactionColumns
+from ml_models.spending_predictor import SpendingPredictor
+from ml_models.anomaly_detector import AnomalyDetector
+from ml_models.analytics_engine import AnalyticsEngine, cached_bundle
+
+def make_transactions(count=300, seed=11):
+    rng = random.Random(seed)
+    return [Transaction(
+        id=i + 1,
+        user_id=1,
+        amount=round(rng.uniform(5, 400), 2),
+        description=rng.choice(["Grocery shopping", "Uber ride", "Netflix", "Pharmacy"]),
+        category=rng.choice(['Food', 'Transportation', 'Entertainment', 'Healthcare']),
+        type='income' if rng.random() < 0.15 else 'expense',
+        transaction_date=date(2024, 1, 1) + timedelta(days=rng.randint(0, 300))
+    ) for i in range(count)]
+
+class TestAnalyticsEngine(unittest.TestCase):
+    def setUp(self):
+        self.transactions = make_transactions()
+        self.predictor = SpendingPredictor()
+        self.engine = AnalyticsEngine(self.predictor, AnomalyDetector())
+        self.user_id = -1017
+        self.engine.invalidate(self.user_id)
+
+    def tearDown(self):
+        self.engine.invalidate(self.user_id)
+
+    def test_bundle_matches_separate_analyses(self):
+        """Test one bundle holds what the separate per-analysis calls return"""
+        bundle = self.engine.compute(self.user_id, TransactionColumns.from_transactions(self.transactions))
+
+        expected = self.predictor.analyze_spending_trends(self.transactions)
+        self.assertAlmostEqual(bundle['trends']['average_monthly_spending'], expected['average_monthly_spending'], places=6)
+        self.assertAlmostEqual(bundle['trends']['spending_volatility'], expected['spending_volatility'], places=6)
+        self.assertEqual(bundle['trends']['top_categories'], expected['top_categories'])
+        self.assertEqual(bundle['anomalies'], AnomalyDetector().detect_anomalies(self.transactions))
+        self.assertEqual(bundle['predictions'], self.predictor.predict_future_spending(self.transactions))
+        self.assertEqual(bundle['forecasts'][5], self.predictor.predict_spending_horizons(self.transactions, [6])[0])
+
+        totals = {}
+        for t in self.transactions:
+            if t.type == 'expense':
+                totals[t.category] = totals.get(t.category, 0) + t.amount
+        self.assertEqual(list(bundle['category_totals']), sorted(totals, key=totals.get, reverse=True))
+        for category, total in totals.items():
+            self.assertAlmostEqual(bundle['category_totals'][category], total, places=2)
+
+    def test_bundle_cached_per_user(self):
+        """Test the computed bundle is served from the cache until invalidated"""
+        self.assertIsNone(cached_bundle(self.user_id))
+        bundle = self.engine.compute(self.user_id, TransactionColumns.from_transactions(self.transactions))
+        self.assertEqual(self.engine.get_bundle(self.user_id), bundle)
+
+        self.engine.invalidate(self.user_id)
+        self.assertIsNone(cached_bundle(self.user_id))
+
+    def test_bundle_survives_json(self):
+        """Test a built bundle stores as JSON for precomputed insights without losing values"""
+        bundle = self.engine.build(self.user_id, TransactionColumns.from_transactions(self.transactions),
+                                   keep_model=False)
+        stored = json.loads(json.dumps(bundle, default=str))
+        self.assertEqual(stored['forecasts'], bundle['forecasts'])
+        self.assertEqual(stored['category_totals'], bundle['category_totals'])
+        self.assertEqual(stored['anomalies'][0]['date'], bundle['anomalies'][0]['date'].isoformat())
+        self.assertNotIn('version', bundle)
+        self.assertIsNone(cached_bundle(self.user_id))
+
+    def test_empty_bundle(self):
+        """Test a user without transactions gets the insufficient-data results"""
+        bundle = self.engine.compute(self.user_id, TransactionColumns.empty())
+        self.assertIn('message', bundle['trends'])
+        self.assertEqual(bundle['anomalies'], [])
+        self.assertIsNone(bundle['forecasts'])
+        self.assertEqual(bundle['category_totals'], {})
+
+if __name__ == '__main__':
+    unittest.main()
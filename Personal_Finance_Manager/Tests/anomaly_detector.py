@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.transaction import Transaction
+from ml_models.anomaly_detector import AnomalyDetector
+from datetime import date, timedelta
+
+def make_expenses(count=40, seed=3, user_id=1):
+    rng = random.Random(seed)
+    return [Transaction(
+        id=i + 1,
+        user_id=user_id,
+        amount=round(rng.uniform(10, 80), 2),
+        description=rng.choice(["Grocery shopping", "Uber ride", "Coffee", "Internet bill"]),
+        category=rng.choice(["Food", "Transportation", "Bills"]),
+        type="expense",
+        transaction_date=date(2024, 1, 1) + timedelta(days=i)
+    ) for i in range(count)]
+
+class TestAnomalyDetector(unittest.TestCase):
+    def setUp(self):
+        self.detector = AnomalyDetector(max_cached_users=2)
+        self.transactions = make_expenses()
+
+    def test_cached_model_reused_until_data_changes(self):
+        """Test the per-user model is reused and refitted only when data changes"""
+        first = self.detector.detect_anomalies(self.transactions, user_id=1)
+        model = self.detector.get_cached(1)[1]
+
+        self.assertEqual(self.detector.detect_anomalies(self.transactions, user_id=1), first)
+        self.assertIs(self.detector.get_cached(1)[1], model)
+
+        extra = make_expenses(1, seed=9)[0]
+        extra.id = 1000
+        self.detector.detect_anomalies(self.transactions + [extra], user_id=1)
+        self.assertIsNot(self.detector.get_cached(1)[1], model)
+
+    def test_lru_eviction(self):
+        """Test the cache keeps only the most recently used users"""
+        for user_id in (1, 2, 3):
+            self.detector.detect_anomalies(self.transactions, user_id=user_id)
+
+        self.assertIsNone(self.detector.get_cached(1))
+        self.assertIsNotNone(self.detector.get_cached(2))
+        self.assertIsNotNone(self.detector.get_cached(3))
+
+    def test_score_new_transaction(self):
+        """Test scoring a new expense with the cached model"""
+        self.assertIsNone(self.detector.score_transaction(1, self.transactions[0]))
+
+        self.detector.detect_anomalies(self.transactions, user_id=1)
+        unusual = Transaction(user_id=1, amount=5000.0, description="?", category="Other",
+                              type="expense", transaction_date="2024-02-15")
+        result = self.detector.score_transaction(1, unusual)
+
+        self.assertTrue(result['is_anomaly'])
+        self.assertIn("Unusually high amount", result['reason'])
+
+if __name__ == '__main__':
+    unittest.main()
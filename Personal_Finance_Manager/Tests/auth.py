@@ -3,11 +3,13 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from base import SQLiteTestCase
 from app import app
 from models.user import User
 
-class TestAuth(unittest.TestCase):
+class TestAuth(SQLiteTestCase):
     def setUp(self):
+        super().setUp()
         self.app = app.test_client()
         self.app.testing = True
 
@@ -0,0 +1,19 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+from models.storage import SQLiteStorage, use_storage
+
+class SQLiteTestCase(unittest.TestCase):
+    """A fresh embedded database per test, so no MySQL server is needed."""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.tmp.name, 'test.sqlite3'))
+        self.previous_storage = use_storage(self.storage)
+
+    def tearDown(self):
+        use_storage(self.previous_storage)
+        self.storage.close()
+        self.tmp.cleanup()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base import SQLiteTestCase
+from datetime import date
+from models.budget import Budget
+from models.transaction import Transaction
+from models.user import User
+from app import app
+
+class TestBudgetEvaluation(unittest.TestCase):
+    def test_month_progress(self):
+        """Test elapsed days for past, current and future months"""
+        today = date(2024, 2, 10)
+        self.assertEqual(Budget.month_progress('2024-02', today), (10, 29))
+        self.assertEqual(Budget.month_progress('2024-01', today), (31, 31))
+        self.assertEqual(Budget.month_progress('2024-03', today), (0, 31))
+
+    def test_evaluate(self):
+        """Test spent/remaining, the month-end projection and the alert status"""
+        status = Budget.evaluate(300.0, 120.0, '2024-04', today=date(2024, 4, 10))
+        self.assertEqual((status['remaining'], status['percent_used']), (180.0, 40.0))
+        self.assertEqual((status['projected_spending'], status['projected_overrun']), (360.0, 60.0))
+        self.assertEqual(status['status'], 'at_risk')
+
+        self.assertEqual(Budget.evaluate(300.0, 120.0, '2024-04', today=date(2024, 4, 20))['status'], 'ok')
+        self.assertEqual(Budget.evaluate(300.0, 250.0, '2024-04', today=date(2024, 4, 28))['status'], 'at_risk')
+        self.assertEqual(Budget.evaluate(300.0, 310.0, '2024-03', today=date(2024, 4, 2))['status'], 'over')
+        self.assertIsNone(Budget.evaluate(0.0, 0.0, '2024-04', today=date(2024, 4, 2))['percent_used'])
+
+class TestBudgetStatus(SQLiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.create("testuser_budget", "test_budget@example.com", "password123")
+        self.assertIsNotNone(self.user)
+
+    def test_status_from_rollups(self):
+        """Test budget status sums the month's expenses per budgeted category"""
+        for amount, category in ((40.0, 'Food'), (25.5, 'Food'), (900.0, 'Bills')):
+            Transaction(user_id=self.user.id, amount=amount, description="Budget test", category=category,
+                        type='expense', transaction_date=date(2024, 5, 3)).save()
+        self.assertTrue(Budget(user_id=self.user.id, category='Food', amount=100, month_year='2024-05').save())
+        self.assertTrue(Budget(user_id=self.user.id, category='Bills', amount=500, month_year='2024-05').save())
+
+        statuses = {s['category']: s for s in Budget.get_status(self.user.id, '2024-05', today=date(2024, 6, 1))}
+        self.assertEqual((statuses['Food']['spent'], statuses['Food']['status']), (65.5, 'ok'))
+        self.assertEqual((statuses['Bills']['spent'], statuses['Bills']['status']), (900.0, 'over'))
+        self.assertIn(self.user.id, Budget.find_alerts('2024-05', today=date(2024, 6, 1)))
+
+    def test_set_budget_rejects_non_finite_amounts(self):
+        """Test the budget API answers 400, not 500, for NaN, infinite and boolean amounts"""
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(self.user.id)
+        for amount in ('nan', 'inf', '-inf', True):
+            response = client.post('/api/budgets', json={'category': 'Food', 'amount': amount, 'month': '2024-05'})
+            self.assertEqual(response.status_code, 400)
+        response = client.post('/api/budgets', json={'category': 'Food', 'amount': '120.5', 'month': '2024-05'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_set_budget_upserts(self):
+        """Test setting a budget twice updates the one row, and overlong categories are rejected"""
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(self.user.id)
+        first = client.post('/api/budgets', json={'category': 'Food', 'amount': 100, 'month': '2024-05'})
+        second = client.post('/api/budgets', json={'category': 'Food', 'amount': 150, 'month': '2024-05'})
+        self.assertEqual((first.status_code, second.status_code), (201, 200))
+        self.assertEqual(first.get_json()['id'], second.get_json()['id'])
+        budgets = Budget.get_user_budgets(self.user.id, '2024-05')
+        self.assertEqual([(b.category, b.amount) for b in budgets], [('Food', 150.0)])
+
+        response = client.post('/api/budgets', json={'category': 'x' * 51, 'amount': 10, 'month': '2024-05'})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
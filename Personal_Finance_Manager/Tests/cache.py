@@ -0,0 +1,83 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.cache import TTLCache, SQLiteCache
+from models.user import User, user_cache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestCaches(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_ttl_cache_expiry_and_lru(self):
+        """Test entries expire after the TTL and the least recently used is evicted"""
+        cache = TTLCache(maxsize=2, ttl=10, clock=self.clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+
+        self.clock.now += 11
+        self.assertIsNone(cache.get('a'))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (3, 2, 1))
+
+    def test_sqlite_cache_shared_between_instances(self):
+        """Test two handles on the same file see each other's writes and invalidations"""
+        path = os.path.join(self.workdir, 'cache.sqlite3')
+        first = SQLiteCache(path, namespace='users', maxsize=2, ttl=10, clock=self.clock)
+        second = SQLiteCache(path, namespace='users', maxsize=2, ttl=10, clock=self.clock)
+
+        first.set(1, (1, 'alice', b'body', date(2024, 12, 1)))
+        self.assertEqual(second.get(1), [1, 'alice', b'body', date(2024, 12, 1)])
+        second.delete(1)
+        self.assertIsNone(first.get(1))
+
+        for key in range(3):
+            first.set(key, key)
+        self.assertEqual(len(second), 2)
+        self.clock.now += 11
+        self.assertIsNone(second.get(2))
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX permissions")
+    def test_sqlite_cache_file_is_private(self):
+        """Test the cache file is created 0600 and one others can write is refused"""
+        path = os.path.join(self.workdir, 'private', 'cache.sqlite3')
+        SQLiteCache(path)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.stat(os.path.dirname(path)).st_mode & 0o777, 0o700)
+
+        os.chmod(path, 0o666)
+        with self.assertRaises(PermissionError):
+            SQLiteCache(path)
+
+    def test_cached_user_needs_no_database(self):
+        """Test a cached user is rebuilt without touching MySQL, and invalidation drops it"""
+        user_cache().set(987654, (987654, 'cached', 'cached@example.com'))
+        user = User.get_by_id('987654')
+        self.assertEqual((user.id, user.username, user.email), (987654, 'cached', 'cached@example.com'))
+        self.assertNotIn('hash', repr(User(1, 'a', 'a@example.com', 'hash').cache_fields()))
+
+        User.invalidate_cache(987654)
+        self.assertIsNone(user_cache().get(987654))
+
+if __name__ == '__main__':
+    unittest.main()
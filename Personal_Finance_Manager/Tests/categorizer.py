@@ -0,0 +1,170 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from config import Config
+from ml_models.ai_categorizer import ExpenseCategorizer, FlatForest
+
+class TestCategorizer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Train into a scratch directory so tests never reuse or clobber real artifacts
+        cls.cwd = os.getcwd()
+        cls.workdir = tempfile.mkdtemp()
+        os.chdir(cls.workdir)
+        cls.categorizer = ExpenseCategorizer()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def test_predict_known_descriptions(self):
+        """Test predictions for descriptions the model was trained on"""
+        self.assertEqual(self.categorizer.predict_category("Netflix subscription", 15.99, "expense"), "Entertainment")
+        self.assertEqual(self.categorizer.predict_category("Salary payment", 1500.00, "income"), "Income")
+
+    def test_prediction_does_not_refit(self):
+        """Test inference leaves the fitted vectorizer and scaler untouched"""
+        vocabulary = dict(self.categorizer.vectorizer.vocabulary_)
+        mean = self.categorizer.scaler.mean_.copy()
+
+        self.categorizer.predict_category("brand new merchant name", 12.0, "expense")
+
+        self.assertEqual(self.categorizer.vectorizer.vocabulary_, vocabulary)
+        self.assertEqual(list(self.categorizer.scaler.mean_), list(mean))
+
+    def test_features_match_model_layout(self):
+        """Test inference features are sparse and sized like the training features"""
+        X = self.categorizer.transform_features(["coffee"], [4.5], ["expense"])
+        self.assertTrue(hasattr(X, 'tocsr'))
+        self.assertEqual(X.shape, (1, self.categorizer.model.n_features_in_))
+
+    def test_batch_matches_per_row(self):
+        """Test batch predictions equal one-at-a-time predictions"""
+        batch = [
+            {'description': 'Uber ride to office', 'amount': 15.5, 'type': 'expense'},
+            {'description': 'Electricity bill payment', 'amount': 120.0, 'type': 'expense'},
+            {'description': 'Freelance work', 'amount': 300.0, 'type': 'income'},
+            {'description': '', 'amount': 0, 'type': 'expense'},
+        ]
+        expected = [self.categorizer.predict_category(row['description'], row['amount'], row['type'])
+                    for row in batch]
+
+        self.assertEqual(self.categorizer.predict_categories(batch), expected)
+
+        with_confidence = self.categorizer.predict_categories(batch, with_confidence=True)
+        self.assertEqual([p['category'] for p in with_confidence], expected)
+        for prediction in with_confidence:
+            self.assertTrue(0 < prediction['confidence'] <= 1)
+
+    def test_bad_amount_only_affects_its_row(self):
+        """Test a row with an unusable amount falls back alone, with an error, and the rest are still predicted"""
+        good = {'description': 'Uber ride to office', 'amount': 15.5, 'type': 'expense'}
+        batch = [good, {'description': 'Coffee', 'amount': 'abc', 'type': 'expense'},
+                 {'description': 'Coffee', 'amount': 'nan', 'type': 'expense'}]
+        expected = self.categorizer.predict_categories([good], with_confidence=True)[0]
+
+        predictions = self.categorizer.predict_categories(batch, with_confidence=True)
+        self.assertEqual(predictions[0], expected)
+        for prediction in predictions[1:]:
+            self.assertEqual((prediction['category'], prediction['confidence']), ('Other', 0.0))
+            self.assertIn('amount', prediction['error'])
+
+    def test_bad_description_only_affects_its_row(self):
+        """Test a row whose description is not a string falls back alone, with an error"""
+        good = {'description': 'Uber ride to office', 'amount': 15.5, 'type': 'expense'}
+        expected = self.categorizer.predict_categories([good], with_confidence=True)[0]
+
+        predictions = self.categorizer.predict_categories(
+            [good, {'description': 42, 'amount': 5, 'type': 'expense'}], with_confidence=True)
+        self.assertEqual(predictions[0], expected)
+        self.assertEqual((predictions[1]['category'], predictions[1]['confidence']), ('Other', 0.0))
+        self.assertIn('description', predictions[1]['error'])
+
+    def test_empty_batch(self):
+        """Test an empty batch returns no predictions"""
+        self.assertEqual(self.categorizer.predict_categories([]), [])
+
+    def test_flat_forest_matches_sklearn(self):
+        """Test the array-backed forest reproduces scikit-learn's probabilities"""
+        rng = np.random.default_rng(0)
+        X = rng.random((400, 12))
+        y = rng.choice(['a', 'b', 'c'], size=400)
+        forest = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+        flat = FlatForest.from_forest(forest)
+
+        X_test = rng.random((100, 12))
+        np.testing.assert_array_equal(flat.predict_proba(X_test), forest.predict_proba(X_test))
+        np.testing.assert_array_equal(flat.predict(X_test), forest.predict(X_test))
+
+    def test_artifacts_are_memory_mapped_and_verified(self):
+        """Test saved artifacts reload as memory maps and tampering is detected"""
+        categorizer = ExpenseCategorizer()
+        self.assertIsInstance(categorizer.model.value, np.memmap)
+        categorizer.verify_artifacts()
+
+        with open(categorizer.scaler_path, 'ab') as f:
+            f.write(b'tampered')
+        with self.assertRaises(ValueError):
+            categorizer.verify_artifacts()
+
+        # A failed load serves the sample model from memory and leaves the saved artifacts alone
+        original = Config.MODEL_LOAD_ATTEMPTS
+        Config.MODEL_LOAD_ATTEMPTS = 1
+        try:
+            fallback = ExpenseCategorizer()
+        finally:
+            Config.MODEL_LOAD_ATTEMPTS = original
+        self.assertIsNotNone(fallback.model)
+        self.assertEqual(fallback.current_version(), categorizer.version_dir)
+        with self.assertRaises(ValueError):
+            categorizer.verify_artifacts()
+
+    def test_legacy_forest_without_manifest_is_converted(self):
+        """Test flat-layout artifacts with a scikit-learn forest and no manifest are loaded, converted and versioned"""
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            categorizer = ExpenseCategorizer(load=False)
+            categorizer.train_with_sample_data(save=False)
+            X = categorizer.transform_features(["uber ride"], [15.5], ["expense"])
+            forest = RandomForestClassifier(n_estimators=5, random_state=0).fit(X.toarray(), ["Transportation"])
+            os.makedirs(categorizer.models_dir)
+            artifacts = [forest, categorizer.vectorizer, categorizer.scaler]
+            for artifact, path in zip(artifacts, categorizer.artifact_paths()):
+                joblib.dump(artifact, path)
+
+            loaded = ExpenseCategorizer()
+            self.assertIsInstance(loaded.model, FlatForest)
+            self.assertIsNotNone(loaded.version_dir)
+            loaded.verify_artifacts()
+            self.assertEqual(loaded.predict_category("uber ride", 15.5, "expense"), "Transportation")
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def test_save_switches_versions_atomically(self):
+        """Test each save is a complete new version that CURRENT points at, with old ones pruned"""
+        categorizer = ExpenseCategorizer()
+        first = categorizer.version_dir
+        for _ in range(Config.MODEL_KEEP_VERSIONS + 1):
+            categorizer.save_artifacts(training={'watermark': 7})
+
+        self.assertNotEqual(categorizer.version_dir, first)
+        self.assertFalse(os.path.exists(first))
+        loaded = ExpenseCategorizer()
+        self.assertEqual(loaded.version_dir, categorizer.version_dir)
+        self.assertEqual(loaded.load_manifest()['training'], {'watermark': 7})
+        versions = [name for name in os.listdir(categorizer.models_dir) if name.startswith('v')]
+        self.assertEqual(len(versions), Config.MODEL_KEEP_VERSIONS)
+
+if __name__ == '__main__':
+    unittest.main()
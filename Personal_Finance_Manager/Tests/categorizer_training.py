@@ -0,0 +1,101 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+from ml_models.ai_categorizer import ExpenseCategorizer
+from ml_models.categorizer_training import CategorizerTrainer
+
+MERCHANTS = {
+    'Food': ["Grocery store", "Pizza delivery", "Coffee shop", "Supermarket run"],
+    'Transportation': ["Uber ride", "Gas station", "Metro card", "Parking fee"],
+    'Entertainment': ["Netflix subscription", "Cinema tickets", "Spotify premium", "Concert tickets"],
+    'Bills': ["Electricity bill", "Water bill", "Internet bill", "Phone bill"],
+}
+
+def make_rows(count, start_id=1, seed=3):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(start_id, start_id + count):
+        category = rng.choice(sorted(MERCHANTS))
+        rows.append((i, rng.choice(MERCHANTS[category]), round(rng.uniform(5, 200), 2), 'expense', category))
+    return rows
+
+class FakeTable:
+    """Stands in for the transactions table: labelled rows served in id order."""
+    def __init__(self, rows):
+        self.rows = rows
+        self.reads = []
+
+    def fetch_batch(self, after_id=0, limit=5000):
+        batch = [row for row in self.rows if row[0] > after_id][:limit]
+        self.reads.append(len(batch))
+        return batch
+
+    def fetch_categories(self):
+        return sorted({row[4] for row in self.rows})
+
+class TestCategorizerTraining(unittest.TestCase):
+    def setUp(self):
+        # Train into a scratch directory so tests never reuse or clobber real artifacts
+        self.cwd = os.getcwd()
+        self.workdir = tempfile.mkdtemp()
+        os.chdir(self.workdir)
+        self.table = FakeTable(make_rows(2000))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def trainer(self):
+        return CategorizerTrainer(chunk_size=300, holdout_modulo=10,
+                                  fetch_batch=self.table.fetch_batch, fetch_categories=self.table.fetch_categories)
+
+    def test_full_training_in_chunks(self):
+        """Test a full run reads the table in chunks, holds rows out and saves a usable model"""
+        report = self.trainer().run(full=True)
+
+        self.assertEqual(report['mode'], 'full')
+        self.assertEqual((report['rows_trained'], report['rows_held_out']), (1800, 200))
+        self.assertEqual(report['chunks'], 7)
+        self.assertLessEqual(max(self.table.reads), 300)
+        self.assertEqual(report['watermark'], 2000)
+        self.assertGreater(report['holdout_accuracy'], 0.9)
+        self.assertTrue(report['swapped'])
+
+        categorizer = ExpenseCategorizer()
+        self.assertEqual(categorizer.load_manifest()['training']['watermark'], 2000)
+        self.assertEqual(categorizer.predict_category("Netflix subscription", 15.99, "expense"), "Entertainment")
+        self.assertEqual(categorizer.predict_category("Uber ride", 22.0, "expense"), "Transportation")
+
+    def test_incremental_from_watermark(self):
+        """Test a second run only reads rows newer than the watermark and keeps the model"""
+        self.trainer().run(full=True)
+        self.table.rows += make_rows(500, start_id=2001, seed=4)
+        self.table.reads = []
+
+        report = self.trainer().run()
+        self.assertEqual(report['mode'], 'incremental')
+        self.assertEqual(report['watermark_from'], 2000)
+        self.assertEqual(sum(self.table.reads), 500)
+        self.assertEqual(report['rows_trained'], 450)
+        self.assertTrue(report['swapped'])
+        self.assertEqual(ExpenseCategorizer().load_manifest()['training']['rows_trained'], 2250)
+
+        # Nothing new: the saved model is left as it is
+        self.assertFalse(self.trainer().run()['swapped'])
+
+    def test_unknown_category_skipped_when_incremental(self):
+        """Test rows with a category the continuing model lacks are skipped, not trained"""
+        self.trainer().run(full=True)
+        self.table.rows.append((2001, "Pharmacy visit", 30.0, 'expense', 'Healthcare-new'))
+
+        report = self.trainer().run()
+        self.assertEqual((report['rows_skipped'], report['rows_trained']), (1, 0))
+        self.assertFalse(report['swapped'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from ml_models.category_memo import CategoryMemo, normalize_description
+
+class FakeCategorizer:
+    """Answers 'Other' and records what reached the model."""
+    def __init__(self):
+        self.seen = []
+
+    def predict_categories(self, batch):
+        self.seen.extend(row['description'] for row in batch)
+        return ['Other'] * len(batch)
+
+HISTORY = {
+    1: [("Netflix subscription", 'expense', 'Entertainment'),
+        ("Uber ride to office", 'expense', 'Transportation'),
+        ("Uber ride home", 'expense', 'Transportation'),
+        ("Salary payment", 'income', 'Income')],
+}
+MERCHANTS = [
+    ("SPOTIFY PREMIUM", 'expense', 'Entertainment', 40),
+    ("Spotify premium 12/03", 'expense', 'Entertainment', 8),
+    ("Amazon order", 'expense', 'Shopping', 30),
+    ("Amazon order", 'expense', 'Food', 20),
+]
+
+class TestCategoryMemo(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.history_loads = []
+        self.categorizer = FakeCategorizer()
+        self.memo = CategoryMemo(categorizer=self.categorizer, fetch_history=self.fetch_history,
+                                 fetch_merchants=lambda min_users, limit: MERCHANTS, clock=lambda: self.now)
+
+    def fetch_history(self, user_id, limit):
+        self.history_loads.append(user_id)
+        return HISTORY.get(user_id, [])
+
+    def categorize(self, description, transaction_type='expense', user_id=1):
+        return self.memo.predict_category(user_id, description, 10.0, transaction_type)
+
+    def test_normalize(self):
+        """Test case, numbers and punctuation do not change the memo key"""
+        self.assertEqual(normalize_description("UBER *RIDE 4411"), normalize_description("uber ride"))
+        self.assertEqual(normalize_description("McDonald's #12"), ('mcdonalds',))
+        self.assertEqual(normalize_description(None), ())
+
+    def test_exact_and_prefix_hits(self):
+        """Test repeated and near-repeated descriptions are answered without the model"""
+        self.assertEqual(self.categorize("Netflix Subscription"), 'Entertainment')
+        self.assertEqual(self.categorize("UBER RIDE to the airport"), 'Transportation')
+        self.assertEqual(self.categorize("netflix"), 'Entertainment')
+        self.assertEqual(self.categorize("Salary payment", 'income'), 'Income')
+        self.assertEqual(self.categorizer.seen, [])
+
+        # One shared word is not enough, and the type is part of the key
+        self.assertEqual(self.categorize("Uber eats dinner"), 'Other')
+        self.assertEqual(self.categorize("Salary payment", 'expense'), 'Other')
+        self.assertEqual(self.categorizer.seen, ["Uber eats dinner", "Salary payment"])
+
+        stats = self.memo.stats()
+        self.assertEqual((stats['user_exact'], stats['user_prefix'], stats['model']), (2, 2, 2))
+        self.assertAlmostEqual(stats['hit_rate'], 4 / 6)
+
+    def test_global_merchants(self):
+        """Test merchants most users agree on answer for users who never used them, once built in the background"""
+        # Nothing to answer from until the first build finishes
+        self.assertEqual(self.categorize("Spotify Premium", user_id=2), 'Other')
+        self.memo.refresh_thread.join(5)
+        self.assertEqual(self.categorize("Spotify Premium", user_id=2), 'Entertainment')
+        # 60/40 split between categories is too close to trust
+        self.assertEqual(self.categorize("Amazon order", user_id=2), 'Other')
+        self.assertEqual(self.memo.stats()['global_exact'], 1)
+
+        # An expired memo keeps answering while its replacement is built
+        self.now += Config.CATEGORY_MEMO_GLOBAL_TTL + 1
+        self.assertEqual(self.categorize("Spotify Premium", user_id=2), 'Entertainment')
+        self.memo.refresh_thread.join(5)
+        self.assertGreater(self.memo.global_expires, self.now)
+
+    def test_learn_and_invalidate(self):
+        """Test saved categories are remembered and recategorizing reloads the user's history"""
+        self.assertEqual(self.categorize("Gym membership"), 'Other')
+        self.memo.learn(1, "Gym membership", 'expense', 'Healthcare')
+        self.assertEqual(self.categorize("GYM MEMBERSHIP"), 'Healthcare')
+        self.assertEqual(self.history_loads, [1])
+
+        self.memo.invalidate(1)
+        self.assertEqual(self.categorize("Gym membership"), 'Other')
+        self.assertEqual(self.history_loads, [1, 1])
+
+        # Other workers only see a recategorization once their copy expires
+        self.now += Config.CATEGORY_MEMO_TTL + 1
+        self.categorize("Netflix subscription")
+        self.assertEqual(self.history_loads, [1, 1, 1])
+
+    def test_lru_bounds(self):
+        """Test least recently used users and descriptions are evicted"""
+        original = Config.CATEGORY_MEMO_USERS, Config.CATEGORY_MEMO_USER_ENTRIES
+        Config.CATEGORY_MEMO_USERS, Config.CATEGORY_MEMO_USER_ENTRIES = 2, 3
+        try:
+            memo = CategoryMemo(categorizer=self.categorizer, fetch_history=self.fetch_history,
+                                fetch_merchants=lambda min_users, limit: [])
+            index = memo.user_index(1)
+            # Four history rows, three kept: the oldest is gone along with its prefixes
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.lookup('expense', ('netflix', 'subscription')), (None, None))
+            self.assertEqual(index.lookup('expense', ('uber', 'ride')), ('Transportation', 'prefix'))
+
+            for user_id in (2, 3):
+                memo.user_index(user_id)
+            self.assertEqual(list(memo.users), [2, 3])
+        finally:
+            Config.CATEGORY_MEMO_USERS, Config.CATEGORY_MEMO_USER_ENTRIES = original
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from models.importer import StatementImporter, parse_csv, parse_ofx, ImportRowError, import_job, decode_lines
+from ml_models.ai_categorizer import ExpenseCategorizer
+from datetime import date
+
+CSV_STATEMENT = """Date,Description,Amount,Category
+2024-01-03,Starbucks coffee,-4.50,
+2024-01-04,Salary payment,"1,500.00",Income
+not-a-date,Uber ride,-12,
+
+2024-01-05,Netflix subscription,abc,
+2024-01-06,Electricity bill,(120.00),
+"""
+
+OFX_STATEMENT = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240110120000[0:GMT]
+<TRNAMT>-15.99
+<NAME>Netflix subscription
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240111<TRNAMT>300.00<NAME>Freelance work</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+class TestStatementImporter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cwd = os.getcwd()
+        cls.workdir = tempfile.mkdtemp()
+        os.chdir(cls.workdir)
+        cls.categorizer = ExpenseCategorizer()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def test_parse_csv(self):
+        """Test CSV rows are normalized and bad lines reported with their line numbers"""
+        rows = list(parse_csv(io.StringIO(CSV_STATEMENT)))
+        parsed = {line: row for line, row in rows if not isinstance(row, ImportRowError)}
+        errors = {line: str(row) for line, row in rows if isinstance(row, ImportRowError)}
+
+        self.assertEqual(parsed[2], {'transaction_date': date(2024, 1, 3), 'description': 'Starbucks coffee',
+                                     'amount': 4.5, 'type': 'expense', 'category': None})
+        self.assertEqual((parsed[3]['amount'], parsed[3]['type'], parsed[3]['category']), (1500.0, 'income', 'Income'))
+        self.assertEqual((parsed[7]['amount'], parsed[7]['type']), (120.0, 'expense'))
+        self.assertEqual(sorted(errors), [4, 6])
+        self.assertIn("invalid date", errors[4])
+
+    def test_parse_ofx(self):
+        """Test SGML and XML style OFX transactions"""
+        rows = [row for _, row in parse_ofx(io.StringIO(OFX_STATEMENT))]
+        self.assertEqual([(r['transaction_date'], r['amount'], r['type'], r['description']) for r in rows], [
+            (date(2024, 1, 10), 15.99, 'expense', 'Netflix subscription'),
+            (date(2024, 1, 11), 300.0, 'income', 'Freelance work'),
+        ])
+
+    def test_dry_run_report(self):
+        """Test a dry run categorizes in chunks and reports per-line errors"""
+        importer = StatementImporter(1, categorizer=self.categorizer, chunk_size=2, dry_run=True)
+        report = importer.import_stream(io.StringIO(CSV_STATEMENT))
+
+        self.assertEqual(report['rows_imported'], 3)
+        self.assertEqual(report['rows_failed'], 2)
+        self.assertEqual(report['chunks'], 2)
+        self.assertEqual([error['line'] for error in report['errors']], [4, 6])
+
+        ofx_report = importer.import_stream(io.StringIO(OFX_STATEMENT))
+        self.assertEqual((ofx_report['rows_imported'], ofx_report['rows_failed']), (2, 0))
+
+    def test_non_finite_amounts_fail_only_their_row(self):
+        """Test 'nan' and 'inf' amounts are row errors rather than a failed chunk"""
+        importer = StatementImporter(1, categorizer=self.categorizer, dry_run=True)
+        report = importer.import_stream(io.StringIO("Date,Description,Amount\n2024-01-05,Coffee,4.50\n"
+                                                    "2024-01-06,Tea,nan\n2024-01-07,Cake,-inf\n"))
+        self.assertEqual((report['rows_imported'], report['rows_failed']), (1, 2))
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4])
+        self.assertTrue(all('invalid amount' in error['error'] for error in report['errors']))
+
+    def test_missing_columns(self):
+        """Test a CSV without date and amount columns is rejected as a whole"""
+        importer = StatementImporter(1, categorizer=self.categorizer, dry_run=True)
+        report = importer.import_stream(io.StringIO("Description,Notes\nCoffee,x\n"))
+        self.assertEqual(report['rows_imported'], 0)
+        self.assertIn("CSV header", report['errors'][0]['error'])
+
+    def test_windows_1252_and_malformed_csv(self):
+        """Test a Windows-1252 file imports and a malformed CSV is reported instead of raising"""
+        importer = StatementImporter(1, categorizer=self.categorizer, chunk_size=1, dry_run=True)
+        raw = io.BytesIO("\ufeffDate,Description,Amount\n2024-01-05,Café crème,4.50\n".encode('utf-8') +
+                         "2024-01-06,Caf\u00e9 cr\u00e8me,3.20\n".encode('cp1252'))
+        self.assertEqual(list(decode_lines(raw))[1:], ["2024-01-05,Café crème,4.50\n", "2024-01-06,Café crème,3.20\n"])
+
+        report = importer.import_stream(decode_lines(io.BytesIO(b"Date,Description,Amount\n2024-01-05,Coffee,4.50\n"
+                                                                b"2024-01-06,Cof\rfee,3.20\n")))
+        self.assertEqual(report['rows_imported'], 1)
+        self.assertIn("malformed CSV", report['error'])
+        self.assertEqual(report['errors'][0]['line'], 3)
+
+    def test_import_job_only_reads_spooled_files(self):
+        """Test the import job handler refuses a path outside the upload spool directory"""
+        original = Config.JOB_SPOOL_DIR
+        Config.JOB_SPOOL_DIR = os.path.join(self.workdir, 'uploads')
+        outside = os.path.join(self.workdir, 'statement.csv')
+        try:
+            with open(outside, 'w') as f:
+                f.write(CSV_STATEMENT)
+            with self.assertRaises(ValueError):
+                import_job(1, outside, dry_run=True)
+            self.assertTrue(os.path.exists(outside))
+            self.assertEqual(os.stat(Config.JOB_SPOOL_DIR).st_mode & 0o777, 0o700)
+        finally:
+            Config.JOB_SPOOL_DIR = original
+
+if __name__ == '__main__':
+    unittest.main()
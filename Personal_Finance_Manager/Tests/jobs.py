@@ -0,0 +1,140 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from models.jobs import JobQueue, JobWorker, JOB_HANDLERS
+
+def echo_job(user_id, value=None, fail=False, sleep=0):
+    time.sleep(sleep)
+    if fail:
+        raise RuntimeError("asked to fail")
+    return {'user_id': user_id, 'value': value}
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.queue = JobQueue(os.path.join(self.workdir, 'jobs.sqlite3'))
+        JOB_HANDLERS['echo'] = (__name__, 'echo_job')
+
+    def tearDown(self):
+        del JOB_HANDLERS['echo']
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_dedupe_per_user(self):
+        """Test a second queued job of the same kind for a user is merged into the first"""
+        first = self.queue.enqueue('echo', 1, payload={'value': 'a'})
+        second = self.queue.enqueue('echo', 1, payload={'value': 'b'}, priority=20)
+        other_user = self.queue.enqueue('echo', 2)
+        unrelated = self.queue.enqueue('echo', 1, dedupe=False)
+
+        self.assertEqual(second['id'], first['id'])
+        self.assertEqual((second['payload'], second['priority']), ({'value': 'b'}, 20))
+        self.assertNotEqual(other_user['id'], first['id'])
+        self.assertNotEqual(unrelated['id'], first['id'])
+        self.assertEqual(self.queue.counts(), {'queued': 3})
+        with self.assertRaises(ValueError):
+            self.queue.enqueue('no_such_kind', 1)
+
+    def test_merged_global_job_visible_to_every_requester(self):
+        """Test a global job merged from two users' requests shows up for both, and no one else"""
+        first = self.queue.enqueue('echo', payload={'value': 'a'}, requested_by=1)
+        second = self.queue.enqueue('echo', payload={'value': 'b'}, requested_by=2)
+
+        self.assertEqual(second['id'], first['id'])
+        for user_id in (1, 2):
+            self.assertEqual(self.queue.get(first['id'], user_id=user_id)['id'], first['id'])
+            self.assertEqual([job['id'] for job in self.queue.for_user(user_id)], [first['id']])
+        self.assertIsNone(self.queue.get(first['id'], user_id=3))
+        self.assertEqual(self.queue.for_user(3), [])
+
+    def test_claim_order_and_limits(self):
+        """Test jobs run by priority, one per dedupe key at a time, and at most JOB_MAX_RUNNING at once"""
+        low = self.queue.enqueue('echo', 1, priority=0)
+        high = self.queue.enqueue('echo', 2, priority=10)
+        self.assertEqual(self.queue.claim()['id'], high['id'])
+
+        # User 2's next job waits for the running one, even though it outranks user 1's
+        self.queue.finish(high['id'])
+        again = self.queue.enqueue('echo', 2, priority=10)
+        self.assertEqual(self.queue.claim()['id'], again['id'])
+        self.assertEqual(self.queue.enqueue('echo', 2, priority=10)['status'], 'queued')
+        original = Config.JOB_MAX_RUNNING
+        Config.JOB_MAX_RUNNING = 2
+        try:
+            self.assertEqual(self.queue.claim()['id'], low['id'])
+            self.assertIsNone(self.queue.claim())
+        finally:
+            Config.JOB_MAX_RUNNING = original
+
+    def test_recover_orphaned_jobs(self):
+        """Test jobs whose lease lapsed are queued again, whatever process id they recorded"""
+        job = self.queue.enqueue('echo', 1)
+        self.queue.claim()
+        self.assertEqual(self.queue.recover(), 0)
+        self.queue._connect().execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (time.time() - 1, job['id']))
+        self.assertEqual(self.queue.recover(), 1)
+        self.assertEqual(self.queue.get(job['id'])['status'], 'queued')
+
+    def test_lapsed_lease_is_reclaimed(self):
+        """Test a claim takes over a job whose worker stopped renewing, and the old worker cannot finish it"""
+        job = self.queue.enqueue('echo', 1)
+        stale = self.queue.claim()
+        self.assertTrue(self.queue.heartbeat(job['id'], stale['lease']))
+        self.queue._connect().execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (time.time() - 1, job['id']))
+
+        fresh = self.queue.claim()
+        self.assertEqual(fresh['id'], job['id'])
+        self.assertFalse(self.queue.heartbeat(job['id'], stale['lease']))
+        self.assertFalse(self.queue.finish(job['id'], {'from': 'stale'}, lease=stale['lease']))
+        self.assertTrue(self.queue.finish(job['id'], {'from': 'fresh'}, lease=fresh['lease']))
+        self.assertEqual(self.queue.get(job['id'])['result'], {'from': 'fresh'})
+
+    def test_lease_renewed_while_running(self):
+        """Test a job that outlives its lease keeps it while the handler runs"""
+        original = Config.JOB_LEASE_SECONDS
+        Config.JOB_LEASE_SECONDS = 0.3
+        try:
+            job = self.queue.enqueue('echo', 1, payload={'value': 'slow', 'sleep': 1.0})
+            worker = threading.Thread(target=JobWorker(self.queue, concurrency=0).run_one)
+            worker.start()
+            time.sleep(0.7)
+            self.assertIsNone(self.queue.claim())
+            worker.join()
+        finally:
+            Config.JOB_LEASE_SECONDS = original
+        job = self.queue.get(job['id'])
+        self.assertEqual((job['status'], job['result']['value']), ('done', 'slow'))
+
+    def test_worker_runs_jobs(self):
+        """Test worker threads run queued jobs and record results and failures"""
+        worker = JobWorker(self.queue, concurrency=2, poll_interval=0.05).start()
+        try:
+            done = self.queue.enqueue('echo', 7, payload={'value': 3})
+            failed = self.queue.enqueue('echo', 8, payload={'fail': True})
+            deadline = time.time() + 5
+            while time.time() < deadline and self.queue.counts().get('queued', 0) + self.queue.counts().get('running', 0):
+                time.sleep(0.02)
+        finally:
+            worker.stop(timeout=5)
+
+        done, failed = self.queue.get(done['id']), self.queue.get(failed['id'])
+        self.assertEqual((done['status'], done['result']), ('done', {'user_id': 7, 'value': 3}))
+        self.assertEqual((failed['status'], failed['error']), ('failed', 'asked to fail'))
+        self.assertEqual([job['id'] for job in self.queue.for_user(7)], [done['id']])
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX permissions")
+    def test_queue_file_must_be_private(self):
+        """Test the queue file is created 0600 and one others can write is refused"""
+        self.assertEqual(os.stat(self.queue.path).st_mode & 0o777, 0o600)
+        os.chmod(self.queue.path, 0o666)
+        with self.assertRaises(PermissionError):
+            JobQueue(self.queue.path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from models import passwords
+from models.passwords import hash_password, verify_password, needs_rehash, hash_prefix, PasswordHasherBusy
+from models.user import User
+from werkzeug.security import generate_password_hash
+
+class TestPasswords(unittest.TestCase):
+    def setUp(self):
+        self.saved = (Config.PASSWORD_HASH_METHOD, Config.PASSWORD_HASH_WORKERS, Config.PASSWORD_HASH_MAX_QUEUE)
+        # A cheap work factor keeps the tests fast
+        Config.PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+        Config.PASSWORD_HASH_WORKERS = 1
+        # The pool is sized from Config when created; earlier tests may have left one running
+        passwords.shutdown()
+
+    def tearDown(self):
+        passwords.shutdown()
+        Config.PASSWORD_HASH_METHOD, Config.PASSWORD_HASH_WORKERS, Config.PASSWORD_HASH_MAX_QUEUE = self.saved
+
+    def test_hash_and_verify_in_pool(self):
+        """Test hashing and verification round trip through the worker process"""
+        password_hash = hash_password("password123")
+        self.assertTrue(password_hash.startswith('pbkdf2:sha256:1000$'))
+        self.assertTrue(verify_password(password_hash, "password123"))
+        self.assertFalse(verify_password(password_hash, "wrong"))
+
+    def test_full_queue_rejects(self):
+        """Test requests beyond the workers plus queue limit fail fast"""
+        Config.PASSWORD_HASH_METHOD = 'pbkdf2:sha256:3000000'
+        Config.PASSWORD_HASH_MAX_QUEUE = 0
+        hash_password("warm up the worker")
+
+        slow = threading.Thread(target=hash_password, args=("slow",))
+        slow.start()
+        while passwords._pending._value:
+            time.sleep(0.001)
+        with self.assertRaises(PasswordHasherBusy):
+            hash_password("rejected")
+        slow.join()
+
+    def test_rehash_on_login(self):
+        """Test a correct password stored with an old work factor is upgraded"""
+        old_hash = generate_password_hash("password123", method='pbkdf2:sha256:500')
+        user = User(987655, "rehash", "rehash@example.com", old_hash)
+        self.assertTrue(needs_rehash(old_hash))
+
+        self.assertFalse(user.check_password("wrong"))
+        self.assertEqual(user.password_hash, old_hash)
+
+        self.assertTrue(user.check_password("password123"))
+        self.assertFalse(needs_rehash(user.password_hash))
+        self.assertTrue(verify_password(user.password_hash, "password123"))
+
+    def test_shorthand_method_needs_no_rehash(self):
+        """Test hashes made with a shorthand method such as 'pbkdf2' are not rehashed on every login"""
+        Config.PASSWORD_HASH_METHOD = 'pbkdf2:sha256'
+        current = generate_password_hash("password123", method='pbkdf2:sha256')
+        self.assertFalse(needs_rehash(current))
+        self.assertTrue(needs_rehash(generate_password_hash("password123", method='pbkdf2:sha256:1000')))
+
+    def test_hash_prefix_matches_werkzeug(self):
+        """Test the method prefix is worked out from the string the same way werkzeug expands it"""
+        for method in ('scrypt', 'scrypt:16384:8:1', 'pbkdf2', 'pbkdf2:sha512', 'pbkdf2:sha256:1000'):
+            expected = generate_password_hash("x", method=method, salt_length=1).split('$', 1)[0]
+            self.assertEqual(hash_prefix(method), expected)
+
+    def test_timed_out_hash_keeps_its_slot(self):
+        """Test a hash the caller stopped waiting for still holds its queue slot until it finishes"""
+        Config.PASSWORD_HASH_METHOD = 'pbkdf2:sha256:3000000'
+        Config.PASSWORD_HASH_MAX_QUEUE = 0
+        saved_timeout = Config.PASSWORD_HASH_TIMEOUT
+        hash_password("warm up the worker")
+        Config.PASSWORD_HASH_TIMEOUT = 0.01
+        try:
+            with self.assertRaises(PasswordHasherBusy):
+                hash_password("slow")
+            with self.assertRaises(PasswordHasherBusy) as raised:
+                hash_password("rejected")
+            self.assertIn("queue is full", str(raised.exception))
+        finally:
+            Config.PASSWORD_HASH_TIMEOUT = saved_timeout
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, request
+from flask_login import LoginManager, login_required
+from models.cache import get_data_version, bump_data_version
+from models.user import User
+from models.database import connection
+from models.storage import SQLiteStorage, use_storage
+from routes.cache import user_cached, response_cache
+
+USER_ID = -1018
+
+def make_app(calls):
+    app = Flask(__name__)
+    login_manager = LoginManager(app)
+    # Every request is this user; nothing is looked up in the database
+    login_manager.request_loader(lambda request: User(USER_ID, 'cached', 'cached@example.com', ''))
+
+    @app.route('/api/totals')
+    @login_required
+    @user_cached
+    def totals():
+        calls.append(request.args.get('month'))
+        response = jsonify({'calls': len(calls)})
+        response.headers['X-Next-Cursor'] = 'abc'
+        return response
+
+    @app.route('/api/swallowed')
+    @login_required
+    @user_cached
+    def swallowed():
+        # Like a model that prints a database error and returns an empty result
+        calls.append('swallowed')
+        try:
+            with connection():
+                pass
+        except Exception:
+            pass
+        return jsonify([])
+
+    return app
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.client = make_app(self.calls).test_client()
+        response_cache().clear()
+        bump_data_version(USER_ID)
+
+    def test_data_version_changes_on_bump(self):
+        """Test a bump always moves the user's data version forward"""
+        version = get_data_version(USER_ID)
+        self.assertEqual(get_data_version(USER_ID), version)
+        bump_data_version(USER_ID)
+        self.assertGreater(get_data_version(USER_ID), version)
+
+    def test_cached_until_data_changes(self):
+        """Test repeat requests are served from the cache until the data version moves"""
+        first = self.client.get('/api/totals')
+        second = self.client.get('/api/totals')
+        self.assertEqual(self.calls, [None])
+        self.assertEqual(second.get_json(), {'calls': 1})
+        self.assertEqual(second.headers['X-Next-Cursor'], 'abc')
+        self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+
+        self.client.get('/api/totals?month=2024-01')
+        self.assertEqual(self.calls, [None, '2024-01'])
+
+        bump_data_version(USER_ID)
+        third = self.client.get('/api/totals')
+        self.assertEqual(third.get_json(), {'calls': 3})
+        self.assertNotEqual(third.headers['ETag'], first.headers['ETag'])
+
+    def test_if_none_match(self):
+        """Test a matching ETag gets a 304 without running the view"""
+        etag = self.client.get('/api/totals').headers['ETag']
+        response_cache().clear()
+
+        not_modified = self.client.get('/api/totals', headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(self.calls, [None])
+
+        bump_data_version(USER_ID)
+        self.assertEqual(self.client.get('/api/totals', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_database_errors_are_not_cached(self):
+        """Test a 200 from a view that hit a database error is neither stored nor given an ETag"""
+        with tempfile.TemporaryDirectory() as tmp:
+            # A directory where the database file should be, so every checkout fails
+            down = os.path.join(tmp, 'down.sqlite3')
+            os.mkdir(down)
+            previous = use_storage(SQLiteStorage(down))
+            try:
+                first = self.client.get('/api/swallowed')
+                second = self.client.get('/api/swallowed')
+            finally:
+                use_storage(previous)
+        self.assertEqual(self.calls, ['swallowed', 'swallowed'])
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('ETag', first.headers)
+        self.assertEqual(second.headers['Cache-Control'], 'no-store')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.transaction import Transaction
+from models.rollup import MonthlyRollup
+from ml_models.spending_predictor import SpendingPredictor, LinearTrend
+from datetime import date, timedelta
+
+def make_transactions(count=300, seed=7):
+    rng = random.Random(seed)
+    categories = ['Food', 'Transportation', 'Bills', 'Shopping', 'Entertainment']
+    transactions = []
+    for i in range(count):
+        transaction_type = 'income' if rng.random() < 0.2 else 'expense'
+        transactions.append(Transaction(
+            id=i + 1,
+            user_id=1,
+            amount=round(rng.uniform(5, 500), 2),
+            description=f"transaction {i}",
+            category='Income' if transaction_type == 'income' else rng.choice(categories),
+            type=transaction_type,
+            transaction_date=date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))
+        ))
+    return transactions
+
+def reference_prediction(transactions, months_ahead):
+    """The original pandas + scikit-learn forecaster, kept as the regression reference"""
+    import numpy as np
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
+
+    df = pd.DataFrame([{
+        'date': t.transaction_date,
+        'amount': t.amount if t.type == 'expense' else 0
+    } for t in transactions])
+    df['date'] = pd.to_datetime(df['date'])
+    daily_spending = df.groupby('date')['amount'].sum()
+
+    days = np.array(range(len(daily_spending))).reshape(-1, 1)
+    amounts = daily_spending.values
+    model = LinearRegression().fit(days, amounts)
+
+    future_day = len(daily_spending) + (30 * months_ahead)
+    return {
+        'estimated_spending': round(max(0, model.predict([[future_day]])[0]), 2),
+        'confidence': round(min(95, max(50, model.score(days, amounts) * 100))),
+        'prediction_period': f'Next {months_ahead} month(s)',
+        'data_points': len(daily_spending)
+    }
+
+def build_rollups(transactions):
+    buckets = {}
+    for t in transactions:
+        key = (MonthlyRollup.month_key(t.transaction_date), t.category, t.type)
+        rollup = buckets.setdefault(key, MonthlyRollup(t.user_id, *key))
+        rollup.total += t.amount
+        rollup.count += 1
+        rollup.sum_squares += t.amount * t.amount
+    return list(buckets.values())
+
+class TestSpendingPredictor(unittest.TestCase):
+    def setUp(self):
+        self.predictor = SpendingPredictor()
+        self.transactions = make_transactions()
+
+    def test_trends_from_rollups_match_transactions(self):
+        """Test rollup-based trends agree with the per-transaction computation"""
+        expected = self.predictor.analyze_spending_trends(self.transactions)
+        actual = self.predictor.analyze_spending_trends_from_rollups(build_rollups(self.transactions))
+
+        self.assertAlmostEqual(actual['average_monthly_spending'], expected['average_monthly_spending'], places=6)
+        self.assertAlmostEqual(actual['spending_volatility'], expected['spending_volatility'], places=6)
+        self.assertEqual(actual['total_transactions'], expected['total_transactions'])
+        self.assertEqual(actual['analysis_period'], expected['analysis_period'])
+        self.assertEqual(set(actual['top_categories'].values()), set(expected['top_categories'].values()))
+
+    def test_forecast_matches_reference(self):
+        """Test the closed-form forecaster reproduces the scikit-learn one for every horizon"""
+        for seed, count in ((7, 300), (11, 40), (5, 8)):
+            transactions = make_transactions(count, seed)
+            expected = [reference_prediction(transactions, months) for months in range(1, 13)]
+
+            self.assertEqual(self.predictor.predict_spending_horizons(transactions), expected)
+            self.assertEqual(self.predictor.predict_future_spending(transactions, 3), expected[2])
+
+    def test_forecast_from_daily_totals(self):
+        """Test forecasting from pre-aggregated daily totals, as returned by SQL"""
+        daily_totals = SpendingPredictor.daily_expense_totals(self.transactions)
+        self.assertEqual(self.predictor.forecast_from_daily_totals(daily_totals, [1, 6]),
+                         self.predictor.predict_spending_horizons(self.transactions, [1, 6]))
+        self.assertIsNone(self.predictor.forecast_from_daily_totals(daily_totals[:4]))
+
+    def test_linear_trend(self):
+        """Test streaming least squares on an exact line and a constant series"""
+        trend = LinearTrend()
+        for x in range(10):
+            trend.add(x, 3.0 + 2.0 * x)
+        self.assertAlmostEqual(trend.slope, 2.0)
+        self.assertAlmostEqual(trend.intercept, 3.0)
+        self.assertAlmostEqual(trend.r_squared, 1.0)
+
+        constant = LinearTrend()
+        for x in range(6):
+            constant.add(x, 25.0)
+        self.assertEqual((constant.slope, constant.predict(40), constant.r_squared), (0.0, 25.0, 1.0))
+
+    def test_rollup_statistics(self):
+        """Test rollup mean and standard deviation from running sums"""
+        rollup = MonthlyRollup(1, '2024-01', 'Food', 'expense', total=60.0, count=3, sum_squares=1400.0)
+        self.assertAlmostEqual(rollup.mean, 20.0)
+        self.assertAlmostEqual(rollup.std, 10.0)
+
+if __name__ == '__main__':
+    unittest.main()
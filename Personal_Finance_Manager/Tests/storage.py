@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date, datetime
+from decimal import Decimal
+from config import Config
+from models.storage import SQLiteStorage, translate_query, translate_schema
+from base import SQLiteTestCase
+from models.database import connection
+from models.rollup import MonthlyRollup
+
+class TestSQLiteStorage(SQLiteTestCase):
+    def test_translate_query(self):
+        """Test the MySQL the models use becomes equivalent SQLite"""
+        self.assertEqual(translate_query("SELECT * FROM t WHERE id = %s FOR UPDATE"),
+                         ("SELECT * FROM t WHERE id = ?", True))
+        self.assertEqual(translate_query("SELECT id FROM t WHERE id IN (%s, %s)")[1], False)
+        self.assertEqual(translate_query("INSERT IGNORE INTO t (a) VALUES (%s)"),
+                         ("INSERT OR IGNORE INTO t (a) VALUES (?)", True))
+        query, writes = translate_query(MonthlyRollup.UPSERT_SQL)
+        self.assertIn("ON CONFLICT DO UPDATE SET", query)
+        self.assertIn("excluded.total", query)
+        self.assertIn("VALUES (?, ?, ?, ?, ?, ?, ?)", query)
+        self.assertTrue(writes)
+
+    def test_schema_creates_tables_and_sample_data(self):
+        """Test the schema file loads on first use, with MySQL types read back as mysql.connector returns them"""
+        with open(Config.SCHEMA_PATH) as f:
+            self.assertFalse(any('AUTO_INCREMENT' in s or 'ENUM(' in s for s in translate_schema(f.read())))
+
+        with connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM transactions WHERE user_id = %s ORDER BY id LIMIT 1", (1,))
+            row = cursor.fetchone()
+            cursor.execute("SELECT COUNT(*) AS budgets FROM budgets")
+            self.assertEqual(cursor.fetchone()['budgets'], 7)
+            cursor.close()
+        self.assertEqual(row['amount'], Decimal('1500.0'))
+        self.assertEqual(row['transaction_date'], date(2024, 11, 1))
+        self.assertIsInstance(row['created_at'], datetime)
+
+    def test_database_file_is_private(self):
+        """Test the database file is created 0600 and a world-readable one is refused"""
+        with connection():
+            pass
+        self.assertEqual(os.stat(self.storage.path).st_mode & 0o777, 0o600)
+
+        shared = os.path.join(self.tmp.name, 'shared.sqlite3')
+        open(shared, 'w').close()
+        os.chmod(shared, 0o644)
+        with self.assertRaises(PermissionError):
+            with SQLiteStorage(shared).connection():
+                pass
+
+    def test_transactions_and_constraints(self):
+        """Test commit, rollback, upserts and the schema's constraints"""
+        with connection() as conn:
+            cursor = conn.cursor()
+            for amount in (10, 5):
+                cursor.execute(MonthlyRollup.UPSERT_SQL, (1, '2024-12', 'Food', 'expense', amount, 1, amount * amount))
+            cursor.close()
+
+        with self.assertRaises(ZeroDivisionError):
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM monthly_rollups WHERE month_year = %s", ('2024-12',))
+                1 / 0
+
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT total, txn_count FROM monthly_rollups WHERE month_year = %s", ('2024-12',))
+            self.assertEqual(cursor.fetchall(), [(Decimal('15.0'), 2)])
+            with self.assertRaises(Exception):
+                cursor.execute("INSERT INTO transactions (user_id, amount, type, transaction_date) VALUES (%s, %s, %s, %s)",
+                               (1, 5, 'transfer', date(2024, 12, 1)))
+            with self.assertRaises(Exception):
+                cursor.execute("INSERT INTO budgets (user_id, category, amount, month_year) VALUES (%s, %s, %s, %s)",
+                               (1, 'Food', 1, '2024-11'))
+            cursor.close()
+        self.assertEqual(self.storage.stats()['in_use'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
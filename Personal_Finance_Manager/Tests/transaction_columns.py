@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import numpy as np
+from decimal import Decimal
+from datetime import date, timedelta
+from models.transaction import Transaction
+from models.transaction_columns import TransactionColumns
+from ml_models.spending_predictor import SpendingPredictor
+from ml_models.anomaly_detector import AnomalyDetector
+
+def make_transactions(count=400, seed=3):
+    rng = random.Random(seed)
+    categories = ['Food', 'Transportation', 'Bills', 'Shopping', 'Other']
+    return [Transaction(
+        id=i + 1,
+        user_id=1,
+        amount=round(rng.lognormvariate(3.5, 1.0), 2),
+        description=rng.choice(["Grocery shopping", "Uber ride", "Coffee", "Rent", "?"]),
+        category=rng.choice(categories),
+        type='income' if rng.random() < 0.2 else 'expense',
+        transaction_date=date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))
+    ) for i in range(count)]
+
+class TestTransactionColumns(unittest.TestCase):
+    def setUp(self):
+        self.transactions = make_transactions()
+        self.columns = TransactionColumns.from_transactions(self.transactions)
+
+    def test_from_rows_types(self):
+        """Test raw cursor tuples become typed arrays and lookup codes"""
+        columns = TransactionColumns.from_rows([
+            (2, Decimal('1250'), 'Coffee', 'Food', 'expense', date(2024, 1, 2)),
+            (1, Decimal('300000'), 'Salary', 'Income', 'income', date(2024, 1, 1)),
+            (3, Decimal('99'), None, None, 'expense', date(2024, 1, 2)),
+        ], batch_size=2)
+
+        self.assertEqual(columns.amount_cents.dtype, np.int64)
+        self.assertEqual(columns.dates.dtype, np.dtype('datetime64[D]'))
+        self.assertEqual(list(columns.amounts), [12.5, 3000.0, 0.99])
+        self.assertEqual(list(columns.category_names()), ['Food', 'Income', 'Other'])
+        self.assertEqual(list(columns.is_expense), [True, False, True])
+        self.assertEqual(columns.daily_expense_totals(), [(date(2024, 1, 1), 0.0), (date(2024, 1, 2), 13.49)])
+
+        row = columns.row(2)
+        self.assertEqual((row.id, row.amount, row.description, row.transaction_date), (3, 0.99, '', date(2024, 1, 2)))
+        self.assertEqual(len(TransactionColumns.from_rows([])), 0)
+
+    def test_predictor_accepts_columns(self):
+        """Test forecasts from columns match forecasts from Transaction objects"""
+        predictor = SpendingPredictor()
+        expected = predictor.predict_spending_horizons(self.transactions, [1, 6, 12])
+        actual = predictor.predict_spending_horizons(self.columns, [1, 6, 12])
+
+        for want, got in zip(expected, actual):
+            self.assertAlmostEqual(got['estimated_spending'], want['estimated_spending'], places=2)
+            self.assertEqual((got['confidence'], got['data_points']), (want['confidence'], want['data_points']))
+
+    def test_anomalies_accept_columns(self):
+        """Test anomaly detection on columns flags the same transactions as on objects"""
+        expected = AnomalyDetector().detect_anomalies(self.transactions)
+        actual = AnomalyDetector().detect_anomalies(self.columns)
+        self.assertEqual(actual, expected)
+        self.assertTrue(actual)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,15 +3,40 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from base import SQLiteTestCase
+from models.storage import SQLiteStorage, use_storage
+import json
 from models.transaction import Transaction
 from models.user import User
-from datetime import datetime
+from routes.transactions import stream_json_array, parse_operation
+from datetime import date, datetime, timedelta
 
-class TestTransactions(unittest.TestCase):
+class TestTransactions(SQLiteTestCase):
     def setUp(self):
+        super().setUp()
         self.user = User.create("testuser_trans", "test_trans@example.com", "password123")
         self.assertIsNotNone(self.user)
 
+    def test_database_errors_are_not_empty_pages(self):
+        """Test an unreachable database raises from get_page and the API answers 500, not an empty list"""
+        from app import app
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(self.user.id)
+        # Loads the user before the database goes away
+        self.assertEqual(client.get('/api/transactions').status_code, 200)
+
+        # A directory where the database file should be, so every checkout fails
+        down = os.path.join(self.tmp.name, 'down.sqlite3')
+        os.mkdir(down)
+        use_storage(SQLiteStorage(down))
+        try:
+            with self.assertRaises(Exception):
+                Transaction.get_page(self.user.id)
+            self.assertEqual(client.get('/api/transactions?limit=5').status_code, 500)
+        finally:
+            use_storage(self.storage)
+
     def test_transaction_creation(self):
         """Test transaction creation and retrieval"""
         transaction = Transaction(
@@ -46,5 +71,108 @@ class TestTransactions(unittest.TestCase):
         result = Transaction.delete(transaction.id)
         self.assertTrue(result)
 
+    def test_keyset_pages_cover_every_row_once(self):
+        """Test paging with cursors returns each transaction exactly once, newest first"""
+        for i in range(7):
+            # Several rows share a date so the id tie-breaker is exercised
+            Transaction(user_id=self.user.id, amount=10 + i, description=f"Paged {i}", category="Paging",
+                        type="expense", transaction_date=date(2024, 3, 1) + timedelta(days=i // 3)).save()
+
+        seen = []
+        after = None
+        while True:
+            page, next_cursor = Transaction.get_page(self.user.id, limit=3, after=after, category="Paging")
+            seen.extend(page)
+            if not next_cursor:
+                break
+            after = Transaction.decode_cursor(next_cursor)
+
+        expected = list(Transaction.iter_user_transactions(self.user.id, category="Paging"))
+        self.assertEqual([t.id for t in seen], [t.id for t in expected])
+        self.assertEqual(len(set(t.id for t in seen)), len(seen))
+        keys = [(t.transaction_date, t.id) for t in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_batch_save_and_delete(self):
+        """Test mixed batch operations and that other users' rows are left alone"""
+        other = User.create("testuser_trans_other", "test_trans_other@example.com", "password123")
+        theirs = Transaction(user_id=other.id, amount=5, description="Not yours", type="expense")
+        theirs.save()
+        mine = Transaction(user_id=self.user.id, amount=20, description="Mine", type="expense")
+        mine.save()
+
+        created = Transaction(amount=12.5, description="Batch created", category="Food", type="expense")
+        updated = Transaction(id=mine.id, amount=25, description="Mine, edited", category="Food", type="expense")
+        save_results, delete_results = Transaction.apply_batch(
+            self.user.id, saves=[created, updated], deletes=[theirs.id])
+
+        self.assertEqual([r['status'] for r in save_results], ['created', 'updated'])
+        self.assertEqual(delete_results, [{'id': theirs.id, 'status': 'not_found'}])
+        self.assertIn(theirs.id, [t.id for t in Transaction.get_user_transactions(other.id)])
+
+        self.assertEqual(Transaction.bulk_delete(self.user.id, [created.id, mine.id]),
+                         [{'id': created.id, 'status': 'deleted'}, {'id': mine.id, 'status': 'deleted'}])
+        self.assertFalse(Transaction.delete(theirs.id, user_id=self.user.id))
+
+class TestTransactionPaging(unittest.TestCase):
+    def test_cursor_round_trip(self):
+        """Test cursors decode to the (date, id) they were made from"""
+        transaction = Transaction(id=42, transaction_date=date(2024, 5, 17))
+        cursor = Transaction.encode_cursor(transaction)
+        self.assertEqual(Transaction.decode_cursor(cursor), (date(2024, 5, 17), 42))
+        with self.assertRaises(ValueError):
+            Transaction.decode_cursor("not-a-cursor")
+
+    def test_transaction_date_normalized(self):
+        """Test transaction_date is always a date, whatever it was built from"""
+        for value in (date(2024, 5, 17), datetime(2024, 5, 17, 9, 30), "2024-05-17"):
+            self.assertEqual(Transaction(transaction_date=value).transaction_date, date(2024, 5, 17))
+        self.assertEqual(Transaction().transaction_date, date.today())
+        self.assertFalse(hasattr(Transaction(), '__dict__'))
+
+    def test_stream_json_array(self):
+        """Test streamed chunks join into the same JSON as serializing the list"""
+        transactions = [Transaction(id=i, user_id=1, amount=float(i), description=f"Row {i}",
+                                    transaction_date=date(2024, 1, 1)) for i in range(5)]
+        expected = [t.to_dict() for t in transactions]
+
+        for chunk_rows in (1, 2, 10):
+            body = ''.join(stream_json_array(iter(transactions), chunk_rows=chunk_rows))
+            self.assertEqual(json.loads(body), expected)
+        self.assertEqual(json.loads(''.join(stream_json_array(iter([])))), [])
+
+        def failing():
+            yield transactions[0]
+            raise RuntimeError("connection lost")
+
+        chunks = []
+        with self.assertRaises(RuntimeError):
+            for chunk in stream_json_array(failing(), chunk_rows=1):
+                chunks.append(chunk)
+        self.assertNotIn(']', chunks)
+
+    def test_parse_batch_operation(self):
+        """Test batch items become transactions, ids or validation errors"""
+        transaction = parse_operation({'op': 'update', 'id': 7, 'amount': '12.345', 'type': 'expense',
+                                       'date': '2024-02-01', 'description': 'Lunch'})
+        self.assertEqual((transaction.id, transaction.amount, transaction.transaction_date),
+                         (7, 12.35, date(2024, 2, 1)))
+        self.assertIsNone(transaction.category)
+        self.assertEqual(parse_operation({'op': 'delete', 'id': 3}), 3)
+
+        for item in ({'op': 'delete'}, {'op': 'move', 'id': 1},
+                     {'op': 'create', 'amount': 1, 'type': 'expense'},
+                     {'op': 'create', 'amount': 1, 'type': 'gift', 'date': '2024-01-01'},
+                     {'op': 'delete', 'id': True},
+                     {'op': 'create', 'amount': 'nan', 'type': 'expense', 'date': '2024-01-01'},
+                     {'op': 'create', 'amount': 'inf', 'type': 'expense', 'date': '2024-01-01'},
+                     {'op': 'create', 'amount': 1, 'type': 'expense', 'date': '2024-01-01', 'category': 5},
+                     {'op': 'create', 'amount': 1, 'type': 'expense', 'date': '2024-01-01', 'category': 'x' * 51},
+                     {'op': 'create', 'amount': 1, 'type': 'expense', 'date': '2024-01-01', 'description': ['a']},
+                     {'op': 'create', 'amount': 1, 'type': 'expense', 'date': '2024-01-01',
+                      'description': 'x' * 65536}):
+            with self.assertRaises(ValueError):
+                parse_operation(item)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file